@@ -1,3 +1,58 @@
 from django.contrib import admin
 
-# Register your models here.
+from .cache import bump_catalog_version
+from .documents import render_product_info_documents
+from .models import Parameter, ProductInfo, ProductParameter
+from .services import sync_product_info_parameters
+
+
+class ProductParameterInline(admin.TabularInline):
+    model = ProductParameter
+    extra = 0
+    autocomplete_fields = ("parameter",)
+
+
+@admin.register(ProductInfo)
+class ProductInfoAdmin(admin.ModelAdmin):
+    """
+    Параметры предложения правятся в EAV-таблице ProductParameter,
+    после сохранения их JSON-копия в ProductInfo.parameters и документ
+    предложения для выдачи обновляются, а кэш ответов каталога сбрасывается.
+    """
+
+    list_display = ("id", "product", "shop", "model", "price", "quantity", "is_active")
+    list_filter = ("is_active", "shop")
+    search_fields = ("product__name", "model", "external_id")
+    raw_id_fields = ("product", "shop")
+    inlines = (ProductParameterInline,)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        sync_product_info_parameters([form.instance.pk])
+        render_product_info_documents([form.instance.pk])
+        bump_catalog_version(form.instance.shop_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_catalog_version(obj.shop_id)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_catalog_version()
+
+
+@admin.register(Parameter)
+class ParameterAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "name" in form.changed_data:
+            product_info_ids = list(
+                ProductParameter.objects.filter(parameter=obj).values_list(
+                    "product_info_id", flat=True
+                )
+            )
+            sync_product_info_parameters(product_info_ids)
+            render_product_info_documents(product_info_ids)
+            bump_catalog_version()
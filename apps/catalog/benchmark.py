@@ -0,0 +1,279 @@
+import functools
+import http.server
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from django.db import connection, connections
+
+from apps.users.models import User
+
+from .models import ProductInfo, Shop
+from .services import import_shop_data_from_url
+
+# external_id категорий стенда выбраны с запасом, чтобы не пересекаться
+# с категориями настоящих магазинов
+BENCHMARK_CATEGORY_ID = 900_000
+BENCHMARK_USER_EMAIL = "benchmark-shop@example.com"
+
+
+def generate_feed(
+    path,
+    goods,
+    params=5,
+    categories=20,
+    seed=0,
+    run=0,
+    overlap=1.0,
+    format="yaml",
+):
+    """
+    Записывает синтетический прайс-лист в формате shop/categories/goods.
+
+    Содержимое детерминировано для (seed, run): базовые значения товаров
+    зависят только от seed, а в каждом следующем прогоне run доля товаров
+    1 - overlap получает новые цену и остаток. Так повторный импорт
+    прогоняет и неизменённые, и изменившиеся товары.
+
+    Файл пишется построчно и не требует памяти под весь прайс-лист.
+    """
+    base = random.Random(seed)
+    changes = random.Random(f"{seed}:{run}")
+    values = ["да", "нет", "чёрный", "белый", 16, 32, 64, 2.5, 6.1]
+
+    def dump(value):
+        return json.dumps(value, ensure_ascii=False)
+
+    with open(path, "w", encoding="utf-8") as file:
+        cats = [
+            {"id": BENCHMARK_CATEGORY_ID + i, "name": f"Категория {i}"}
+            for i in range(categories)
+        ]
+        if format == "json":
+            file.write('{"shop": "Бенчмарк", "categories": ')
+            file.write(dump(cats))
+            file.write(', "goods": [')
+        else:
+            file.write("shop: Бенчмарк\ncategories:\n")
+            for cat in cats:
+                file.write(f"  - id: {cat['id']}\n    name: {dump(cat['name'])}\n")
+            file.write("goods:\n" if goods else "goods: []\n")
+
+        for i in range(goods):
+            item = {
+                "id": 1 + i,
+                "category": BENCHMARK_CATEGORY_ID + base.randrange(categories),
+                "model": f"model/{i}",
+                "name": f"Товар {base.randrange(max(goods // 2, 1))}",
+                "price": base.randint(100, 100_000),
+                "price_rrc": 110_000,
+                "quantity": base.randint(0, 100),
+                "parameters": {
+                    f"Параметр {j}": base.choice(values) for j in range(params)
+                },
+            }
+            if run and changes.random() >= overlap:
+                item["price"] = changes.randint(100, 100_000)
+                item["quantity"] = changes.randint(0, 100)
+
+            if format == "json":
+                file.write(("," if i else "") + dump(item))
+                continue
+            file.write(f"  - id: {item['id']}\n")
+            for key in ("category", "model", "name", "price", "price_rrc", "quantity"):
+                file.write(f"    {key}: {dump(item[key])}\n")
+            if item["parameters"]:
+                file.write("    parameters:\n")
+                for name, value in item["parameters"].items():
+                    file.write(f"      {dump(name)}: {dump(value)}\n")
+
+        if format == "json":
+            file.write("]}")
+
+
+class FeedServer:
+    """
+    Локальный HTTP-сервер, отдающий файлы прайс-листов из каталога.
+    Поддерживает условные запросы (Last-Modified) как обычный веб-сервер.
+    """
+
+    def __init__(self, directory):
+        handler = functools.partial(
+            http.server.SimpleHTTPRequestHandler, directory=directory
+        )
+        handler.log_message = lambda *args: None
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, name):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/{name}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def get_benchmark_user():
+    """
+    Пользователь-магазин стенда. Создаётся активным, чтобы не отправлять
+    письмо с подтверждением.
+    """
+    user, _ = User.objects.get_or_create(
+        email=BENCHMARK_USER_EMAIL,
+        defaults={"type": "shop", "is_active": True, "username": "benchmark-shop"},
+    )
+    return user
+
+
+def reset_benchmark_shop(user):
+    """
+    Удаляет товары магазина стенда и забывает валидаторы его прайс-листа,
+    чтобы следующий замер начинался с пустого каталога.
+    """
+    shop = Shop.objects.filter(user=user).first()
+    if shop is None:
+        return
+    ProductInfo.objects.filter(shop=shop).delete()
+    shop.feed_etag = shop.feed_last_modified = shop.feed_hash = ""
+    shop.save(update_fields=["feed_etag", "feed_last_modified", "feed_hash"])
+
+
+def peak_rss_kb():
+    """
+    Пиковый RSS текущего процесса в килобайтах.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На macOS ru_maxrss в байтах, на Linux — в килобайтах
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure_import(user_id, url):
+    """
+    Один замер import_shop_data_from_url. Выполняется в отдельном процессе,
+    чтобы пиковый RSS относился только к этому импорту.
+    """
+    user = User.objects.get(pk=user_id)
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    rss_before = peak_rss_kb()
+    started = time.perf_counter()
+    with connection.execute_wrapper(count_queries):
+        result = import_shop_data_from_url(user, url)
+    wall_time = time.perf_counter() - started
+    connections.close_all()
+
+    rows = result.get("created", 0) + result.get("updated", 0)
+    return {
+        "status": result["status"],
+        "error": result.get("error", ""),
+        "feed_unchanged": result.get("feed_unchanged", False),
+        "created": result.get("created", 0),
+        "updated": result.get("updated", 0),
+        "unchanged": result.get("unchanged", 0),
+        "removed": result.get("removed", 0),
+        "wall_time": round(wall_time, 3),
+        "queries": queries,
+        "peak_rss_kb": peak_rss_kb(),
+        "baseline_rss_kb": rss_before,
+        "rows_per_sec": round(rows / wall_time, 1) if wall_time else 0,
+    }
+
+
+def _init_benchmark_worker():
+    django.setup()
+
+
+def run_benchmark(
+    directory,
+    sizes,
+    params=5,
+    runs=2,
+    overlap=0.9,
+    seed=0,
+    format="yaml",
+    progress=None,
+):
+    """
+    Прогоняет импорт синтетических прайс-листов каждого размера runs раз
+    подряд: первый прогон — импорт в пустой каталог, следующие — повторные
+    импорты с долей overlap неизменённых товаров.
+
+    Возвращает словарь с окружением и списком замеров.
+    """
+    user = get_benchmark_user()
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "params": params,
+        "runs": runs,
+        "overlap": overlap,
+        "seed": seed,
+        "format": format,
+        "results": [],
+    }
+    name = f"benchmark.{format}"
+    path = os.path.join(directory, name)
+    connections.close_all()
+    with FeedServer(directory) as server:
+        for size in sizes:
+            reset_benchmark_shop(user)
+            for run in range(runs):
+                generate_feed(
+                    path,
+                    size,
+                    params=params,
+                    seed=seed,
+                    run=run,
+                    overlap=overlap,
+                    format=format,
+                )
+                # Свой Last-Modified у каждого прогона, иначе сервер ответит 304
+                # на файл, перезаписанный в ту же секунду
+                stamp = int(time.time()) + len(report["results"])
+                os.utime(path, (stamp, stamp))
+                connections.close_all()
+                with ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=get_context("spawn"),
+                    initializer=_init_benchmark_worker,
+                ) as executor:
+                    measurement = executor.submit(
+                        measure_import, user.pk, server.url(name)
+                    ).result()
+                measurement = {
+                    "goods": size,
+                    "run": run,
+                    "feed_bytes": os.path.getsize(path),
+                    **measurement,
+                }
+                measurement["goods_per_sec"] = (
+                    round(size / measurement["wall_time"], 1)
+                    if measurement["wall_time"]
+                    else 0
+                )
+                report["results"].append(measurement)
+                if progress:
+                    progress(measurement)
+        reset_benchmark_shop(user)
+    os.unlink(path)
+    return report
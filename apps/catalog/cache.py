@@ -0,0 +1,227 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from .models import CatalogCacheVersion
+
+# Версии каталога, входящие в ключи кэша ответов:
+# - общая — меняется при изменениях, затрагивающих все магазины
+#   (переименование категорий и параметров);
+# - всех магазинов — при любом изменении каталога любого магазина,
+#   от неё зависят ответы без фильтра по магазину;
+# - магазина — при изменении каталога этого магазина.
+# Смена версии делает старые ключи недостижимыми: инвалидация за O(1)
+# без перебора ключей, а устаревшие записи вытесняются по таймауту.
+# Версии хранятся в БД (CatalogCacheVersion): их меняют обработчик импорта,
+# команды и все веб-процессы, а кэш у процессов может быть свой.
+GLOBAL_VERSION_KEY = "catalog:version"
+SHOPS_VERSION_KEY = "catalog:version:shops"
+SHOP_VERSION_KEY = "catalog:version:shop:{}"
+
+# Счётчики статистики лежат в кэше, а не в БД, чтобы не писать в БД
+# на каждом попадании; другим процессам они видны только в общем кэше
+HITS_KEY = "catalog:cache:hits:{}"
+MISSES_KEY = "catalog:cache:misses:{}"
+NOT_MODIFIED_KEY = "catalog:cache:not_modified:{}"
+
+# Имена представлений с кэшем ответов — для статистики попаданий
+CACHED_VIEWS = []
+
+# Бэкенды кэша, содержимое которых видно только своему процессу
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def _initial_version():
+    # Версия начинается с отметки времени, чтобы после удаления строки
+    # версии не совпасть с версией, под которой в кэше ещё лежат записи
+    return time.time_ns() // 1000
+
+
+def _create_versions(scopes):
+    CatalogCacheVersion.objects.bulk_create(
+        [
+            CatalogCacheVersion(scope=scope, version=_initial_version())
+            for scope in scopes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _get_versions(*scopes):
+    versions = dict(
+        CatalogCacheVersion.objects.filter(scope__in=scopes).values_list(
+            "scope", "version"
+        )
+    )
+    missing = [scope for scope in scopes if scope not in versions]
+    if missing:
+        _create_versions(missing)
+        versions.update(
+            CatalogCacheVersion.objects.filter(scope__in=missing).values_list(
+                "scope", "version"
+            )
+        )
+    return [versions[scope] for scope in scopes]
+
+
+def _bump_versions(*scopes):
+    _create_versions(scopes)
+    CatalogCacheVersion.objects.filter(scope__in=scopes).update(
+        version=F("version") + 1
+    )
+
+
+def bump_catalog_version(shop_id=None):
+    """
+    Инвалидирует кэш ответов каталога: для магазина shop_id
+    или, без него, для всех магазинов сразу.
+    """
+    if shop_id is None:
+        _bump_versions(GLOBAL_VERSION_KEY)
+    else:
+        _bump_versions(SHOP_VERSION_KEY.format(shop_id), SHOPS_VERSION_KEY)
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cache_stats_are_shared():
+    """
+    Видны ли счётчики веб-процессов другому процессу (например, команде
+    catalog_cache_stats): только если кэш общий (Redis, Memcached, БД, файлы).
+    """
+    return not isinstance(caches["default"], PROCESS_LOCAL_BACKENDS)
+
+
+def cache_stats():
+    """
+    Число попаданий и промахов кэша по представлениям, а также ответов
+    304 на условные запросы.
+    """
+    stats = {}
+    for name in CACHED_VIEWS:
+        hits = cache.get(HITS_KEY.format(name), 0)
+        misses = cache.get(MISSES_KEY.format(name), 0)
+        total = hits + misses
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 3) if total else None,
+            "not_modified": cache.get(NOT_MODIFIED_KEY.format(name), 0),
+        }
+    return stats
+
+
+def reset_cache_stats():
+    cache.delete_many(
+        [HITS_KEY.format(name) for name in CACHED_VIEWS]
+        + [MISSES_KEY.format(name) for name in CACHED_VIEWS]
+        + [NOT_MODIFIED_KEY.format(name) for name in CACHED_VIEWS]
+    )
+
+
+def response_cache_key(name, request, shop_param=None):
+    """
+    Ключ ответа: представление, версии каталога и нормализованный запрос
+    (адрес и отсортированные параметры). Хост входит в ключ, т.к. ссылки
+    постраничной навигации в ответе абсолютные.
+    """
+    scope = SHOPS_VERSION_KEY
+    shop_id = request.query_params.get(shop_param) if shop_param else None
+    if shop_id and shop_id.isdigit():
+        scope = SHOP_VERSION_KEY.format(int(shop_id))
+    params = sorted(
+        (key, sorted(values)) for key, values in request.query_params.lists()
+    )
+    digest = hashlib.sha1(
+        repr((request.build_absolute_uri(request.path), params)).encode()
+    ).hexdigest()
+    global_version, scope_version = _get_versions(GLOBAL_VERSION_KEY, scope)
+    return f"catalog:response:{name}:{global_version}:{scope_version}:{digest}"
+
+
+def response_etag(key):
+    """
+    ETag ответа выводится из его ключа в кэше: ключ меняется вместе
+    с версиями каталога, поэтому валидатор не требует ни запросов к БД,
+    ни отрисовки ответа.
+    """
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def cache_catalog_response(shop_param=None):
+    """
+    Кэширует успешные ответы GET-обработчика представления каталога
+    на CATALOG_CACHE_TIMEOUT секунд. Ответ помечается заголовком
+    X-Cache: HIT или MISS, попадания и промахи считаются (cache_stats).
+
+    Ответы несут ETag (см. response_etag); запрос с совпадающим
+    If-None-Match получает 304 до обращения к кэшу и к обработчику.
+
+    shop_param — параметр запроса с ID магазина: такие ответы зависят
+    только от версии этого магазина.
+    """
+
+    def decorator(method):
+        name = method.__qualname__.split(".")[0]
+        CACHED_VIEWS.append(name)
+
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            key = response_cache_key(name, request, shop_param)
+            etag = response_etag(key)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                _increment(NOT_MODIFIED_KEY.format(name))
+                not_modified["ETag"] = etag
+                return not_modified
+
+            cached = cache.get(key)
+            if cached is not None:
+                _increment(HITS_KEY.format(name))
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response["ETag"] = etag
+                response["X-Cache"] = "HIT"
+                return response
+
+            _increment(MISSES_KEY.format(name))
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                if isinstance(response, Response):
+                    # Ответ DRF отрисовывается сразу, чтобы сохранить байты
+                    renderer = self.get_renderers()[0]
+                    response = HttpResponse(
+                        renderer.render(
+                            response.data,
+                            renderer.media_type,
+                            self.get_renderer_context(),
+                        ),
+                        content_type=renderer.media_type,
+                    )
+                cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    settings.CATALOG_CACHE_TIMEOUT,
+                )
+                response["ETag"] = etag
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,136 @@
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ProductInfo
+
+# Поля документа предложения, которые меняются без импорта (обновления
+# остатков и цен) и поэтому подставляются при выдаче, а не хранятся
+VOLATILE_FIELDS = ("quantity", "price", "price_rrc")
+
+# Последний ключ документа: остаток и цены вставляются перед ним,
+# чтобы порядок ключей совпадал с ProductInfoSerializer
+PARAMETERS_KEY = ',"product_parameters":'
+
+# Значения, из которых собирается документ (см. build_document)
+DOCUMENT_VALUES = (
+    "pk",
+    "model",
+    "product__name",
+    "product__category__name",
+    "shop_id",
+    "parameters",
+)
+
+
+def build_document(info):
+    """
+    Неизменяемая между импортами часть представления предложения
+    в формате ProductInfoSerializer. info — словарь значений DOCUMENT_VALUES.
+    """
+    return {
+        "model": info["model"],
+        "product": {
+            "name": info["product__name"],
+            "category": info["product__category__name"],
+        },
+        "shop": info["shop_id"],
+        "product_parameters": [
+            {"parameter": name, "value": info["parameters"][name]}
+            for name in sorted(info["parameters"])
+        ],
+    }
+
+
+def dump_document(info):
+    return json.dumps(build_document(info), ensure_ascii=False, separators=(",", ":"))
+
+
+def render_product_info_documents(product_info_ids, batch_size=None):
+    """
+    Пересобирает сохранённые JSON-документы предложений. Вызывается
+    импортом при публикации и после правок, меняющих документ.
+    """
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+    product_info_ids = sorted(set(product_info_ids))
+    updated_at = timezone.now()
+    for start in range(0, len(product_info_ids), batch_size):
+        infos = ProductInfo.objects.filter(
+            pk__in=product_info_ids[start : start + batch_size]
+        ).values(*DOCUMENT_VALUES)
+        ProductInfo.objects.bulk_update(
+            [
+                ProductInfo(
+                    pk=info["pk"],
+                    document=dump_document(info),
+                    updated_at=updated_at,
+                )
+                for info in infos
+            ],
+            ["document", "updated_at"],
+        )
+
+
+def _render_missing_documents(infos):
+    """
+    Документы предложений, у которых сохранённого документа ещё нет
+    (созданы в обход импорта): собираются в памяти одним запросом,
+    без записи в БД — её выполняют импорт, админка и миграции.
+    """
+    missing = [info.pk for info in infos if not info.document]
+    if not missing:
+        return {}
+    return {
+        values["pk"]: dump_document(values)
+        for values in ProductInfo.objects.filter(pk__in=missing).values(
+            *DOCUMENT_VALUES
+        )
+    }
+
+
+def splice_document(document, pk, quantity, price, price_rrc):
+    """
+    JSON предложения из сохранённого документа, ID, остатка и цен —
+    те же байты, что JSONRenderer выдаёт для ProductInfoSerializer:
+    ключи в порядке сериализатора, компактные разделители, U+2028/U+2029
+    экранированы. Внутри строк JSON кавычки экранированы, поэтому
+    PARAMETERS_KEY встречается в документе только как ключ.
+    """
+    split = document.rindex(PARAMETERS_KEY)
+    return (
+        (
+            f'{{"id":{pk},{document[1:split]},"quantity":{quantity},'
+            f'"price":{price},"price_rrc":{price_rrc}{document[split:]}'
+        )
+        .replace("\u2028", "\\u2028")
+        .replace("\u2029", "\\u2029")
+    )
+
+
+def product_info_json(info, document=None):
+    """
+    JSON предложения в байтах: сохранённый документ, дополненный ID,
+    остатком и ценами (см. splice_document). Поля по отдельности
+    не сериализуются. У info должны быть загружены id, document
+    и VOLATILE_FIELDS; document передаётся, если сохранённого документа нет.
+    """
+    document = document or info.document
+    if not document:
+        document = _render_missing_documents([info])[info.pk]
+    return splice_document(
+        document, info.pk, info.quantity, info.price, info.price_rrc
+    ).encode()
+
+
+def product_infos_json(infos):
+    """
+    JSON-массив предложений в байтах, склеенный из сохранённых документов.
+    """
+    infos = list(infos)
+    documents = _render_missing_documents(infos)
+    return (
+        b"["
+        + b",".join(product_info_json(info, documents.get(info.pk)) for info in infos)
+        + b"]"
+    )
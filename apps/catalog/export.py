@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import re
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from .documents import (
+    DOCUMENT_VALUES,
+    VOLATILE_FIELDS,
+    dump_document,
+    splice_document,
+)
+from .filters import filter_product_infos
+
+ACCEPTS_GZIP_RE = re.compile(r"\bgzip\b")
+
+# Значения строки выгрузки: документ и всё, из чего он собирается,
+# если документа ещё нет
+EXPORT_VALUES = ("document", *VOLATILE_FIELDS, *DOCUMENT_VALUES)
+
+CSV_COLUMNS = (
+    "id",
+    "shop",
+    "category",
+    "name",
+    "model",
+    "quantity",
+    "price",
+    "price_rrc",
+    "parameters",
+)
+
+
+def _ndjson_line(row):
+    document = row["document"] or dump_document(row)
+    return (
+        splice_document(
+            document, row["pk"], row["quantity"], row["price"], row["price_rrc"]
+        )
+        + "\n"
+    ).encode()
+
+
+def _ndjson_chunk(rows):
+    return b"".join(_ndjson_line(row) for row in rows)
+
+
+def _csv_header():
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(CSV_COLUMNS)
+    return buffer.getvalue().encode()
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (
+            row["pk"],
+            row["shop_id"],
+            row["product__category__name"],
+            row["product__name"],
+            row["model"],
+            row["quantity"],
+            row["price"],
+            row["price_rrc"],
+            json.dumps(row["parameters"], ensure_ascii=False, sort_keys=True),
+        )
+        for row in rows
+    )
+    return buffer.getvalue().encode()
+
+
+# Формат выгрузки: (тип содержимого, сборка фрагмента из строк,
+# заголовок перед первым фрагментом или None)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", _ndjson_chunk, None),
+    "csv": ("text/csv; charset=utf-8", _csv_chunk, _csv_header),
+}
+
+
+def export_rows(queryset, chunk_size=None):
+    """
+    Строки выгрузки (словари EXPORT_VALUES) одним запросом через iterator:
+    на PostgreSQL это серверный курсор, который видит один снимок данных
+    на момент открытия, так что публикации импорта во время выгрузки
+    в неё не попадают. В памяти одновременно не больше chunk_size строк.
+    """
+    return (
+        queryset.order_by("pk")
+        .values(*EXPORT_VALUES)
+        .iterator(chunk_size=chunk_size or settings.CATALOG_EXPORT_CHUNK_SIZE)
+    )
+
+
+def export_chunks(rows, export_format, chunk_size=None):
+    """
+    Байтовые фрагменты выгрузки по chunk_size строк. Для CSV первым
+    фрагментом идёт заголовок.
+    """
+    chunk_size = chunk_size or settings.CATALOG_EXPORT_CHUNK_SIZE
+    _, render, header = EXPORT_FORMATS[export_format]
+    if header is not None:
+        yield header()
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield render(chunk)
+            chunk = []
+    if chunk:
+        yield render(chunk)
+
+
+def export_response(request, export_format):
+    """
+    Потоковая выгрузка активных предложений с фильтрами списка товаров
+    (см. filter_product_infos). Если клиент принимает gzip, ответ сжимается
+    по мере выдачи. Ошибки фильтров возникают до начала потока.
+    """
+    content_type, _, _ = EXPORT_FORMATS[export_format]
+    queryset, _ = filter_product_infos(request.query_params)
+    chunks = export_chunks(export_rows(queryset), export_format)
+
+    gzip = ACCEPTS_GZIP_RE.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if gzip:
+        chunks = compress_sequence(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    if gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="catalog.{export_format}"'
+    )
+    return response
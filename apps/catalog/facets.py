@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db.models import Count, Max, Min, Q
+
+from .models import ProductParameter
+
+
+def price_buckets(boundaries):
+    """
+    Диапазоны цен [от, до) по возрастающим границам; у последнего
+    диапазона нет верхней границы.
+    """
+    lows = [0, *boundaries]
+    highs = [*boundaries, None]
+    return list(zip(lows, highs))
+
+
+def get_facets(queryset):
+    """
+    Считает фасеты по отобранным предложениям: число предложений по
+    магазинам, категориям, диапазонам цен и значениям самых частых
+    параметров. Выполняется пятью запросами независимо от числа предложений
+    и параметров.
+    """
+    queryset = queryset.order_by()
+    ids = queryset.values("pk")
+
+    shops = list(
+        queryset.values("shop_id", "shop__name")
+        .annotate(count=Count("pk"))
+        .order_by("-count", "shop_id")
+    )
+    categories = list(
+        queryset.values("product__category_id", "product__category__name")
+        .annotate(count=Count("pk"))
+        .order_by("-count", "product__category_id")
+    )
+
+    buckets = price_buckets(settings.CATALOG_FACET_PRICE_BUCKETS)
+    aggregates = {}
+    for index, (low, high) in enumerate(buckets):
+        bucket = Q(price__gte=low)
+        if high is not None:
+            bucket &= Q(price__lt=high)
+        aggregates[f"bucket_{index}"] = Count("pk", filter=bucket)
+    prices = queryset.aggregate(
+        price_min=Min("price"), price_max=Max("price"), **aggregates
+    )
+
+    # Самые частые параметры, затем счётчики их значений
+    top = list(
+        ProductParameter.objects.filter(product_info__in=ids)
+        .values("parameter_id")
+        .annotate(count=Count("pk"))
+        .order_by("-count", "parameter_id")[: settings.CATALOG_FACET_PARAMETERS]
+    )
+    parameters = {
+        row["parameter_id"]: {"id": row["parameter_id"], "values": []} for row in top
+    }
+    values = (
+        ProductParameter.objects.filter(
+            product_info__in=ids, parameter_id__in=parameters
+        )
+        .values("parameter_id", "parameter__name", "value")
+        .annotate(count=Count("pk"))
+        .order_by("parameter_id", "-count", "value")
+    )
+    for row in values:
+        parameter = parameters[row["parameter_id"]]
+        parameter["name"] = row["parameter__name"]
+        if len(parameter["values"]) < settings.CATALOG_FACET_VALUES:
+            parameter["values"].append({"value": row["value"], "count": row["count"]})
+
+    return {
+        "shops": [
+            {"id": row["shop_id"], "name": row["shop__name"], "count": row["count"]}
+            for row in shops
+        ],
+        "categories": [
+            {
+                "id": row["product__category_id"],
+                "name": row["product__category__name"],
+                "count": row["count"],
+            }
+            for row in categories
+        ],
+        "price": {
+            "min": prices["price_min"],
+            "max": prices["price_max"],
+            "buckets": [
+                {"min": low, "max": high, "count": prices[f"bucket_{index}"]}
+                for index, (low, high) in enumerate(buckets)
+            ],
+        },
+        "parameters": list(parameters.values()),
+    }
@@ -0,0 +1,254 @@
+import functools
+import operator
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import fields, serializers
+from rest_framework.relations import PrimaryKeyRelatedField, StringRelatedField
+
+from .query_plans import QueryPlan
+
+# Поля DRF, представление которых совпадает со значением атрибута модели:
+# для них значение отдаётся как есть, без вызова to_representation
+IDENTITY_FIELDS = (
+    fields.BooleanField,
+    fields.CharField,
+    fields.ChoiceField,
+    fields.IntegerField,
+)
+
+
+def _identity(instance):
+    return instance
+
+
+def _represent(plan, instance):
+    data = {}
+    for name, getter, convert in plan:
+        value = getter(instance)
+        if value is not None and convert is not None:
+            value = convert(value)
+        data[name] = value
+    return data
+
+
+def _represent_many(plan, related):
+    # Связанный менеджер читается через all(), чтобы взять prefetch-кэш
+    items = related.all() if hasattr(related, "all") else related
+    return [_represent(plan, item) for item in items]
+
+
+def _pk_list(related):
+    items = related.all() if hasattr(related, "all") else related
+    return [item.pk for item in items]
+
+
+def parse_selection(value):
+    """
+    Разбирает параметр вида "id,state,ordered_items.quantity" в дерево
+    {"id": {"*": {}}, "state": {"*": {}}, "ordered_items": {"quantity": ...}}.
+    Ключ "*" означает «все поля этого уровня». Без параметра — None.
+    """
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(","):
+        names = [name.strip() for name in path.split(".")]
+        if not all(names):
+            continue
+        node = tree
+        for name in names:
+            node = node.setdefault(name, {})
+        node.setdefault("*", {})
+    return tree
+
+
+def _check_names(param, tree, names, prefix):
+    unknown = sorted(set(tree) - set(names) - {"*"})
+    if unknown:
+        raise serializers.ValidationError(
+            {param: "Неизвестные поля: " + ", ".join(prefix + name for name in unknown)}
+        )
+
+
+def _relation(load, source):
+    try:
+        return load.relation(source.split("."))
+    except FieldDoesNotExist:
+        # Связь не найдена в модели — её загрузка не планируется
+        return QueryPlan(None)
+
+
+def compile_plan(serializer, fields=None, expand=None, load=None, prefix=""):
+    """
+    План полей сериализатора: кортежи (имя, получение значения из объекта,
+    преобразование значения или None). Вложенные сериализаторы
+    компилируются рекурсивно, поля только для записи пропускаются.
+
+    fields и expand — деревья выборки (parse_selection) или None:
+    - fields оставляет только перечисленные поля;
+    - expand перечисляет вложенные объекты, которые выдаются целиком,
+      остальные заменяются своим ID (списком ID для many=True). Выбор
+      полей внутри вложенного объекта тоже его раскрывает.
+
+    В load (QueryPlan модели сериализатора) записывается, какие поля
+    и связи читает план: по нему строится загрузка queryset.
+    """
+    model = getattr(getattr(serializer, "Meta", None), "model", None)
+    if load is None:
+        load = QueryPlan(model)
+    readable = {
+        name: field for name, field in serializer.fields.items() if not field.write_only
+    }
+    if fields is not None:
+        _check_names("fields", fields, readable, prefix)
+        if "*" not in fields:
+            readable = {name: readable[name] for name in readable if name in fields}
+    nested = [
+        name
+        for name, field in readable.items()
+        if isinstance(field, serializers.BaseSerializer)
+    ]
+    if expand is not None:
+        _check_names("expand", expand, nested, prefix)
+
+    plan = []
+    for name, field in readable.items():
+        source = field.source
+        getter = _identity if source == "*" else operator.attrgetter(source)
+        sub_fields = fields.get(name) if fields is not None else None
+
+        if source == "*":
+            # Поле получает весь объект — что из него читается, неизвестно
+            load.load_all()
+            convert = field.to_representation
+        elif isinstance(field, serializers.BaseSerializer):
+            many = isinstance(field, serializers.ListSerializer)
+            selected = sub_fields is not None and set(sub_fields) - {"*"}
+            if expand is None or name in expand or selected:
+                sub_plan = compile_plan(
+                    field.child if many else field,
+                    sub_fields,
+                    expand.get(name, {}) if expand is not None else None,
+                    _relation(load, source),
+                    f"{prefix}{name}.",
+                )
+                represent = _represent_many if many else _represent
+                convert = functools.partial(represent, sub_plan)
+            elif many:
+                convert = _pk_list
+                _relation(load, source)
+            elif model is not None and "." not in source:
+                # Свёрнутый объект — ID из внешнего ключа, без загрузки объекта
+                getter = operator.attrgetter(model._meta.get_field(source).attname)
+                convert = None
+                load.add_field(source)
+            else:
+                convert = operator.attrgetter("pk")
+                _relation(load, source)
+        elif (
+            isinstance(field, PrimaryKeyRelatedField)
+            and field.pk_field is None
+            and model is not None
+            and "." not in source
+        ):
+            # Как и DRF, берём значение внешнего ключа без загрузки объекта
+            getter = operator.attrgetter(model._meta.get_field(source).attname)
+            convert = None
+            load.add_field(source)
+        else:
+            if isinstance(field, StringRelatedField):
+                # Строковое представление может читать любые поля объекта
+                _relation(load, source).load_all()
+                convert = str
+            else:
+                load.add_path(source.replace(".", "__"))
+                convert = (
+                    None if type(field) in IDENTITY_FIELDS else field.to_representation
+                )
+        plan.append((name, getter, convert))
+    return tuple(plan)
+
+
+@functools.lru_cache(maxsize=256)
+def _select(serializer_class, fields, expand):
+    selected = FastSerializer(serializer_class, fields, expand)
+    # План строится сразу, чтобы ошибки выборки возникли до запросов к БД
+    selected.plan
+    return selected
+
+
+class FastSerializer:
+    """
+    Быстрый read-only вариант DRF-сериализатора для горячих представлений.
+
+    План полей один раз строится по исходному сериализатору (compile_plan),
+    после чего объекты превращаются в словари без механизма полей DRF
+    (get_attribute, SkipField, проверки на каждом поле). Результат совпадает
+    с serializer_class(instance).data.
+
+    Вместе с планом полей строится план загрузки (QueryPlan): queryset
+    для сериализатора готовит prepare, а не select_related/prefetch_related,
+    написанные вручную.
+
+    fields и expand — параметры выборки полей (см. compile_plan, for_request).
+    """
+
+    def __init__(self, serializer_class, fields=None, expand=None):
+        self.serializer_class = serializer_class
+        self.fields = fields
+        self.expand = expand
+
+    @functools.cached_property
+    def _compiled(self):
+        serializer = self.serializer_class()
+        load = QueryPlan(getattr(getattr(serializer, "Meta", None), "model", None))
+        plan = compile_plan(
+            serializer,
+            parse_selection(self.fields),
+            parse_selection(self.expand),
+            load,
+        )
+        return plan, load
+
+    @property
+    def plan(self):
+        return self._compiled[0]
+
+    @property
+    def query_plan(self):
+        return self._compiled[1]
+
+    def for_request(self, request):
+        """
+        Вариант сериализатора с выборкой из параметров запроса
+        ?fields=id,ordered_items.quantity и ?expand=ordered_items.
+        Неизвестные поля — ValidationError (ответ 400).
+        """
+        fields = request.query_params.get("fields")
+        expand = request.query_params.get("expand")
+        if fields is None and expand is None:
+            return self
+        return _select(self.serializer_class, fields, expand)
+
+    def selects(self, name):
+        """
+        Выдаётся ли поле верхнего уровня name.
+        """
+        return any(field_name == name for field_name, _, _ in self.plan)
+
+    def prepare(self, queryset, *paths):
+        """
+        Загружает в queryset ровно то, что читает план: select_related,
+        prefetch_related и only(). paths — поля, нужные помимо сериализатора
+        (например, для сортировки), через "__".
+        """
+        query_plan = self.query_plan
+        if paths:
+            query_plan = query_plan.with_paths(*paths)
+        return query_plan.apply(queryset)
+
+    def serialize(self, instance):
+        return _represent(self.plan, instance)
+
+    def serialize_many(self, instances):
+        return [_represent(self.plan, instance) for instance in instances]
@@ -0,0 +1,371 @@
+import contextlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+import yaml
+from django.conf import settings
+from django.db.models import Count, Max, Q
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Category, ProductInfo, Shop
+
+logger = logging.getLogger(__name__)
+
+# C-выгрузчик libyaml в разы быстрее, если PyYAML собран с ним
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Формат файла: тип содержимого
+FEED_FILE_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "yaml": "application/yaml; charset=utf-8",
+}
+
+# Поля товара в порядке прайс-листа и значения ProductInfo для них
+GOODS_VALUES = (
+    ("id", "external_id"),
+    ("category", "product__category__external_id"),
+    ("model", "model"),
+    ("name", "product__name"),
+    ("price", "price"),
+    ("price_rrc", "price_rrc"),
+    ("quantity", "quantity"),
+    ("parameters", "parameters"),
+)
+
+MANIFEST_NAME = "manifest.json"
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def shop_feed_path(shop_id, format):
+    return os.path.join(
+        settings.CATALOG_FEED_DIR, "shops", str(shop_id), f"catalog.{format}"
+    )
+
+
+def global_feed_path(format):
+    return os.path.join(settings.CATALOG_FEED_DIR, f"catalog.{format}")
+
+
+def _dump_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _dump_yaml(value):
+    return yaml.dump(
+        value,
+        Dumper=YamlDumper,
+        allow_unicode=True,
+        default_flow_style=False,
+        sort_keys=False,
+    )
+
+
+@contextlib.contextmanager
+def _replace_file(path, mode="w"):
+    """
+    Запись файла целиком: содержимое пишется во временный файл рядом
+    и подменяет прежний одним rename, так что читатели видят либо старый
+    файл, либо новый.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        encoding = None if "b" in mode else "utf-8"
+        with os.fdopen(fd, mode, encoding=encoding) as file:
+            yield file
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_json(file, shop, categories, goods):
+    file.write(f'{{"shop":{_dump_json(shop)},"categories":{_dump_json(categories)},')
+    file.write('"goods":[')
+    for index, item in enumerate(goods):
+        file.write("," if index else "")
+        file.write(_dump_json(item))
+    file.write("]}")
+
+
+def _write_ndjson(file, shop, categories, goods):
+    # Первая строка — магазин и категории, затем по строке на товар
+    file.write(_dump_json({"shop": shop, "categories": categories}) + "\n")
+    for item in goods:
+        file.write(_dump_json(item) + "\n")
+
+
+def _write_yaml(file, shop, categories, goods):
+    file.write(_dump_yaml({"shop": shop, "categories": categories}))
+    file.write("goods:")
+    empty = True
+    for item in goods:
+        file.write("\n" if empty else "")
+        file.write(_dump_yaml([item]))
+        empty = False
+    file.write(" []\n" if empty else "")
+
+
+FEED_WRITERS = {
+    "json": _write_json,
+    "ndjson": _write_ndjson,
+    "yaml": _write_yaml,
+}
+
+
+def _iter_goods(shop_id):
+    names = [name for name, _ in GOODS_VALUES]
+    rows = (
+        ProductInfo.objects.filter(shop_id=shop_id, is_active=True)
+        .order_by("external_id")
+        .values_list(*(value for _, value in GOODS_VALUES))
+        .iterator(chunk_size=settings.CATALOG_EXPORT_CHUNK_SIZE)
+    )
+    for row in rows:
+        yield dict(zip(names, row))
+
+
+def write_shop_feed_files(shop):
+    """
+    Пишет файлы прайс-листа магазина во всех форматах FEED_FILE_FORMATS
+    в структуре, которую принимает импорт: shop, categories, goods.
+    Товары читаются курсором, в памяти файл целиком не собирается.
+    """
+    categories = list(
+        Category.objects.filter(
+            products__product_infos__shop=shop,
+            products__product_infos__is_active=True,
+        )
+        .distinct()
+        .order_by("external_id")
+        .values("external_id", "name")
+    )
+    categories = [
+        {"id": category["external_id"], "name": category["name"]}
+        for category in categories
+    ]
+    for format, write in FEED_WRITERS.items():
+        with _replace_file(shop_feed_path(shop.pk, format)) as file:
+            write(file, shop.name, categories, _iter_goods(shop.pk))
+
+
+def write_global_feed_files(shop_ids):
+    """
+    Собирает общие файлы каталога из уже записанных файлов магазинов
+    без обращения к БД: JSON — массив прайс-листов магазинов, YAML —
+    поток документов (по документу на магазин), NDJSON — разделы магазинов
+    подряд.
+    """
+    separators = {
+        "json": (b"[", b",", b"]\n"),
+        "ndjson": (b"", b"", b""),
+        "yaml": (b"", b"", b""),
+    }
+    for format, (start, separator, end) in separators.items():
+        with _replace_file(global_feed_path(format), "wb") as file:
+            file.write(start)
+            for index, shop_id in enumerate(shop_ids):
+                file.write(separator if index else b"")
+                if format == "yaml":
+                    file.write(b"---\n")
+                with open(shop_feed_path(shop_id, format), "rb") as shop_file:
+                    shutil.copyfileobj(shop_file, file)
+            file.write(end)
+
+
+def _load_manifest():
+    try:
+        with open(os.path.join(settings.CATALOG_FEED_DIR, MANIFEST_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {"shops": {}, "global": None}
+
+
+def _save_manifest(manifest):
+    with _replace_file(os.path.join(settings.CATALOG_FEED_DIR, MANIFEST_NAME)) as file:
+        json.dump(manifest, file)
+
+
+def get_feed_signatures():
+    """
+    Подписи каталогов магазинов, принимающих заказы, одним запросом:
+    {ID магазина: подпись}.
+    Подпись меняется при публикации версии каталога, переименовании
+    магазина и любом изменении его активных предложений (в том числе
+    остатков и цен, у которых обновляется updated_at).
+    """
+    shops = (
+        Shop.objects.filter(state=True)
+        .annotate(
+            goods=Count("product_infos", filter=Q(product_infos__is_active=True)),
+            goods_updated_at=Max(
+                "product_infos__updated_at", filter=Q(product_infos__is_active=True)
+            ),
+        )
+        .values_list("pk", "name", "catalog_version", "goods", "goods_updated_at")
+    )
+    return {
+        str(pk): _dump_json([name, version, goods, str(updated_at)])
+        for pk, name, version, goods, updated_at in shops
+    }
+
+
+def update_feed_files(force=False):
+    """
+    Обновляет статические файлы каталога после импорта. Файлы пишутся
+    только для магазинов, принимающих заказы (state), и заново — только
+    для тех, подпись которых изменилась с прошлого раза (подписи хранятся
+    в manifest.json рядом с файлами); файлы остальных магазинов удаляются.
+    Общие файлы пересобираются, если изменился хотя бы один магазин или
+    состав магазинов. force пересобирает всё.
+
+    Возвращает список ID магазинов, файлы которых записаны заново.
+    """
+    manifest = _load_manifest()
+    written = manifest["shops"]
+    signatures = get_feed_signatures()
+
+    shop_ids = []
+    updated = []
+    for shop in Shop.objects.filter(pk__in=signatures).order_by("pk"):
+        shop_id = str(shop.pk)
+        shop_ids.append(shop.pk)
+        if force or written.get(shop_id) != signatures[shop_id]:
+            write_shop_feed_files(shop)
+            written[shop_id] = signatures[shop_id]
+            updated.append(shop.pk)
+    for shop_id in set(written) - set(signatures):
+        # Магазин удалён или не принимает заказы
+        shutil.rmtree(
+            os.path.dirname(shop_feed_path(shop_id, "json")), ignore_errors=True
+        )
+        del written[shop_id]
+
+    global_signature = _dump_json([[pk, written[str(pk)]] for pk in shop_ids])
+    if force or manifest["global"] != global_signature:
+        write_global_feed_files(shop_ids)
+        manifest["global"] = global_signature
+    _save_manifest(manifest)
+    return updated
+
+
+def update_feed_files_safely():
+    """
+    update_feed_files для вызова после импорта: ошибка записи файлов
+    не должна превращать успешный импорт в неудачный.
+    """
+    try:
+        return update_feed_files()
+    except Exception:
+        logger.exception("Не удалось обновить файлы каталога")
+        return []
+
+
+class _FileRange:
+    """
+    Часть открытого файла от текущей позиции длиной length байт.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок 'Range: bytes=start-end' для файла размером size.
+    Возвращает (start, end) включительно либо None, если отдаётся весь файл
+    (заголовка нет, он некорректен или диапазонов несколько).
+    Для диапазона за пределами файла — ValueError.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    if not match[1]:
+        # bytes=-N — последние N байт
+        length = int(match[2])
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(match[1])
+    end = int(match[2]) if match[2] else size - 1
+    if start >= size:
+        raise ValueError(header)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def feed_file_response(request, path, content_type):
+    """
+    Отдаёт файл каталога. Если задан CATALOG_FEED_SENDFILE_HEADER, файл
+    отдаёт фронтенд-сервер (X-Sendfile — по пути на диске, X-Accel-Redirect —
+    по внутреннему URL из CATALOG_FEED_ACCEL_PREFIX), иначе — FileResponse
+    с поддержкой условных запросов и Range (один диапазон).
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+
+    sendfile = settings.CATALOG_FEED_SENDFILE_HEADER
+    if sendfile:
+        response = HttpResponse(content_type=content_type)
+        if sendfile.lower() == "x-accel-redirect":
+            relative = os.path.relpath(path, settings.CATALOG_FEED_DIR)
+            location = settings.CATALOG_FEED_ACCEL_PREFIX.rstrip("/") + "/" + relative
+        else:
+            location = os.path.abspath(path)
+        response.headers[sendfile] = location
+        return response
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if if_range is None or if_range in (etag, http_date(last_modified)):
+        try:
+            byte_range = parse_range(request.headers.get("Range", ""), stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+
+    file = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(
+            _FileRange(file, end - start + 1), status=206, content_type=content_type
+        )
+        response.headers["Content-Length"] = end - start + 1
+        response.headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,409 @@
+import hashlib
+import io
+import json
+import lzma
+import queue
+import threading
+from tempfile import SpooledTemporaryFile
+from urllib.parse import urlparse
+
+import yaml
+from django.conf import settings
+from requests import get
+from yaml.events import (
+    AliasEvent,
+    DocumentStartEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    StreamStartEvent,
+)
+from yaml.nodes import MappingNode, ScalarNode, SequenceNode
+
+# C-загрузчик libyaml в разы быстрее, если PyYAML собран с ним
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+FEED_STRUCTURE_ERROR = "Неверная структура YAML: требуются shop, categories, goods"
+
+
+class FeedError(Exception):
+    """
+    Ошибка формата или структуры прайс-листа.
+    """
+
+
+class DownloadedFeed:
+    """
+    Скачанный прайс-лист во временном файле.
+    Небольшие файлы остаются в памяти, крупные сбрасываются на диск.
+
+    not_modified означает, что сервер ответил 304 на условный запрос
+    и файл не скачивался.
+    """
+
+    def __init__(
+        self,
+        file,
+        format,
+        empty,
+        hash="",
+        etag="",
+        last_modified="",
+        not_modified=False,
+    ):
+        self.file = file
+        self.format = format
+        self.empty = empty
+        self.hash = hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.file.close()
+
+
+def detect_format(url, content_type=""):
+    """
+    Определяет формат прайс-листа: 'json' или 'yaml'.
+    """
+    if urlparse(url).path.lower().endswith(".json") or "json" in content_type:
+        return "json"
+    return "yaml"
+
+
+def download_feed(url, timeout=10, etag="", last_modified="", file=None):
+    """
+    Скачивает прайс-лист по частям во временный файл, не держа тело ответа в памяти.
+
+    Если переданы etag/last_modified прошлого импорта, выполняется условный
+    запрос; попутно считается sha256 содержимого. В file можно передать
+    собственный открытый на запись файл, например именованный временный.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    if file is None:
+        file = SpooledTemporaryFile(max_size=settings.CATALOG_FEED_SPOOL_SIZE)
+    digest = hashlib.sha256()
+    empty = True
+    try:
+        with get(
+            url.strip(), timeout=timeout, stream=True, headers=headers
+        ) as response:
+            if response.status_code == 304:
+                return DownloadedFeed(
+                    file,
+                    detect_format(url),
+                    empty=True,
+                    etag=etag,
+                    last_modified=last_modified,
+                    not_modified=True,
+                )
+            response.raise_for_status()
+            for chunk in response.iter_content(settings.CATALOG_FEED_CHUNK_SIZE):
+                if empty and chunk.strip():
+                    empty = False
+                digest.update(chunk)
+                file.write(chunk)
+    except Exception:
+        file.close()
+        raise
+    file.seek(0)
+    return DownloadedFeed(
+        file,
+        detect_format(url, response.headers.get("Content-Type", "")),
+        empty,
+        hash=digest.hexdigest(),
+        etag=response.headers.get("ETag", ""),
+        last_modified=response.headers.get("Last-Modified", ""),
+    )
+
+
+def iter_feed(file, format):
+    """
+    Разбирает прайс-лист потоково.
+
+    Выдаёт пары (ключ, значение) для разделов верхнего уровня. Вместо раздела
+    goods целиком выдаётся ('goods', None), а затем ('item', товар) по одному.
+    """
+    try:
+        if format == "json":
+            yield from _iter_json(file)
+        else:
+            yield from _iter_yaml(file)
+    except (yaml.YAMLError, ValueError) as e:
+        raise FeedError(f"Неверный формат данных (YAML/JSON): {e}") from e
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        # Повреждённый или обрезанный сжатый файл
+        raise FeedError(f"Ошибка чтения файла: {e}") from e
+
+
+def iter_feed_batches(file, format, batch_size=None):
+    """
+    Группирует разобранный прайс-лист для записи в БД.
+
+    Сначала выдаются ('shop', имя) и ('categories', список),
+    затем ('goods', пачка товаров) пачками по batch_size.
+    Товары, встретившиеся в файле раньше shop и categories, придерживаются до них.
+    """
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+    header = {}
+    goods_seen = False
+    batch = []
+    for key, value in iter_feed(file, format):
+        if key == "item":
+            batch.append(value)
+            if len(batch) >= batch_size and len(header) == 2:
+                yield "goods", batch
+                batch = []
+        elif key == "goods":
+            if value is not None:
+                raise FeedError(FEED_STRUCTURE_ERROR)
+            goods_seen = True
+        elif key in ("shop", "categories") and key not in header:
+            header[key] = value
+            if len(header) == 2:
+                yield "shop", header["shop"]
+                yield "categories", header["categories"]
+
+    if len(header) < 2 or not goods_seen:
+        raise FeedError(FEED_STRUCTURE_ERROR)
+    for start in range(0, len(batch), batch_size):
+        yield "goods", batch[start : start + batch_size]
+
+
+def iter_in_background(iterable, maxsize=2):
+    """
+    Выполняет итерацию в отдельном потоке, чтобы разбор файла шёл
+    параллельно с записью в БД. Очередь ограничена maxsize элементами.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stopped.is_set():
+                    try:
+                        items.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stopped.is_set():
+                    return
+            items.put((done, None))
+        except BaseException as e:
+            items.put((done, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def _compose_node(loader, anchors):
+    """
+    Собирает узел YAML из событий парсера. В отличие от compose_document
+    позволяет строить дерево только для одного элемента списка.
+    """
+    event = loader.get_event()
+    if isinstance(event, AliasEvent):
+        if event.anchor not in anchors:
+            raise FeedError(f"Неизвестный якорь YAML: {event.anchor}")
+        return anchors[event.anchor]
+
+    if isinstance(event, ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(ScalarNode, event.value, event.implicit)
+        node = ScalarNode(
+            tag, event.value, event.start_mark, event.end_mark, style=event.style
+        )
+    elif isinstance(event, SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(SequenceNode, None, event.implicit)
+        node = SequenceNode(tag, [], event.start_mark, None)
+        while not loader.check_event(SequenceEndEvent):
+            node.value.append(_compose_node(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+    elif isinstance(event, MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == "!":
+            tag = loader.resolve(MappingNode, None, event.implicit)
+        node = MappingNode(tag, [], event.start_mark, None)
+        while not loader.check_event(MappingEndEvent):
+            item_key = _compose_node(loader, anchors)
+            item_value = _compose_node(loader, anchors)
+            node.value.append((item_key, item_value))
+        node.end_mark = loader.get_event().end_mark
+    else:
+        raise FeedError(f"Неожиданное событие YAML: {event}")
+
+    if event.anchor is not None:
+        anchors[event.anchor] = node
+    return node
+
+
+def _iter_yaml(file):
+    loader = YamlLoader(file)
+    anchors = {}
+    try:
+        for event_class in (StreamStartEvent, DocumentStartEvent, MappingStartEvent):
+            if not loader.check_event(event_class):
+                raise FeedError(FEED_STRUCTURE_ERROR)
+            loader.get_event()
+
+        while not loader.check_event(MappingEndEvent):
+            key = loader.construct_document(_compose_node(loader, anchors))
+            if key == "goods" and loader.check_event(SequenceStartEvent):
+                loader.get_event()
+                yield "goods", None
+                while not loader.check_event(SequenceEndEvent):
+                    yield (
+                        "item",
+                        loader.construct_document(_compose_node(loader, anchors)),
+                    )
+                loader.get_event()
+            else:
+                yield key, loader.construct_document(_compose_node(loader, anchors))
+    finally:
+        loader.dispose()
+
+
+class _JsonReader:
+    """
+    Инкрементальный разбор JSON из текстового потока.
+    Значения декодируются по одному, в памяти держится только текущий фрагмент.
+    """
+
+    decoder = json.JSONDecoder()
+
+    # Сколько последних символов фрагмента может занимать незавершённый
+    # литерал, число или \uXXXX: ошибка в них означает, что значение
+    # обрезано границей фрагмента, а не что JSON неверен
+    incomplete_tail = 16
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = ""
+        self.pos = 0
+        # Позиция начала буфера в потоке — для сообщений об ошибках
+        self.offset = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        chunk = self.stream.read(size or settings.CATALOG_FEED_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos : self.pos + 1]
+            self.fill()
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(
+                f"в позиции {self.offset + self.pos} ожидался один из символов "
+                f"{chars!r}, получено {char!r}"
+            )
+        self.pos += 1
+        return char
+
+    def truncated(self, error):
+        """
+        Может ли ошибка разбора объясняться концом фрагмента.
+        """
+        return error.pos >= len(
+            self.buffer
+        ) - self.incomplete_tail or error.msg.startswith("Unterminated string")
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as error:
+                if self.eof or not self.truncated(error):
+                    raise ValueError(
+                        f"ошибка JSON в позиции {self.offset + error.pos}: {error.msg}"
+                    ) from error
+                self.extend()
+                continue
+            # Число на границе фрагмента могло быть прочитано не полностью
+            if end == len(self.buffer) and not self.eof:
+                self.extend()
+                continue
+            self.pos = end
+            return obj
+
+    def extend(self):
+        """
+        Дочитывает продолжение значения, не уместившегося во фрагмент.
+        Чтение растёт вдвое, чтобы длинное значение собиралось за линейное
+        время; значение длиннее CATALOG_FEED_MAX_VALUE_SIZE — ошибка.
+        """
+        size = len(self.buffer) - self.pos
+        if size >= settings.CATALOG_FEED_MAX_VALUE_SIZE:
+            raise ValueError(
+                f"значение в позиции {self.offset + self.pos} длиннее "
+                f"{settings.CATALOG_FEED_MAX_VALUE_SIZE} символов"
+            )
+        self.fill(max(size, settings.CATALOG_FEED_CHUNK_SIZE))
+
+
+def _iter_json(file):
+    reader = _JsonReader(io.TextIOWrapper(file, encoding="utf-8-sig"))
+    try:
+        if reader.peek() != "{":
+            raise FeedError(FEED_STRUCTURE_ERROR)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key == "goods" and reader.peek() == "[":
+                reader.expect("[")
+                yield "goods", None
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield "item", reader.value()
+                        if reader.expect(",]") == "]":
+                            break
+            else:
+                yield key, reader.value()
+            if reader.expect(",}") == "}":
+                break
+    finally:
+        # Файл закрывает владелец DownloadedFeed
+        reader.stream.detach()
@@ -0,0 +1,110 @@
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Parameter, ProductInfo, ProductParameter
+from .search import search_product_infos
+
+
+def _int_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: "Ожидается целое число"})
+    if value < 0:
+        raise ValidationError({name: "Ожидается число не меньше 0"})
+    return value
+
+
+def parse_parameter_filters(values):
+    """
+    Разбирает фильтры по параметрам вида 'ID параметра:значение'.
+    Возвращает словарь ID параметра -> множество значений.
+    """
+    filters = {}
+    for value in values:
+        parameter_id, sep, parameter_value = value.partition(":")
+        if not sep or not parameter_id.isdigit():
+            raise ValidationError(
+                {"param": "Ожидается значение вида 'ID параметра:значение'"}
+            )
+        filters.setdefault(int(parameter_id), set()).add(parameter_value)
+    return filters
+
+
+def filter_by_parameters(queryset, filters):
+    """
+    Оставляет предложения, у которых есть все параметры из filters
+    (ID параметра -> допустимые значения).
+
+    На PostgreSQL проверяется вхождение в JSON-копию параметров
+    по GIN-индексу, на других СУБД — EXISTS по индексу
+    (parameter, value, product_info) таблицы ProductParameter.
+    """
+    if not filters:
+        return queryset
+    if connection.vendor != "postgresql":
+        for parameter_id, values in filters.items():
+            queryset = queryset.filter(
+                Exists(
+                    ProductParameter.objects.filter(
+                        product_info=OuterRef("pk"),
+                        parameter_id=parameter_id,
+                        value__in=values,
+                    )
+                )
+            )
+        return queryset
+
+    names = dict(Parameter.objects.filter(id__in=filters).values_list("id", "name"))
+    for parameter_id, values in filters.items():
+        if parameter_id not in names:
+            return queryset.none()
+        condition = Q()
+        for value in values:
+            condition |= Q(parameters__contains={names[parameter_id]: value})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def filter_product_infos(params):
+    """
+    Отбирает активные предложения включённых магазинов по параметрам запроса
+    списка товаров:
+
+    - shop_id, category_id — магазин и категория;
+    - price_min, price_max — диапазон цены включительно;
+    - param=ID:значение — значение параметра; несколько значений одного
+      параметра объединяются через ИЛИ, разные параметры — через И;
+    - search — поисковая строка (см. search_product_infos).
+
+    Возвращает (queryset, ranked): ranked означает, что у предложений
+    есть аннотация relevance для сортировки по релевантности.
+    """
+    query = Q(shop__state=True, is_active=True)
+    shop_id = _int_param(params, "shop_id")
+    category_id = _int_param(params, "category_id")
+    price_min = _int_param(params, "price_min")
+    price_max = _int_param(params, "price_max")
+    search = params.get("search")
+
+    if shop_id is not None:
+        query &= Q(shop_id=shop_id)
+    if category_id is not None:
+        query &= Q(product__category_id=category_id)
+    if price_min is not None:
+        query &= Q(price__gte=price_min)
+    if price_max is not None:
+        query &= Q(price__lte=price_max)
+
+    queryset = filter_by_parameters(
+        ProductInfo.objects.filter(query),
+        parse_parameter_filters(params.getlist("param")),
+    )
+
+    if search:
+        return search_product_infos(queryset, search)
+    return queryset, False
@@ -0,0 +1,508 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import (
+    Category,
+    Parameter,
+    Product,
+    ProductInfo,
+    ProductParameter,
+    Shop,
+    StagedProductInfo,
+)
+from .documents import dump_document, render_product_info_documents
+from .search import update_search_vectors
+
+GOODS_REQUIRED_FIELDS = {"id", "category", "name", "price", "price_rrc", "quantity"}
+
+
+def item_fingerprint(item):
+    """
+    Отпечаток содержимого товара из прайс-листа: по нему определяется,
+    изменился ли товар с прошлого импорта.
+    """
+    content = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def get_shop_importer(shop, batch_size=None):
+    """
+    Возвращает импортёр согласно настройке CATALOG_IMPORT_BACKEND.
+
+    'copy' — загрузка через COPY во временные таблицы PostgreSQL,
+    на других СУБД используется ORM-импортёр.
+    """
+    if settings.CATALOG_IMPORT_BACKEND == "copy" and connection.vendor == "postgresql":
+        from .pg_importer import CopyShopImporter
+
+        return CopyShopImporter(shop, batch_size)
+    return ShopImporter(shop, batch_size)
+
+
+class ImportDataError(Exception):
+    """
+    Ошибка в данных прайс-листа, из-за которой импорт прерывается.
+    """
+
+
+class ShopImporter:
+    """
+    Пакетная запись прайс-листа магазина в БД.
+
+    Категории, продукты и имена параметров разрешаются в памяти несколькими
+    запросами `SELECT ... IN`, а запись выполняется через `bulk_create`/`bulk_update`
+    пачками фиксированного размера. Число запросов на пачку не зависит
+    от количества товаров в ней.
+
+    Записываются только новые товары и товары с изменившимся отпечатком,
+    неизменённые пропускаются без обращения к их строкам и параметрам.
+
+    Пачки пишутся не в каталог, а в StagedProductInfo под номером следующей
+    версии каталога магазина, так что пока файл разбирается, читатели видят
+    прежний каталог. После записи всех пачек publish() переносит товары
+    в ProductInfo пачками, каждая своей транзакцией: атомарно обновляется
+    каждое предложение вместе с параметрами, но не каталог целиком — пока
+    идёт публикация, часть предложений уже новая. finish() затем одной
+    короткой транзакцией выводит отсутствующие товары и переключает
+    Shop.catalog_version. Товары обновляются на месте по (shop, external_id),
+    поэтому их ID не меняются между импортами.
+
+    Каждая пачка записывается независимо, поэтому импорт можно продолжить
+    с контрольной точки (resumable): уже записанные товары передаются
+    в skip_items, чтобы учесть их при выводе отсутствующих из каталога.
+    """
+
+    resumable = True
+
+    info_fields = (
+        "product",
+        "model",
+        "price",
+        "price_rrc",
+        "quantity",
+        "fingerprint",
+        "is_active",
+        "retired_at",
+        "parameters",
+        "document",
+        "updated_at",
+    )
+
+    staged_fields = (
+        "product",
+        "model",
+        "price",
+        "price_rrc",
+        "quantity",
+        "fingerprint",
+        "parameters",
+    )
+
+    def __init__(self, shop, batch_size=None):
+        self.shop = shop
+        self.batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+        # Версия каталога, которую готовит импорт
+        self.version = shop.catalog_version + 1
+        self.categories = {}
+        # Счётчики для отображения прогресса импорта
+        self.items_parsed = 0
+        self.items_written = 0
+        self.items_skipped = 0
+        self.items_created = 0
+        self.items_updated = 0
+        self.items_unchanged = 0
+        self.items_removed = 0
+        # external_id всех товаров прайс-листа для поиска удалённых
+        self.seen = set()
+        # Категории, переименованные прайс-листом: их название есть
+        # в поисковых векторах и документах предложений всех магазинов
+        self.renamed_categories = set()
+
+    def import_categories(self, categories):
+        """
+        Создаёт/обновляет категории одним upsert и привязывает их к магазину.
+        Если категории и привязки уже такие же, в БД ничего не пишется.
+        """
+        names = {}
+        for cat in categories:
+            if "id" not in cat or "name" not in cat:
+                raise ImportDataError(f"В категории отсутствует id или name: {cat}")
+            names[cat["id"]] = cat["name"]
+
+        if not names:
+            return
+
+        current = dict(
+            Category.objects.filter(external_id__in=names).values_list(
+                "external_id", "name"
+            )
+        )
+        renamed = [
+            external_id
+            for external_id, name in current.items()
+            if names[external_id] != name
+        ]
+        changed = [
+            Category(external_id=ext_id, name=name)
+            for ext_id, name in names.items()
+            if current.get(ext_id) != name
+        ]
+        if changed:
+            Category.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=["external_id"],
+                update_fields=["name"],
+                batch_size=self.batch_size,
+            )
+        self.categories = {
+            category.external_id: category
+            for category in Category.objects.filter(external_id__in=names)
+        }
+        self.renamed_categories.update(
+            self.categories[external_id].id for external_id in renamed
+        )
+
+        through = Category.shops.through
+        linked = set(
+            through.objects.filter(
+                shop_id=self.shop.id,
+                category_id__in=[category.id for category in self.categories.values()],
+            ).values_list("category_id", flat=True)
+        )
+        through.objects.bulk_create(
+            [
+                through(category_id=category.id, shop_id=self.shop.id)
+                for category in self.categories.values()
+                if category.id not in linked
+            ],
+            ignore_conflicts=True,
+            batch_size=self.batch_size,
+        )
+
+    def retire_missing(self):
+        """
+        Выводит из каталога ProductInfo магазина, которых нет в прайс-листе.
+        Строки не удаляются: их ID остаются стабильными, а окончательное
+        удаление выполняет команда purge_retired_products.
+        """
+        missing_ids = [
+            info_id
+            for info_id, external_id in ProductInfo.objects.filter(
+                shop=self.shop, is_active=True
+            ).values_list("id", "external_id")
+            if external_id not in self.seen
+        ]
+        retired_at = timezone.now()
+        for start in range(0, len(missing_ids), self.batch_size):
+            self.items_removed += ProductInfo.objects.filter(
+                id__in=missing_ids[start : start + self.batch_size]
+            ).update(is_active=False, retired_at=retired_at, updated_at=retired_at)
+
+    def reset_staged(self):
+        """
+        Удаляет подготовленные товары прерванных импортов, чтобы версия
+        собиралась заново.
+        """
+        StagedProductInfo.objects.filter(
+            shop=self.shop, version__gte=self.version
+        ).delete()
+
+    def lock_version(self):
+        """
+        Блокирует магазин до конца транзакции публикации и проверяет,
+        что версию каталога не опубликовал параллельный импорт.
+        """
+        published = (
+            Shop.objects.select_for_update()
+            .values_list("catalog_version", flat=True)
+            .get(pk=self.shop.pk)
+        )
+        if published != self.version - 1:
+            raise ImportDataError(
+                "Каталог магазина изменён параллельным импортом, повторите импорт"
+            )
+
+    def publish_version(self):
+        Shop.objects.filter(pk=self.shop.pk).update(catalog_version=self.version)
+        self.shop.catalog_version = self.version
+
+    def publish(self, progress=None):
+        """
+        Переносит подготовленные товары в ProductInfo пачками по batch_size,
+        каждая своей транзакцией, чтобы публикация большого прайс-листа
+        не держала блокировки одной длинной транзакцией. Перед каждой пачкой
+        проверяется, что версию не опубликовал параллельный импорт.
+
+        Подготовленные строки удаляются только после переключения версии,
+        поэтому прерванная публикация повторяется целиком при продолжении
+        импорта с контрольной точки (перенос — upsert, повтор безопасен).
+        progress вызывается после каждой пачки.
+        """
+        staged = StagedProductInfo.objects.filter(
+            shop=self.shop, version=self.version
+        ).order_by("pk")
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                self.lock_version()
+                rows = list(staged.filter(pk__gt=last_pk)[: self.batch_size])
+                if not rows:
+                    break
+                last_pk = rows[-1].pk
+                self.publish_batch(rows)
+                update_search_vectors({row.product_id for row in rows})
+            if progress:
+                progress(self)
+        with transaction.atomic():
+            self.refresh_renamed_categories()
+
+    def finish(self):
+        """
+        Завершает публикацию после publish(): выводит из каталога
+        отсутствующие товары и переключает Shop.catalog_version.
+        Должен выполняться в транзакции вместе с сохранением магазина.
+        """
+        self.lock_version()
+        self.retire_missing()
+        self.publish_version()
+
+    def refresh_renamed_categories(self):
+        """
+        Обновляет поисковые векторы и документы предложений
+        в переименованных категориях.
+        """
+        if not self.renamed_categories:
+            return
+        update_search_vectors(
+            Product.objects.filter(category_id__in=self.renamed_categories).values_list(
+                "id", flat=True
+            )
+        )
+        render_product_info_documents(
+            ProductInfo.objects.filter(
+                product__category_id__in=self.renamed_categories
+            ).values_list("id", flat=True)
+        )
+
+    def publish_batch(self, rows):
+        """
+        Переносит пачку подготовленных товаров в ProductInfo.
+        """
+        parameter_ids = {
+            int(parameter_id) for row in rows for parameter_id in row.parameters
+        }
+        names = dict(
+            Parameter.objects.filter(id__in=parameter_ids).values_list("id", "name")
+        )
+        products = {
+            product["id"]: product
+            for product in Product.objects.filter(
+                id__in={row.product_id for row in rows}
+            ).values("id", "name", "category__name")
+        }
+
+        infos = []
+        for row in rows:
+            product = products[row.product_id]
+            parameters = {
+                names[int(parameter_id)]: value
+                for parameter_id, value in row.parameters.items()
+            }
+            document = dump_document(
+                {
+                    "model": row.model,
+                    "product__name": product["name"],
+                    "product__category__name": product["category__name"],
+                    "shop_id": self.shop.id,
+                    "parameters": parameters,
+                }
+            )
+            infos.append(
+                ProductInfo(
+                    shop=self.shop,
+                    external_id=row.external_id,
+                    product_id=row.product_id,
+                    model=row.model,
+                    price=row.price,
+                    price_rrc=row.price_rrc,
+                    quantity=row.quantity,
+                    fingerprint=row.fingerprint,
+                    is_active=True,
+                    retired_at=None,
+                    parameters=parameters,
+                    document=document,
+                )
+            )
+        infos = ProductInfo.objects.bulk_create(
+            infos,
+            update_conflicts=True,
+            unique_fields=["shop", "external_id"],
+            update_fields=self.info_fields,
+            batch_size=self.batch_size,
+        )
+
+        # Пересоздаём параметры изменившихся товаров — структура могла измениться
+        ProductParameter.objects.filter(
+            product_info_id__in=[info.id for info in infos]
+        ).delete()
+        parameters = {row.external_id: row.parameters for row in rows}
+        ProductParameter.objects.bulk_create(
+            [
+                ProductParameter(
+                    product_info_id=info.id,
+                    parameter_id=int(parameter_id),
+                    value=value,
+                )
+                for info in infos
+                for parameter_id, value in parameters[info.external_id].items()
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def skip_items(self, items):
+        """
+        Учитывает товары, записанные до прерванного импорта, не обращаясь к БД.
+        """
+        self.seen.update(item["id"] for item in items)
+        self.items_parsed += len(items)
+        self.items_skipped += len(items)
+
+    def validate_item(self, item):
+        if not GOODS_REQUIRED_FIELDS.issubset(item.keys()):
+            missing = GOODS_REQUIRED_FIELDS - set(item.keys())
+            raise ImportDataError(f"В товаре отсутствуют поля: {missing}")
+
+        cat_id = item.get("category")
+        if cat_id not in self.categories:
+            raise ImportDataError(
+                f"Категория с external_id={cat_id} не объявлена в разделе categories"
+            )
+
+    def write_batch(self, items):
+        """
+        Подготавливает пачку товаров фиксированным числом запросов.
+        """
+        # Повтор external_id в пачке: последнее вхождение перекрывает предыдущие,
+        # как это было при построчном update_or_create
+        goods = {}
+        for item in items:
+            self.validate_item(item)
+            goods[item["id"]] = item
+        self.items_parsed += len(items)
+        self.items_skipped += len(items) - len(goods)
+        self.seen.update(goods)
+
+        existing = {
+            info.external_id: info
+            for info in ProductInfo.objects.filter(
+                shop=self.shop, external_id__in=goods
+            ).only("external_id", "fingerprint", "is_active")
+        }
+
+        fingerprints = {
+            ext_id: item_fingerprint(item) for ext_id, item in goods.items()
+        }
+        changed = {}
+        updated = 0
+        for ext_id, item in goods.items():
+            info = existing.get(ext_id)
+            if info is not None:
+                # Выведенный из каталога товар вернулся — его нужно восстановить
+                if info.is_active and info.fingerprint == fingerprints[ext_id]:
+                    continue
+                updated += 1
+            changed[ext_id] = item
+
+        self.items_unchanged += len(goods) - len(changed)
+        self.items_skipped += len(goods) - len(changed)
+        if not changed:
+            return
+
+        products = self._resolve_products(changed.values())
+        parameters = self._resolve_parameters(changed.values())
+        StagedProductInfo.objects.bulk_create(
+            [
+                StagedProductInfo(
+                    shop=self.shop,
+                    version=self.version,
+                    external_id=ext_id,
+                    product_id=products[self._product_key(item)],
+                    model=item.get("model", ""),
+                    price=item["price"],
+                    price_rrc=item["price_rrc"],
+                    quantity=item["quantity"],
+                    fingerprint=fingerprints[ext_id],
+                    parameters={
+                        str(parameters[name]): str(value)
+                        for name, value in item.get("parameters", {}).items()
+                    },
+                )
+                for ext_id, item in changed.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["shop", "version", "external_id"],
+            update_fields=self.staged_fields,
+            batch_size=self.batch_size,
+        )
+        self.items_created += len(changed) - updated
+        self.items_updated += updated
+        self.items_written += len(changed)
+
+    def result(self):
+        """
+        Итоговые счётчики импорта.
+        """
+        return {
+            "created": self.items_created,
+            "updated": self.items_updated,
+            "unchanged": self.items_unchanged,
+            "removed": self.items_removed,
+        }
+
+    def _product_key(self, item):
+        return item["name"], self.categories[item["category"]].id
+
+    def _resolve_products(self, items):
+        """
+        Возвращает словарь (name, category_id) -> product_id, создавая недостающие.
+        """
+        keys = {self._product_key(item) for item in items}
+        products = {}
+        for product in Product.objects.filter(
+            name__in={name for name, _ in keys},
+            category_id__in={category_id for _, category_id in keys},
+        ).order_by("id"):
+            products.setdefault((product.name, product.category_id), product.id)
+
+        missing = [
+            Product(name=name, category_id=category_id)
+            for name, category_id in keys
+            if (name, category_id) not in products
+        ]
+        for product in Product.objects.bulk_create(missing, batch_size=self.batch_size):
+            products[(product.name, product.category_id)] = product.id
+        return products
+
+    def _resolve_parameters(self, items):
+        """
+        Возвращает словарь name -> parameter_id, создавая недостающие параметры.
+        """
+        names = {name for item in items for name in item.get("parameters", {})}
+        parameters = {}
+        if not names:
+            return parameters
+
+        for parameter in Parameter.objects.filter(name__in=names).order_by("id"):
+            parameters.setdefault(parameter.name, parameter.id)
+
+        missing = [Parameter(name=name) for name in names if name not in parameters]
+        for parameter in Parameter.objects.bulk_create(
+            missing, batch_size=self.batch_size
+        ):
+            parameters[parameter.name] = parameter.id
+        return parameters
@@ -0,0 +1,80 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalog.benchmark import run_benchmark
+
+
+class Command(BaseCommand):
+    """
+    Замер производительности импорта прайс-листов на синтетических данных.
+    """
+
+    help = (
+        "Импортирует синтетические прайс-листы через локальный HTTP-сервер "
+        "и выводит время, число запросов, пиковый RSS и скорость в JSON. "
+        "Запускать только на тестовой БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="10,10000,100000,1000000",
+            help="Размеры прайс-листов в товарах через запятую",
+        )
+        parser.add_argument(
+            "--params", type=int, default=5, help="Число параметров у товара"
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=2,
+            help="Число импортов подряд для каждого размера",
+        )
+        parser.add_argument(
+            "--overlap",
+            type=float,
+            default=0.9,
+            help="Доля неизменённых товаров между прогонами (0..1)",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--format", choices=("yaml", "json"), default="yaml")
+        parser.add_argument(
+            "--output", help="Файл для итогового JSON (по умолчанию stdout)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes должен быть списком целых чисел")
+        if not 0 <= options["overlap"] <= 1:
+            raise CommandError("--overlap должен быть от 0 до 1")
+
+        def progress(measurement):
+            self.stderr.write(
+                f"{measurement['goods']} товаров, прогон {measurement['run']}: "
+                f"{measurement['wall_time']:.2f} с, "
+                f"{measurement['queries']} запросов, "
+                f"{measurement['peak_rss_kb'] // 1024} МБ"
+            )
+
+        with tempfile.TemporaryDirectory(prefix="benchmark-") as directory:
+            report = run_benchmark(
+                directory,
+                sizes,
+                params=options["params"],
+                runs=options["runs"],
+                overlap=options["overlap"],
+                seed=options["seed"],
+                format=options["format"],
+                progress=progress,
+            )
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.feed_files import update_feed_files
+
+
+class Command(BaseCommand):
+    """
+    Обновление статических файлов каталога.
+    """
+
+    help = (
+        "Записывает файлы каталога магазинов, изменившихся с прошлого раза, "
+        "и общий файл каталога (JSON, NDJSON, YAML)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Пересобрать файлы всех магазинов"
+        )
+
+    def handle(self, *args, **options):
+        updated = update_feed_files(force=options["force"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Обновлены файлы магазинов: {len(updated)}")
+        )
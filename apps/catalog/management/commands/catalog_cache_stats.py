@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Представления регистрируют кэш ответов при импорте модуля
+import apps.catalog.views  # noqa: F401
+from apps.catalog.cache import (
+    bump_catalog_version,
+    cache_stats,
+    cache_stats_are_shared,
+    reset_cache_stats,
+)
+
+
+class Command(BaseCommand):
+    """
+    Статистика кэша ответов каталога. Счётчики хранятся в кэше, поэтому
+    команда видит счётчики веб-процессов только при общем бэкенде кэша.
+    """
+
+    help = (
+        "Выводит в JSON число попаданий и промахов кэша ответов каталога "
+        "по представлениям"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Обнулить счётчики после вывода"
+        )
+        parser.add_argument(
+            "--invalidate",
+            action="store_true",
+            help="Сбросить весь кэш ответов каталога",
+        )
+
+    def handle(self, *args, **options):
+        shared = cache_stats_are_shared()
+        if not shared and not options["invalidate"]:
+            raise CommandError(
+                "Кэш хранится в памяти процесса (CACHE_BACKEND), счётчики "
+                "веб-процессов команде не видны: задайте общий бэкенд кэша, "
+                "например Redis"
+            )
+        if shared:
+            self.stdout.write(json.dumps(cache_stats(), ensure_ascii=False, indent=2))
+            if options["reset"]:
+                reset_cache_stats()
+        if options["invalidate"]:
+            bump_catalog_version()
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from apps.catalog.services import collect_staged_product_infos
+
+
+class Command(BaseCommand):
+    """
+    Очистка подготовленных данных опубликованных версий каталога.
+    """
+
+    help = "Удаляет StagedProductInfo уже опубликованных версий каталога магазинов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Размер пачки удаления",
+        )
+
+    def handle(self, *args, **options):
+        collected = collect_staged_product_infos(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Удалено записей: {collected}"))
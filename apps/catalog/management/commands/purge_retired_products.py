@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.catalog.services import purge_retired_product_infos
+
+
+class Command(BaseCommand):
+    """
+    Удаление выведенных из каталога товаров без заказов.
+    """
+
+    help = "Удаляет выведенные из каталога ProductInfo, на которые нет заказов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=0,
+            help="Удалять только товары, выведенные больше указанного числа дней назад",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Размер пачки удаления",
+        )
+
+    def handle(self, *args, **options):
+        retired_before = None
+        if options["older_than"]:
+            retired_before = timezone.now() - timedelta(days=options["older_than"])
+
+        purged = purge_retired_product_infos(
+            retired_before=retired_before, batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Удалено товаров: {purged}"))
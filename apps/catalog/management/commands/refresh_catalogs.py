@@ -0,0 +1,106 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from apps.catalog.refresh import get_refresh_shops, refresh_catalogs
+
+SUMMARY_COUNTERS = ("created", "updated", "unchanged", "removed")
+
+
+class Command(BaseCommand):
+    """
+    Параллельное обновление каталогов всех активных магазинов из прайс-листов.
+    """
+
+    help = "Повторно импортирует прайс-листы активных магазинов по Shop.url"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Число процессов разбора и записи в БД",
+        )
+        parser.add_argument(
+            "--download-concurrency",
+            type=int,
+            default=8,
+            help="Число одновременных загрузок",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=int,
+            default=600,
+            help="Время в секундах на загрузку и импорт одного магазина "
+            "(импорт проверяет его между пачками)",
+        )
+        parser.add_argument(
+            "--changed-only",
+            action="store_true",
+            help="Импортировать только изменившиеся прайс-листы (ETag/Last-Modified/sha256)",
+        )
+        parser.add_argument(
+            "--shop",
+            type=int,
+            action="append",
+            dest="shop_ids",
+            help="ID магазина (можно указать несколько раз)",
+        )
+        parser.add_argument(
+            "--json",
+            action="store_true",
+            help="Вывести итоги в формате JSON",
+        )
+
+    def handle(self, *args, **options):
+        shops = get_refresh_shops(options["shop_ids"])
+        if not shops:
+            self.stdout.write("Нет магазинов для обновления")
+            return
+
+        results = refresh_catalogs(
+            shops,
+            concurrency=options["concurrency"],
+            download_concurrency=options["download_concurrency"],
+            timeout=options["timeout"],
+            changed_only=options["changed_only"],
+        )
+        results.sort(key=lambda result: result.get("shop_id", 0))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+
+        for result in results:
+            line = (
+                f"{result.get('shop', '?')}: {result['status']}, "
+                f"загрузка {result.get('download_time', 0):.2f} с, "
+                f"импорт {result.get('import_time', 0):.2f} с"
+            )
+            if result["status"] == "imported":
+                line += ", " + ", ".join(
+                    f"{counter} {result[counter]}" for counter in SUMMARY_COUNTERS
+                )
+                self.stdout.write(self.style.SUCCESS(line))
+            elif result["status"] == "unchanged":
+                self.stdout.write(line)
+            elif result["status"] == "busy":
+                self.stdout.write(f"{line}: {result['error']}")
+            else:
+                # Первые ошибки проверки прайс-листа, остальные — в --json
+                errors = "; ".join([result["error"], *result.get("errors", [])[:5]])
+                self.stdout.write(self.style.ERROR(f"{line}: {errors}"))
+
+        statuses = [result["status"] for result in results]
+        totals = ", ".join(
+            f"{counter} {sum(result.get(counter, 0) for result in results)}"
+            for counter in SUMMARY_COUNTERS
+        )
+        self.stdout.write(
+            f"Магазинов: {len(results)}, импортировано {statuses.count('imported')}, "
+            f"без изменений {statuses.count('unchanged')}, "
+            f"пропущено {statuses.count('busy')}, "
+            f"с ошибкой {len(results) - statuses.count('imported') - statuses.count('unchanged') - statuses.count('busy')}; "
+            f"товаров: {totals}"
+        )
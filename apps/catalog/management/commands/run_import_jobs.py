@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.catalog.models import ImportStatus
+from apps.catalog.services import (
+    claim_import_job,
+    collect_staged_product_infos,
+    run_import_job,
+)
+from apps.catalog.uploads import delete_stale_uploads
+
+
+class Command(BaseCommand):
+    """
+    Фоновый обработчик очереди импорта прайс-листов.
+    """
+
+    help = "Выполняет задания импорта прайс-листов из очереди"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать все задания в очереди и завершиться",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Пауза в секундах между проверками пустой очереди",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_import_job()
+            if job is None:
+                # Пока очередь пуста, убираем данные опубликованных версий
+                # каталога и брошенные загрузки прайс-листов
+                collect_staged_product_infos()
+                delete_stale_uploads()
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+                continue
+
+            source = job.url or f"загруженный файл {job.upload}"
+            self.stdout.write(f"Импорт #{job.pk}: {source}")
+            job = run_import_job(job)
+            if job.status == ImportStatus.DONE:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Импорт #{job.pk} завершён: записано {job.items_written}"
+                    )
+                )
+            else:
+                self.stdout.write(
+                    self.style.ERROR(
+                        f"Импорт #{job.pk} завершён с ошибкой: {job.error}"
+                    )
+                )
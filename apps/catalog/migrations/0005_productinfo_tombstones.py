@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_feed_fingerprints'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='productinfo',
+            name='unique_product_info',
+        ),
+        migrations.AddField(
+            model_name='productinfo',
+            name='is_active',
+            field=models.BooleanField(default=True, verbose_name='В каталоге'),
+        ),
+        migrations.AddField(
+            model_name='productinfo',
+            name='retired_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Выведен из каталога'),
+        ),
+        migrations.AddIndex(
+            model_name='productinfo',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['shop', 'product'], name='productinfo_active_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productinfo',
+            constraint=models.UniqueConstraint(fields=('shop', 'external_id'), name='unique_shop_external_id'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("catalog", "0005_productinfo_tombstones"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shop",
+            name="import_checkpoint_hash",
+            field=models.CharField(
+                blank=True, max_length=64, verbose_name="Хеш прерванного прайс-листа"
+            ),
+        ),
+        migrations.AddField(
+            model_name="shop",
+            name="import_checkpoint_offset",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Записано товаров прерванного прайс-листа"
+            ),
+        ),
+    ]
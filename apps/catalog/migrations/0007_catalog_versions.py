@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_shop_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='catalog_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версия каталога'),
+        ),
+        migrations.CreateModel(
+            name='StagedProductInfo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(verbose_name='Версия каталога')),
+                ('external_id', models.PositiveIntegerField(verbose_name='Внешний ИД')),
+                ('model', models.CharField(blank=True, max_length=80, verbose_name='Модель')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Количество')),
+                ('price', models.PositiveIntegerField(verbose_name='Цена')),
+                ('price_rrc', models.PositiveIntegerField(verbose_name='Рекомендуемая розничная цена')),
+                ('fingerprint', models.CharField(blank=True, max_length=40, verbose_name='Отпечаток товара из прайс-листа')),
+                ('parameters', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='staged_product_infos', to='catalog.product', verbose_name='Продукт')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='staged_product_infos', to='catalog.shop', verbose_name='Магазин')),
+            ],
+            options={
+                'verbose_name': 'Подготовленный товар',
+                'verbose_name_plural': 'Подготовленные товары',
+                'constraints': [models.UniqueConstraint(fields=('shop', 'version', 'external_id'), name='unique_staged_product_info')],
+            },
+        ),
+    ]
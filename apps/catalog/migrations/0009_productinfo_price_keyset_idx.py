@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_feed_uploads'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productinfo',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price', 'id'], name='productinfo_price_keyset_idx'),
+        ),
+    ]
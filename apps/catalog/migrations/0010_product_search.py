@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:58
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+# Индексы и заполнение поискового вектора нужны только на PostgreSQL,
+# на других СУБД поиск идёт по подстроке названия
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX product_search_vector_idx ON catalog_product "
+    "USING gin (search_vector)",
+    "CREATE INDEX product_name_trgm_idx ON catalog_product "
+    "USING gin (name gin_trgm_ops)",
+]
+
+FILL_SQL = (
+    "UPDATE catalog_product p SET search_vector = "
+    "setweight(to_tsvector(%(config)s::regconfig, p.name), 'A') || "
+    "setweight(to_tsvector(%(config)s::regconfig, c.name), 'B') || "
+    "setweight(to_tsvector(%(config)s::regconfig, coalesce(("
+    "SELECT string_agg(DISTINCT pi.model, ' ') FROM catalog_productinfo pi "
+    "WHERE pi.product_id = p.id), '')), 'B') || "
+    "setweight(to_tsvector(%(config)s::regconfig, coalesce(("
+    "SELECT string_agg(DISTINCT pp.value, ' ') FROM catalog_productparameter pp "
+    "JOIN catalog_productinfo pi ON pi.id = pp.product_info_id "
+    "WHERE pi.product_id = p.id), '')), 'C') "
+    "FROM catalog_category c WHERE c.id = p.category_id"
+)
+
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS product_name_trgm_idx",
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in FORWARD_SQL:
+        schema_editor.execute(sql)
+    schema_editor.execute(FILL_SQL, {"config": settings.CATALOG_SEARCH_CONFIG})
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in BACKWARD_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_productinfo_price_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:01
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_parameters(apps, schema_editor):
+    """
+    Переносит параметры предложений из EAV-таблиц в JSON-колонку.
+    """
+    ProductInfo = apps.get_model("catalog", "ProductInfo")
+    ProductParameter = apps.get_model("catalog", "ProductParameter")
+    ids = ProductInfo.objects.filter(product_parameters__isnull=False).distinct()
+    ids = list(ids.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        documents = {pk: {} for pk in ids[start : start + BATCH_SIZE]}
+        for info_id, name, value in ProductParameter.objects.filter(
+            product_info_id__in=documents
+        ).values_list("product_info_id", "parameter__name", "value"):
+            documents[info_id][name] = value
+        ProductInfo.objects.bulk_update(
+            [ProductInfo(pk=pk, parameters=doc) for pk, doc in documents.items()],
+            ["parameters"],
+        )
+
+
+# GIN-индекс для фильтров по вхождению (@>) есть только в PostgreSQL
+def create_parameters_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX productinfo_parameters_idx ON catalog_productinfo "
+        "USING gin (parameters jsonb_path_ops)"
+    )
+
+
+def drop_parameters_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS productinfo_parameters_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_productparameter_value_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productinfo',
+            name='parameters',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Параметры'),
+        ),
+        migrations.RunPython(fill_parameters, migrations.RunPython.noop),
+        migrations.RunPython(create_parameters_index, drop_parameters_index),
+    ]
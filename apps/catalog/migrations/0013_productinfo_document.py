@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:03
+
+import json
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_documents(apps, schema_editor):
+    """
+    Собирает документы уже существующих предложений.
+    """
+    ProductInfo = apps.get_model("catalog", "ProductInfo")
+    ids = list(ProductInfo.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(ids), BATCH_SIZE):
+        infos = ProductInfo.objects.filter(pk__in=ids[start : start + BATCH_SIZE])
+        documents = []
+        for info in infos.values(
+            "pk",
+            "model",
+            "product__name",
+            "product__category__name",
+            "shop_id",
+            "parameters",
+        ):
+            document = {
+                "model": info["model"],
+                "product": {
+                    "name": info["product__name"],
+                    "category": info["product__category__name"],
+                },
+                "shop": info["shop_id"],
+                "product_parameters": [
+                    {"parameter": name, "value": info["parameters"][name]}
+                    for name in sorted(info["parameters"])
+                ],
+            }
+            documents.append(
+                ProductInfo(
+                    pk=info["pk"],
+                    document=json.dumps(
+                        document, ensure_ascii=False, separators=(",", ":")
+                    ),
+                )
+            )
+        ProductInfo.objects.bulk_update(documents, ["document"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_productinfo_parameters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productinfo',
+            name='document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Документ для выдачи'),
+        ),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_productinfo_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=40, unique=True, verbose_name='Область')),
+                ('version', models.BigIntegerField(verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия кэша каталога',
+                'verbose_name_plural': 'Версии кэша каталога',
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from apps.users.models import User
 
@@ -18,6 +19,29 @@ class Shop(models.Model):
         on_delete=models.CASCADE,
     )
     state = models.BooleanField(verbose_name="статус получения заказов", default=True)
+    # Валидаторы последнего успешно импортированного прайс-листа
+    feed_etag = models.CharField(
+        verbose_name="ETag прайс-листа", max_length=255, blank=True
+    )
+    feed_last_modified = models.CharField(
+        verbose_name="Last-Modified прайс-листа", max_length=64, blank=True
+    )
+    feed_hash = models.CharField(
+        verbose_name="Хеш прайс-листа", max_length=64, blank=True
+    )
+    # Контрольная точка незавершённого импорта: хеш файла и число
+    # уже записанных товаров, с которого импорт продолжится после сбоя
+    import_checkpoint_hash = models.CharField(
+        verbose_name="Хеш прерванного прайс-листа", max_length=64, blank=True
+    )
+    import_checkpoint_offset = models.PositiveIntegerField(
+        verbose_name="Записано товаров прерванного прайс-листа", default=0
+    )
+    # Опубликованная версия каталога магазина. Импорт готовит следующую
+    # версию в StagedProductInfo и публикует её одной транзакцией
+    catalog_version = models.PositiveIntegerField(
+        verbose_name="Версия каталога", default=0
+    )
 
     class Meta:
         verbose_name = "Магазин"
@@ -64,6 +88,10 @@ class Product(models.Model):
         blank=True,
         on_delete=models.CASCADE,
     )
+    # Заполняется при импорте только на PostgreSQL (см. search.update_search_vectors)
+    search_vector = SearchVectorField(
+        null=True, editable=False, verbose_name="Поисковый вектор"
+    )
 
     class Meta:
         verbose_name = "Продукт"
@@ -99,13 +127,93 @@ class ProductInfo(models.Model):
     quantity = models.PositiveIntegerField(verbose_name="Количество")
     price = models.PositiveIntegerField(verbose_name="Цена")
     price_rrc = models.PositiveIntegerField(verbose_name="Рекомендуемая розничная цена")
+    fingerprint = models.CharField(
+        verbose_name="Отпечаток товара из прайс-листа", max_length=40, blank=True
+    )
+    # Товар, пропавший из прайс-листа, не удаляется, а выводится из каталога:
+    # его ID остаётся стабильным для корзин и заказов
+    is_active = models.BooleanField(verbose_name="В каталоге", default=True)
+    retired_at = models.DateTimeField(
+        verbose_name="Выведен из каталога", null=True, blank=True
+    )
+    # Копия ProductParameter вида {название параметра: значение} для выдачи
+    # без обращения к EAV-таблицам; пишется импортом и при правке в админке
+    parameters = models.JSONField(
+        verbose_name="Параметры", default=dict, blank=True, editable=False
+    )
+    # Готовый JSON предложения без остатка и цен (см. documents.py):
+    # список товаров склеивается из этих документов без сериализации полей
+    document = models.TextField(
+        verbose_name="Документ для выдачи", blank=True, editable=False
+    )
+    # Время последнего изменения предложения — валидатор условных GET
+    # заказов. Массовые update() и SQL-импорт выставляют его явно
+    updated_at = models.DateTimeField(verbose_name="Изменено", auto_now=True)
 
     class Meta:
         verbose_name = "Информация о продукте"
         verbose_name_plural = "Информационный список о продуктах"
         constraints = [
             models.UniqueConstraint(
-                fields=["product", "shop", "external_id"], name="unique_product_info"
+                fields=["shop", "external_id"], name="unique_shop_external_id"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["shop", "product"],
+                condition=models.Q(is_active=True),
+                name="productinfo_active_idx",
+            ),
+            # Постраничная выдача каталога по курсору сортирует по (price, id)
+            models.Index(
+                fields=["price", "id"],
+                condition=models.Q(is_active=True),
+                name="productinfo_price_keyset_idx",
+            ),
+        ]
+
+
+class StagedProductInfo(models.Model):
+    """
+    Изменённый или новый товар следующей версии каталога магазина.
+
+    Импорт записывает сюда пачки товаров, не затрагивая видимый каталог,
+    а публикация переносит их в ProductInfo одной транзакцией.
+    Строки опубликованных версий удаляет команда gc_catalog_versions.
+    """
+
+    objects = models.manager.Manager()
+    shop = models.ForeignKey(
+        Shop,
+        verbose_name="Магазин",
+        related_name="staged_product_infos",
+        on_delete=models.CASCADE,
+    )
+    version = models.PositiveIntegerField(verbose_name="Версия каталога")
+    external_id = models.PositiveIntegerField(verbose_name="Внешний ИД")
+    product = models.ForeignKey(
+        Product,
+        verbose_name="Продукт",
+        related_name="staged_product_infos",
+        on_delete=models.CASCADE,
+    )
+    model = models.CharField(max_length=80, verbose_name="Модель", blank=True)
+    quantity = models.PositiveIntegerField(verbose_name="Количество")
+    price = models.PositiveIntegerField(verbose_name="Цена")
+    price_rrc = models.PositiveIntegerField(verbose_name="Рекомендуемая розничная цена")
+    fingerprint = models.CharField(
+        verbose_name="Отпечаток товара из прайс-листа", max_length=40, blank=True
+    )
+    # ID параметра -> значение
+    parameters = models.JSONField(verbose_name="Параметры", default=dict, blank=True)
+
+    class Meta:
+        verbose_name = "Подготовленный товар"
+        verbose_name_plural = "Подготовленные товары"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["shop", "version", "external_id"],
+                name="unique_staged_product_info",
             ),
         ]
 
@@ -157,3 +265,135 @@ class ProductParameter(models.Model):
                 fields=["product_info", "parameter"], name="unique_product_parameter"
             ),
         ]
+        indexes = [
+            # Фильтры и фасеты по значениям параметров
+            models.Index(
+                fields=["parameter", "value", "product_info"],
+                name="productparameter_value_idx",
+            ),
+        ]
+
+
+class ImportStatus(models.TextChoices):
+    QUEUED = "queued", "В очереди"
+    RUNNING = "running", "Выполняется"
+    DONE = "done", "Завершён"
+    FAILED = "failed", "Ошибка"
+
+
+class UploadStatus(models.TextChoices):
+    UPLOADING = "uploading", "Загружается"
+    COMPLETE = "complete", "Загружен"
+
+
+class FeedUpload(models.Model):
+    """
+    Прайс-лист, загружаемый магазином напрямую (одним multipart-запросом
+    или частями через PUT с Content-Range). Файл хранится в
+    CATALOG_UPLOAD_DIR и может быть сжат gzip/bz2/xz.
+    """
+
+    objects = models.manager.Manager()
+    user = models.ForeignKey(
+        User,
+        verbose_name="Пользователь",
+        related_name="feed_uploads",
+        on_delete=models.CASCADE,
+    )
+    filename = models.CharField(verbose_name="Имя файла", max_length=255)
+    size = models.PositiveBigIntegerField(verbose_name="Размер", null=True, blank=True)
+    received = models.PositiveBigIntegerField(verbose_name="Получено байт", default=0)
+    hash = models.CharField(verbose_name="Хеш файла", max_length=64, blank=True)
+    status = models.CharField(
+        verbose_name="Статус",
+        choices=UploadStatus.choices,
+        max_length=10,
+        default=UploadStatus.UPLOADING,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Загрузка прайс-листа"
+        verbose_name_plural = "Список загрузок прайс-листов"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
+class ImportJob(models.Model):
+    """
+    Задание на импорт прайс-листа магазина.
+    Выполняется фоновым обработчиком (команда run_import_jobs).
+    """
+
+    objects = models.manager.Manager()
+    user = models.ForeignKey(
+        User,
+        verbose_name="Пользователь",
+        related_name="import_jobs",
+        on_delete=models.CASCADE,
+    )
+    url = models.URLField(verbose_name="Ссылка", blank=True)
+    # Загруженный файл вместо URL
+    upload = models.ForeignKey(
+        FeedUpload,
+        verbose_name="Загруженный файл",
+        related_name="import_jobs",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
+    status = models.CharField(
+        verbose_name="Статус",
+        choices=ImportStatus.choices,
+        max_length=10,
+        default=ImportStatus.QUEUED,
+    )
+    items_parsed = models.PositiveIntegerField(verbose_name="Разобрано", default=0)
+    items_written = models.PositiveIntegerField(verbose_name="Записано", default=0)
+    items_skipped = models.PositiveIntegerField(verbose_name="Пропущено", default=0)
+    result = models.JSONField(verbose_name="Итог импорта", default=dict, blank=True)
+    error = models.TextField(verbose_name="Ошибка", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Задание импорта"
+        verbose_name_plural = "Список заданий импорта"
+        ordering = ("-created_at",)
+        constraints = [
+            # Не более одного задания в очереди и одного выполняемого на магазин
+            models.UniqueConstraint(
+                fields=["user", "status"],
+                condition=models.Q(
+                    status__in=[ImportStatus.QUEUED, ImportStatus.RUNNING]
+                ),
+                name="unique_active_import_job",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.url or self.upload} ({self.status})"
+
+
+class CatalogCacheVersion(models.Model):
+    """
+    Версия области кэша ответов каталога (см. cache.py): общая, всех
+    магазинов или отдельного магазина. Хранится в БД, чтобы смену версии
+    видели все процессы, а не только тот, что её выполнил.
+    """
+
+    objects = models.manager.Manager()
+    scope = models.CharField(verbose_name="Область", max_length=40, unique=True)
+    version = models.BigIntegerField(verbose_name="Версия")
+
+    class Meta:
+        verbose_name = "Версия кэша каталога"
+        verbose_name_plural = "Версии кэша каталога"
+
+    def __str__(self):
+        return f"{self.scope}: {self.version}"
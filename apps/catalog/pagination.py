@@ -0,0 +1,207 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничный вывод по ключу (keyset) для стабильной сортировки (ключ, id).
+
+    Следующая страница выбирается условием «после последней строки
+    предыдущей», а не OFFSET, и общее число строк не считается, поэтому
+    глубокие страницы стоят столько же, сколько первая. Курсоры next/previous
+    непрозрачны: это base64 от позиции и направления.
+
+    orderings задаёт допустимые значения параметра ordering: имя -> поле
+    сортировки; '-' перед именем сортирует по убыванию.
+    """
+
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    orderings = {}
+    default_ordering = "id"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        field = self.get_ordering_field(self.ordering)
+        descending = self.ordering.startswith("-")
+        position, reverse = self.decode_cursor(request, queryset, field)
+
+        # Для предыдущей страницы выбираем в обратном порядке и разворачиваем
+        backwards = descending != reverse
+        order = ("-" if backwards else "") + field
+        order_id = ("-" if backwards else "") + "id"
+        queryset = queryset.order_by(order, order_id)
+        if position is not None:
+            value, pk = position
+            lookup = "lt" if backwards else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{field}__{lookup}": value})
+                | Q(**{field: value, f"id__{lookup}": pk})
+            )
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.field = field
+        # В направлении выборки есть ещё строки; в обратном — есть, если пришли по курсору
+        if reverse:
+            self.has_previous, self.has_next = has_more, position is not None
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.rows = rows
+        return rows
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE
+        value = request.query_params.get(self.page_size_query_param)
+        if value:
+            try:
+                page_size = int(value)
+            except ValueError:
+                raise ValidationError({"page_size": "Ожидается целое число"})
+            if page_size <= 0:
+                raise ValidationError({"page_size": "Ожидается число больше 0"})
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request):
+        return request.query_params.get(
+            self.ordering_query_param, self.default_ordering
+        )
+
+    def get_ordering_field(self, ordering):
+        field = self.orderings.get(ordering.removeprefix("-"))
+        if field is None:
+            choices = ", ".join(sorted(self.orderings))
+            raise ValidationError({"ordering": f"Допустимые значения: {choices}"})
+        return field
+
+    def get_key(self, row):
+        value = row
+        for part in self.field.split("__"):
+            value = getattr(value, part)
+        return [value, row.id]
+
+    def encode_cursor(self, position, reverse):
+        data = {"p": position, "o": self.ordering}
+        if reverse:
+            data["r"] = 1
+        token = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_ordering_output_field(self, queryset, field):
+        """
+        Поле модели или аннотации (например, relevance при поиске),
+        по которому идёт сортировка.
+        """
+        annotation = queryset.query.annotations.get(field)
+        if annotation is not None:
+            return annotation.output_field
+        model = queryset.model
+        *relations, name = field.split("__")
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def decode_cursor(self, request, queryset, field):
+        """
+        Позиция и направление из курсора. Курсор приходит от клиента, поэтому
+        проверяются состав, типы и то, что значение ключа приводится к полю
+        сортировки; любой другой курсор — ошибка 400.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode()))
+            if type(data) is not dict or not data.keys() <= {"p", "o", "r"}:
+                raise ValueError
+            value, pk = data["p"]
+            if (
+                data["o"] != self.ordering
+                or type(pk) is not int
+                or data.get("r", 1) != 1
+                or type(value) not in (int, float, str)
+            ):
+                raise ValueError
+            value = self.get_ordering_output_field(queryset, field).to_python(value)
+        except (
+            binascii.Error,
+            ValueError,
+            KeyError,
+            TypeError,
+            DjangoValidationError,
+            FieldDoesNotExist,
+        ):
+            raise ValidationError({self.cursor_query_param: "Неверный курсор"})
+        return (value, pk), "r" in data
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.get_key(self.rows[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.rows:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.encode_cursor(self.get_key(self.rows[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_json(self, results, **extra):
+        """
+        Тело ответа get_paginated_response в байтах, когда results — уже
+        готовый JSON-массив: он вставляется как есть, без разбора.
+        Остальные ключи кодирует JSONRenderer, как в обычном ответе DRF.
+        """
+        data = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            **extra,
+        }
+        head = JSONRenderer().render(data)[:-1]
+        return head + b',"results":' + results + b"}"
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class ProductInfoPagination(KeysetPagination):
+    orderings = {"id": "id", "price": "price", "name": "product__name"}
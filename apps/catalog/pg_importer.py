@@ -0,0 +1,261 @@
+import io
+
+from django.db import connection
+
+from .importer import ShopImporter, item_fingerprint
+from .models import Parameter, Product, ProductInfo, ProductParameter
+from .documents import render_product_info_documents
+from .search import update_search_vectors
+
+STAGE_GOODS = "catalog_stage_goods"
+STAGE_PARAMS = "catalog_stage_params"
+
+# Экранирование значений для текстового формата COPY
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Загружает строки в таблицу командой COPY ... FROM STDIN.
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    if hasattr(cursor, "copy_expert"):
+        # psycopg2
+        cursor.copy_expert(sql, buffer)
+    else:
+        # psycopg 3
+        with cursor.copy(sql) as copy:
+            copy.write(buffer.getvalue())
+
+
+class CopyShopImporter(ShopImporter):
+    """
+    Импортёр для PostgreSQL: товары и параметры загружаются командой COPY
+    во временные (не журналируемые) таблицы, а затем сливаются в таблицы
+    каталога несколькими INSERT ... ON CONFLICT / UPDATE ... FROM.
+
+    Слияние и переключение версии каталога выполняются одной транзакцией
+    в finish() (publish() ничего не делает): слияние идёт несколькими
+    запросами над множествами, поэтому, в отличие от публикации пачками,
+    читатели не видят частично обновлённый каталог, но транзакция длится
+    всё слияние.
+    Временные таблицы живут только в рамках соединения, поэтому прерванный
+    импорт не продолжается с контрольной точки, а начинается заново.
+    """
+
+    resumable = False
+
+    def __init__(self, shop, batch_size=None):
+        super().__init__(shop, batch_size)
+        self.seq = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {STAGE_GOODS}, {STAGE_PARAMS}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {STAGE_GOODS} ("
+                "seq bigint NOT NULL, external_id bigint NOT NULL, "
+                "product_name text NOT NULL, category_id bigint NOT NULL, "
+                "model text NOT NULL, quantity integer NOT NULL, "
+                "price integer NOT NULL, price_rrc integer NOT NULL, "
+                "fingerprint text NOT NULL, changed boolean NOT NULL DEFAULT true, "
+                "product_id bigint, product_info_id bigint)"
+            )
+            cursor.execute(
+                f"CREATE TEMP TABLE {STAGE_PARAMS} ("
+                "seq bigint NOT NULL, name text NOT NULL, value text NOT NULL, "
+                "parameter_id bigint)"
+            )
+
+    def write_batch(self, items):
+        """
+        Проверяет пачку и дописывает её во временные таблицы через COPY.
+        """
+        goods, params = [], []
+        for item in items:
+            self.validate_item(item)
+            self.seq += 1
+            goods.append(
+                (
+                    self.seq,
+                    item["id"],
+                    item["name"],
+                    self.categories[item["category"]].id,
+                    item.get("model", ""),
+                    item["quantity"],
+                    item["price"],
+                    item["price_rrc"],
+                    item_fingerprint(item),
+                )
+            )
+            params.extend(
+                (self.seq, name, str(value))
+                for name, value in item.get("parameters", {}).items()
+            )
+        self.items_parsed += len(items)
+
+        with connection.cursor() as cursor:
+            copy_rows(
+                cursor,
+                STAGE_GOODS,
+                (
+                    "seq",
+                    "external_id",
+                    "product_name",
+                    "category_id",
+                    "model",
+                    "quantity",
+                    "price",
+                    "price_rrc",
+                    "fingerprint",
+                ),
+                goods,
+            )
+            copy_rows(cursor, STAGE_PARAMS, ("seq", "name", "value"), params)
+
+    def publish(self, progress=None):
+        pass
+
+    def finish(self):
+        """
+        Сливает временные таблицы в каталог и выводит из каталога
+        отсутствующие в прайс-листе товары.
+        """
+        info = ProductInfo._meta.db_table
+        product = Product._meta.db_table
+        parameter = Parameter._meta.db_table
+        product_parameter = ProductParameter._meta.db_table
+        shop_id = self.shop.id
+
+        self.lock_version()
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE INDEX ON {STAGE_GOODS} (external_id, seq)")
+            cursor.execute(f"CREATE INDEX ON {STAGE_PARAMS} (seq)")
+            # Автоочистка не собирает статистику по временным таблицам
+            cursor.execute(f"ANALYZE {STAGE_GOODS}")
+            cursor.execute(f"ANALYZE {STAGE_PARAMS}")
+
+            # Повтор external_id: последнее вхождение перекрывает предыдущие
+            cursor.execute(
+                f"DELETE FROM {STAGE_GOODS} s USING {STAGE_GOODS} t "
+                "WHERE s.external_id = t.external_id AND s.seq < t.seq"
+            )
+            self.items_skipped += cursor.rowcount
+
+            # Неизменённые активные товары не трогаем
+            cursor.execute(
+                f"UPDATE {STAGE_GOODS} s SET changed = false FROM {info} p "
+                "WHERE p.shop_id = %s AND p.external_id = s.external_id "
+                "AND p.is_active AND p.fingerprint = s.fingerprint",
+                [shop_id],
+            )
+            self.items_unchanged += cursor.rowcount
+            self.items_skipped += cursor.rowcount
+
+            # Недостающие продукты и имена параметров
+            cursor.execute(
+                f"INSERT INTO {product} (name, category_id) "
+                f"SELECT DISTINCT s.product_name, s.category_id FROM {STAGE_GOODS} s "
+                "WHERE s.changed AND NOT EXISTS ("
+                f"SELECT 1 FROM {product} p "
+                "WHERE p.name = s.product_name AND p.category_id = s.category_id)"
+            )
+            cursor.execute(
+                f"UPDATE {STAGE_GOODS} s SET product_id = p.id FROM ("
+                f"SELECT name, category_id, min(id) AS id FROM {product} "
+                "GROUP BY name, category_id) p "
+                "WHERE s.changed AND p.name = s.product_name "
+                "AND p.category_id = s.category_id"
+            )
+            cursor.execute(
+                f"INSERT INTO {parameter} (name) "
+                f"SELECT DISTINCT sp.name FROM {STAGE_PARAMS} sp "
+                f"JOIN {STAGE_GOODS} s ON s.seq = sp.seq "
+                "WHERE s.changed AND NOT EXISTS ("
+                f"SELECT 1 FROM {parameter} p WHERE p.name = sp.name)"
+            )
+            cursor.execute(
+                f"UPDATE {STAGE_PARAMS} sp SET parameter_id = p.id FROM ("
+                f"SELECT name, min(id) AS id FROM {parameter} GROUP BY name) p "
+                "WHERE p.name = sp.name AND EXISTS ("
+                f"SELECT 1 FROM {STAGE_GOODS} s WHERE s.seq = sp.seq AND s.changed)"
+            )
+
+            # Upsert предложений магазина по (shop, external_id)
+            cursor.execute(
+                f"WITH upserted AS ("
+                f"INSERT INTO {info} (shop_id, external_id, product_id, model, "
+                "quantity, price, price_rrc, fingerprint, is_active, retired_at, "
+                "parameters, document, updated_at) "
+                "SELECT %s, s.external_id, s.product_id, s.model, s.quantity, "
+                "s.price, s.price_rrc, s.fingerprint, true, NULL, coalesce(("
+                "SELECT jsonb_object_agg(sp.name, sp.value) "
+                f"FROM {STAGE_PARAMS} sp WHERE sp.seq = s.seq), '{{}}'::jsonb), "
+                # Документ собирается ниже (render_product_info_documents),
+                # у столбца нет значения по умолчанию в БД
+                "'', now() "
+                f"FROM {STAGE_GOODS} s WHERE s.changed "
+                "ON CONFLICT (shop_id, external_id) DO UPDATE SET "
+                "product_id = EXCLUDED.product_id, model = EXCLUDED.model, "
+                "quantity = EXCLUDED.quantity, price = EXCLUDED.price, "
+                "price_rrc = EXCLUDED.price_rrc, fingerprint = EXCLUDED.fingerprint, "
+                "is_active = true, retired_at = NULL, "
+                "parameters = EXCLUDED.parameters, updated_at = EXCLUDED.updated_at "
+                "RETURNING (xmax = 0) AS inserted) "
+                "SELECT count(*) FILTER (WHERE inserted), "
+                "count(*) FILTER (WHERE NOT inserted) FROM upserted",
+                [shop_id],
+            )
+            created, updated = cursor.fetchone()
+            self.items_created += created
+            self.items_updated += updated
+            self.items_written += created + updated
+
+            # Пересоздаём параметры изменившихся товаров
+            cursor.execute(
+                f"UPDATE {STAGE_GOODS} s SET product_info_id = p.id FROM {info} p "
+                "WHERE s.changed AND p.shop_id = %s AND p.external_id = s.external_id",
+                [shop_id],
+            )
+            cursor.execute(
+                f"DELETE FROM {product_parameter} pp USING {STAGE_GOODS} s "
+                "WHERE s.changed AND pp.product_info_id = s.product_info_id"
+            )
+            cursor.execute(
+                f"INSERT INTO {product_parameter} (product_info_id, parameter_id, value) "
+                f"SELECT s.product_info_id, sp.parameter_id, sp.value "
+                f"FROM {STAGE_PARAMS} sp JOIN {STAGE_GOODS} s ON s.seq = sp.seq "
+                "WHERE s.changed"
+            )
+            cursor.execute(
+                f"SELECT DISTINCT product_id FROM {STAGE_GOODS} WHERE changed"
+            )
+            update_search_vectors(product_id for (product_id,) in cursor.fetchall())
+            cursor.execute(f"SELECT product_info_id FROM {STAGE_GOODS} WHERE changed")
+            render_product_info_documents(
+                product_info_id for (product_info_id,) in cursor.fetchall()
+            )
+            self.refresh_renamed_categories()
+
+            # Товары, которых нет в прайс-листе, выводятся из каталога
+            cursor.execute(
+                f"UPDATE {info} p SET is_active = false, retired_at = now(), "
+                "updated_at = now() "
+                "WHERE p.shop_id = %s AND p.is_active AND NOT EXISTS ("
+                f"SELECT 1 FROM {STAGE_GOODS} s WHERE s.external_id = p.external_id)",
+                [shop_id],
+            )
+            self.items_removed += cursor.rowcount
+
+            cursor.execute(f"DROP TABLE {STAGE_GOODS}, {STAGE_PARAMS}")
+        self.publish_version()
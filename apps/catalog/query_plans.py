@@ -0,0 +1,106 @@
+import copy
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+
+
+class QueryPlan:
+    """
+    План загрузки объектов модели: какие поля читаются (None — все)
+    и какие связанные объекты нужны, со своими планами.
+
+    Строится по дереву сериализатора (см. fast_serializers.compile_plan)
+    и применяется к queryset методом apply: однозначные связи загружаются
+    через select_related, многозначные — отдельным Prefetch со своим
+    планом, столбцы ограничиваются only(). Так число запросов зависит
+    только от глубины вложенности многозначных связей, а не от числа строк.
+
+    Имена, которых нет среди полей модели (аннотации queryset), в only()
+    не попадают: их вычисляет сам queryset. План без модели (model=None)
+    queryset не меняет.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = set()
+        self.related = {}
+
+    def load_all(self):
+        self.fields = None
+
+    def add_field(self, name):
+        if self.fields is None or self.model is None:
+            return
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return
+        if field.concrete:
+            self.fields.add(field.name)
+
+    def relation(self, names):
+        """
+        План объектов по цепочке связей names, например ("product", "category").
+        Для не-связи — FieldDoesNotExist.
+        """
+        plan = self
+        for name in names:
+            if plan.model is None:
+                raise FieldDoesNotExist(name)
+            if name not in plan.related:
+                field = plan.model._meta.get_field(name)
+                if not field.is_relation:
+                    raise FieldDoesNotExist(f"{plan.model.__name__}.{name} — не связь")
+                related = QueryPlan(field.related_model)
+                if field.one_to_many:
+                    # Внешний ключ на родителя нужен, чтобы разложить объекты
+                    # prefetch по родителям без дозагрузки
+                    related.add_field(field.field.name)
+                plan.related[name] = related
+            plan = plan.related[name]
+        return plan
+
+    def add_path(self, path):
+        """
+        Добавляет поле по пути через "__", например "product__name".
+        """
+        *names, name = path.split("__")
+        try:
+            self.relation(names).add_field(name)
+        except FieldDoesNotExist:
+            pass
+
+    def with_paths(self, *paths):
+        plan = copy.deepcopy(self)
+        for path in paths:
+            plan.add_path(path)
+        return plan
+
+    def apply(self, queryset):
+        if self.model is None:
+            return queryset
+        select, prefetch, only = [], [], []
+        self._collect("", select, prefetch, only)
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*only)
+
+    def _collect(self, prefix, select, prefetch, only):
+        if self.fields is None:
+            names = [field.name for field in self.model._meta.concrete_fields]
+        else:
+            names = sorted(self.fields)
+        only.extend(prefix + name for name in names)
+
+        for name, plan in self.related.items():
+            field = self.model._meta.get_field(name)
+            if field.one_to_many or field.many_to_many:
+                queryset = plan.apply(plan.model._default_manager.all())
+                prefetch.append(Prefetch(prefix + name, queryset=queryset))
+            else:
+                select.append(prefix + name)
+                if field.concrete:
+                    only.append(prefix + name)
+                plan._collect(f"{prefix}{name}__", select, prefetch, only)
@@ -0,0 +1,241 @@
+import logging
+import os
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from multiprocessing import get_context
+from tempfile import NamedTemporaryFile
+
+import django
+from django.db import connections
+
+from .feed_files import update_feed_files_safely
+from .feeds import DownloadedFeed, download_feed
+from .models import ImportStatus, Shop
+from .services import (
+    JobProgress,
+    claim_shop_import,
+    finish_import_job,
+    import_shop_feed,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ImportTimeout(Exception):
+    """
+    Импорт магазина не уложился в отведённое время.
+    """
+
+
+def get_refresh_shops(shop_ids=None):
+    """
+    Магазины для обновления: активные, с URL прайс-листа и владельцем,
+    без выполняемого сейчас импорта из очереди.
+    """
+    shops = (
+        Shop.objects.filter(state=True, user__isnull=False)
+        .exclude(url__isnull=True)
+        .exclude(url="")
+        .exclude(user__import_jobs__status=ImportStatus.RUNNING)
+        .order_by("id")
+    )
+    if shop_ids:
+        shops = shops.filter(id__in=shop_ids)
+    return list(shops)
+
+
+def download_shop_feed(shop, timeout, changed_only=False):
+    """
+    Скачивает прайс-лист магазина в именованный временный файл, чтобы
+    его можно было передать в другой процесс.
+
+    При changed_only выполняется условный запрос, и неизменившийся
+    прайс-лист (304 или тот же sha256) не сохраняется.
+    """
+    started = time.monotonic()
+    result = {
+        "shop_id": shop.id,
+        "shop": shop.name,
+        "url": shop.url,
+        "started_at": time.time(),
+    }
+    file = NamedTemporaryFile(prefix="feed-", delete=False)
+    try:
+        feed = download_feed(
+            shop.url,
+            timeout=timeout,
+            etag=shop.feed_etag if changed_only else "",
+            last_modified=shop.feed_last_modified if changed_only else "",
+            file=file,
+        )
+    except Exception as e:
+        file.close()
+        os.unlink(file.name)
+        result.update(status="failed", error=f"Ошибка загрузки файла: {e}")
+    else:
+        file.close()
+        if feed.not_modified or (changed_only and feed.hash == shop.feed_hash):
+            os.unlink(file.name)
+            result.update(status="unchanged")
+        elif feed.empty:
+            os.unlink(file.name)
+            result.update(status="failed", error="Файл пустой")
+        else:
+            result.update(
+                status="downloaded",
+                path=file.name,
+                format=feed.format,
+                hash=feed.hash,
+                etag=feed.etag,
+                last_modified=feed.last_modified,
+            )
+    result["download_time"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def import_shop_feed_file(download, deadline):
+    """
+    Импортирует скачанный прайс-лист магазина. Выполняется в процессе
+    пула; временный файл удаляется после импорта.
+
+    Прайс-лист проверяется и записывается тем же import_shop_feed, что
+    и импорт из очереди.
+
+    Время проверяется только между пачками (после записи или публикации
+    каждой): по истечении deadline (time.time()) импорт прерывается,
+    а следующий запуск продолжит его с контрольной точки. Проверка файла
+    по схеме до первой пачки, сама пачка и последняя транзакция не
+    прерываются, поэтому импорт может превысить deadline на это время.
+
+    На время импорта магазин занимается выполняемым заданием
+    (claim_shop_import); если его уже импортирует обработчик очереди,
+    магазин пропускается.
+    """
+    started = time.monotonic()
+    result = {"import_time": 0}
+
+    try:
+        shop = Shop.objects.select_related("user").get(pk=download["shop_id"])
+        job = claim_shop_import(shop)
+        if job is None:
+            result.update(status="busy", error="Магазин уже импортируется")
+            return result
+
+        with JobProgress(job) as progress:
+
+            def check_deadline(importer):
+                progress(importer)
+                if time.time() > deadline:
+                    raise ImportTimeout(
+                        f"Превышено время импорта, записано {importer.items_written}"
+                    )
+
+            try:
+                with DownloadedFeed(
+                    open(download["path"], "rb"),
+                    download["format"],
+                    empty=False,
+                    hash=download["hash"],
+                    etag=download["etag"],
+                    last_modified=download["last_modified"],
+                ) as feed:
+                    outcome = import_shop_feed(
+                        shop.user, shop.url, feed, shop, check_deadline
+                    )
+            except ImportTimeout as e:
+                result.update(status="timeout", error=str(e))
+            except Exception as e:
+                logger.exception(
+                    "Ошибка обновления каталога магазина %s", download["shop"]
+                )
+                result.update(status="failed", error=f"Внутренняя ошибка импорта: {e}")
+            else:
+                outcome.pop("feed_unchanged", None)
+                imported = outcome.pop("status")
+                result.update(status="imported" if imported else "failed", **outcome)
+        finish_import_job(
+            job,
+            progress,
+            {
+                **result,
+                "status": result["status"] == "imported",
+                "error": result.get("error", ""),
+            },
+        )
+    finally:
+        os.unlink(download["path"])
+        result["import_time"] = round(time.monotonic() - started, 3)
+        connections.close_all()
+    return result
+
+
+def _init_import_worker():
+    # Процессы пула запускаются через spawn: форк процесса с работающими
+    # потоками загрузки небезопасен, поэтому Django настраивается заново
+    django.setup()
+
+
+def refresh_catalogs(
+    shops, concurrency=4, download_concurrency=8, timeout=600, changed_only=False
+):
+    """
+    Обновляет каталоги магазинов из их прайс-листов.
+
+    Загрузки идут в пуле потоков, разбор и запись в БД — в пуле процессов
+    по одному магазину на процесс. timeout ограничивает время обработки
+    магазина с начала загрузки; импорт проверяет его между пачками
+    (см. import_shop_feed_file). После импорта обновляются статические
+    файлы каталога. Возвращает список итогов по магазинам в порядке
+    завершения.
+    """
+    results = []
+    # Процессы не должны наследовать открытые соединения с БД
+    connections.close_all()
+    with (
+        ThreadPoolExecutor(max_workers=download_concurrency) as downloads,
+        ProcessPoolExecutor(
+            max_workers=concurrency,
+            mp_context=get_context("spawn"),
+            initializer=_init_import_worker,
+        ) as imports,
+    ):
+        # future -> итог загрузки (None, пока идёт сама загрузка)
+        pending = {}
+        for shop in shops:
+            future = downloads.submit(download_shop_feed, shop, timeout, changed_only)
+            pending[future] = None
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                download = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Например, процесс пула аварийно завершился
+                    result = {"status": "failed", "error": f"Внутренняя ошибка: {e}"}
+
+                if download is None and result["status"] == "downloaded":
+                    deadline = result["started_at"] + timeout
+                    task = imports.submit(import_shop_feed_file, result, deadline)
+                    pending[task] = result
+                    continue
+                if download is not None:
+                    result = {
+                        "shop_id": download["shop_id"],
+                        "shop": download["shop"],
+                        "url": download["url"],
+                        "started_at": download["started_at"],
+                        "download_time": download["download_time"],
+                        **result,
+                    }
+                results.append(result)
+
+    if any(result["status"] == "imported" for result in results):
+        update_feed_files_safely()
+    return results
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q
+
+from .models import Category, Product, ProductInfo, ProductParameter
+
+SEARCH_BATCH_SIZE = 1000
+
+
+def update_search_vectors(product_ids):
+    """
+    Пересчитывает поисковый вектор продуктов: название (вес A), категория
+    и модели предложений (B), значения параметров предложений (C).
+    Только для PostgreSQL, на других СУБД поиск идёт по названию.
+    """
+    if connection.vendor != "postgresql":
+        return
+    product_ids = sorted(product_ids)
+    product = Product._meta.db_table
+    category = Category._meta.db_table
+    info = ProductInfo._meta.db_table
+    product_parameter = ProductParameter._meta.db_table
+    sql = (
+        f"UPDATE {product} p SET search_vector = "
+        "setweight(to_tsvector(%(config)s::regconfig, p.name), 'A') || "
+        "setweight(to_tsvector(%(config)s::regconfig, c.name), 'B') || "
+        "setweight(to_tsvector(%(config)s::regconfig, coalesce(("
+        f"SELECT string_agg(DISTINCT pi.model, ' ') FROM {info} pi "
+        "WHERE pi.product_id = p.id), '')), 'B') || "
+        "setweight(to_tsvector(%(config)s::regconfig, coalesce(("
+        f"SELECT string_agg(DISTINCT pp.value, ' ') FROM {product_parameter} pp "
+        f"JOIN {info} pi ON pi.id = pp.product_info_id "
+        "WHERE pi.product_id = p.id), '')), 'C') "
+        f"FROM {category} c WHERE c.id = p.category_id AND p.id = ANY(%(ids)s)"
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(product_ids), SEARCH_BATCH_SIZE):
+            cursor.execute(
+                sql,
+                {
+                    "config": settings.CATALOG_SEARCH_CONFIG,
+                    "ids": product_ids[start : start + SEARCH_BATCH_SIZE],
+                },
+            )
+
+
+def search_product_infos(queryset, text):
+    """
+    Отбирает предложения, подходящие под поисковую строку.
+
+    На PostgreSQL поиск полнотекстовый с учётом морфологии (синтаксис
+    websearch: "фраза", -исключение, or) и дополняется поиском по
+    триграммам названия, который находит слова с опечатками. Предложения
+    получают аннотацию relevance для сортировки по релевантности.
+    На других СУБД — поиск подстроки в названии без ранжирования.
+
+    Возвращает (queryset, ranked).
+    """
+    if connection.vendor != "postgresql":
+        return queryset.filter(product__name__icontains=text), False
+
+    query = SearchQuery(
+        text, config=settings.CATALOG_SEARCH_CONFIG, search_type="websearch"
+    )
+    queryset = queryset.filter(
+        Q(product__search_vector=query) | Q(product__name__trigram_similar=text)
+    ).annotate(
+        relevance=SearchRank(F("product__search_vector"), query)
+        + TrigramSimilarity("product__name", text)
+    )
+    return queryset, True
@@ -1,6 +1,14 @@
 from rest_framework import serializers
 
-from apps.catalog.models import Category, Product, ProductInfo, ProductParameter, Shop
+from apps.catalog.fast_serializers import FastSerializer
+from apps.catalog.models import (
+    Category,
+    FeedUpload,
+    ImportJob,
+    Product,
+    ProductInfo,
+    Shop,
+)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -17,8 +25,9 @@ class ShopSerializer(serializers.ModelSerializer):
             "id",
             "name",
             "state",
+            "catalog_version",
         )
-        read_only_fields = ("id",)
+        read_only_fields = ("id", "catalog_version")
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -32,20 +41,24 @@ class ProductSerializer(serializers.ModelSerializer):
         )
 
 
-class ProductParameterSerializer(serializers.ModelSerializer):
-    parameter = serializers.StringRelatedField()
+class ProductParametersField(serializers.Field):
+    """
+    Параметры предложения из JSON-копии ProductInfo.parameters
+    в виде списка {"parameter": ..., "value": ...}, отсортированного по названию.
+    """
 
-    class Meta:
-        model = ProductParameter
-        fields = (
-            "parameter",
-            "value",
-        )
+    def __init__(self, **kwargs):
+        kwargs.setdefault("source", "parameters")
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return [{"parameter": name, "value": value[name]} for name in sorted(value)]
 
 
 class ProductInfoSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
-    product_parameters = ProductParameterSerializer(read_only=True, many=True)
+    product_parameters = ProductParametersField()
 
     class Meta:
         model = ProductInfo
@@ -60,3 +73,42 @@ class ProductInfoSerializer(serializers.ModelSerializer):
             "product_parameters",
         )
         read_only_fields = ("id",)
+
+
+# Быстрый вариант ProductInfoSerializer (см. FastSerializer)
+fast_product_info_serializer = FastSerializer(ProductInfoSerializer)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = (
+            "id",
+            "url",
+            "upload",
+            "status",
+            "items_parsed",
+            "items_written",
+            "items_skipped",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+
+class FeedUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FeedUpload
+        fields = (
+            "id",
+            "filename",
+            "size",
+            "received",
+            "status",
+            "created_at",
+            "updated_at",
+        )
+        read_only_fields = fields
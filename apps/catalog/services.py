@@ -1,131 +1,618 @@
-from requests import get
-from yaml import safe_load, YAMLError
+import functools
+import logging
+import threading
+from datetime import timedelta
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from django.utils import timezone
 
-from .models import Shop, Category, Product, ProductInfo, Parameter, ProductParameter
-from apps.orders.models import OrderItem
+from .cache import bump_catalog_version
+from .feed_files import update_feed_files_safely
+from .feeds import FeedError, download_feed, iter_feed_batches, iter_in_background
+from .importer import ImportDataError, get_shop_importer
+from .models import (
+    ImportJob,
+    ImportStatus,
+    ProductInfo,
+    ProductParameter,
+    Shop,
+    StagedProductInfo,
+)
+from .uploads import delete_upload, open_upload
+from .validation import validate_feed
 
+logger = logging.getLogger(__name__)
 
-def import_shop_data_from_url(user, url):
+
+def validate_feed_url(url):
+    """
+    Проверяет URL прайс-листа. Возвращает текст ошибки или None.
+    """
+    validator = URLValidator()
+    try:
+        validator(url)
+    except ValidationError as e:
+        return f"Неверный URL: {e}"
+    return None
+
+
+def import_shop_data_from_url(user, url, progress=None, dry_run=False):
     """
-    Импортирует данные магазина из YAML по URL.
+    Импортирует данные магазина из YAML/JSON по URL.
 
     Логика:
-    - Удаляются ТОЛЬКО те ProductInfo, на которые НЕТ заказов.
-    - Если товар есть в YAML — обновляется (или создаётся).
-    - Если товара нет в YAML, но на него есть заказ — он остаётся в БД
+    - Перед записью весь файл проверяется по JSON Schema (validate_feed):
+      при ошибках БД не затрагивается, а в ответе возвращаются все найденные ошибки.
+    - Записываются только новые товары и товары, отпечаток которых изменился.
+    - Изменения готовятся в стороне (пока файл разбирается, читатели видят
+      прежний каталог) и публикуются пачками, каждая своей транзакцией
+      (см. ShopImporter.publish); вывод отсутствующих товаров и увеличение
+      Shop.catalog_version — последней короткой транзакцией.
+    - Товары обновляются на месте по (shop, external_id), их ID не меняются.
+    - Если товара нет в YAML — он выводится из каталога (is_active=False),
+      а удаляется позже командой purge_retired_products, если на него нет заказов.
     - Параметры пересоздаются при обновлении (т.к. структура параметров может меняться).
+    - Файл скачивается условным запросом (ETag/Last-Modified прошлого импорта);
+      если он не изменился (304 или тот же sha256), БД не затрагивается.
+    - Файл разбирается потоково по одному товару, товары передаются
+      в ShopImporter пачками; каждая пачка фиксируется своей транзакцией
+      вместе с контрольной точкой магазина, и прерванный импорт того же
+      файла продолжается с неё (см. import_feed).
+    - При dry_run файл только проверяется, и возвращается число товаров,
+      которые были бы созданы, обновлены, не изменились и были бы выведены.
     - user это авторизованный пользователь типа 'shop'
+    - progress вызывается с ShopImporter после записи каждой пачки
     """
     # Валидация URL
-    validator = URLValidator()
-    try:
-        validator(url)
-    except ValidationError as e:
-        return {"status": False, "error": f"Неверный URL: {e}"}
+    error = validate_feed_url(url)
+    if error:
+        return {"status": False, "error": error}
+
+    # Условный запрос возможен, только если прошлый импорт был с того же URL
+    shop = Shop.objects.filter(user=user).first()
+    same_feed = (
+        not dry_run and shop is not None and shop.url == url and bool(shop.feed_hash)
+    )
 
     # Загрузка содержимого
     try:
-        response = get(url.strip(), timeout=10)
-        response.raise_for_status()
-        content = response.content
+        feed = download_feed(
+            url,
+            etag=shop.feed_etag if same_feed else "",
+            last_modified=shop.feed_last_modified if same_feed else "",
+        )
     except Exception as e:
         return {"status": False, "error": f"Ошибка загрузки файла: {e}"}
 
-    if not content.strip():
-        return {"status": False, "error": "Файл пустой"}
+    with feed:
+        if feed.not_modified or (same_feed and feed.hash == shop.feed_hash):
+            return {"status": True, "feed_unchanged": True}
+        return import_shop_feed(user, url, feed, shop, progress, dry_run)
+
 
+def import_shop_data_from_upload(user, upload, progress=None, dry_run=False):
+    """
+    Импортирует прайс-лист, загруженный магазином напрямую (см. uploads).
+    Работает так же, как import_shop_data_from_url, но URL магазина
+    не меняется; файл с тем же sha256, что и прошлый импорт, не импортируется.
+    """
+    shop = Shop.objects.filter(user=user).first()
     try:
-        data = safe_load(content)
-    except YAMLError as e:
-        return {"status": False, "error": f"Неверный формат данных (YAML/JSON): {e}"}
+        feed = open_upload(upload)
+    except FeedError as e:
+        return {"status": False, "error": str(e)}
 
-    if not isinstance(data, dict) or not {"shop", "categories", "goods"}.issubset(
-        data.keys()
-    ):
+    with feed:
+        if not dry_run and shop is not None and feed.hash == shop.feed_hash:
+            return {"status": True, "feed_unchanged": True}
+        return import_shop_feed(user, None, feed, shop, progress, dry_run)
+
+
+def import_shop_feed(user, url, feed, shop, progress=None, dry_run=False):
+    """
+    Проверяет открытый прайс-лист и импортирует его (общая часть импорта
+    по URL и из загруженного файла). shop — текущий магазин пользователя или None.
+    """
+    if feed.empty:
+        return {"status": False, "error": "Файл пустой"}
+
+    existing = None
+    if dry_run:
+        existing = {}
+        if shop is not None:
+            existing = {
+                external_id: (fingerprint, is_active)
+                for external_id, fingerprint, is_active in ProductInfo.objects.filter(
+                    shop=shop
+                ).values_list("external_id", "fingerprint", "is_active")
+            }
+    report = validate_feed(feed.file, feed.format, existing=existing)
+    if not report.valid:
         return {
             "status": False,
-            "error": "Неверная структура YAML: требуются shop, categories, goods",
+            "error": f"Прайс-лист содержит ошибки: {report.errors_total}",
+            "errors": report.errors,
+            "errors_total": report.errors_total,
         }
+    if dry_run:
+        return {
+            "status": True,
+            "dry_run": True,
+            "goods": report.goods,
+            **report.diff(),
+        }
+    feed.file.seek(0)
 
-    # Получаем/создаём магазин
-    shop, created = Shop.objects.get_or_create(
-        user=user, defaults={"name": data["shop"], "url": url}
-    )
-    if not created:
-        shop.name = data["shop"]
-        shop.url = url
-        shop.save(update_fields=["name", "url"])
-
-    # Обработка категорий
-    category_objects = {}
-    for cat in data["categories"]:
-        if "id" not in cat or "name" not in cat:
-            return {
-                "status": False,
-                "error": f"В категории отсутствует id или name: {cat}",
-            }
+    try:
+        importer = import_feed(user, url, feed, progress)
+    except (FeedError, ImportDataError) as e:
+        return {"status": False, "error": str(e)}
+    return {"status": True, "feed_unchanged": False, **importer.result()}
+
+
+def import_feed(user, url, feed, progress=None):
+    """
+    Записывает скачанный прайс-лист в БД и возвращает отработавший ShopImporter.
+    Разбор файла идёт в фоновом потоке параллельно с записью пачек.
+    url равен None для загруженного файла: URL магазина тогда не меняется.
+
+    Импорт не держит одну длинную транзакцию: каждая пачка готовится
+    в стороне от каталога (StagedProductInfo) и фиксируется отдельно вместе
+    с контрольной точкой (хеш файла и число записанных товаров).
+    Если предыдущий импорт того же файла прервался, уже записанные товары
+    пропускаются. Затем подготовленные товары публикуются пачками
+    (ShopImporter.publish), а вывод отсутствующих товаров, переключение
+    версии каталога и сохранение валидаторов файла выполняются последней
+    транзакцией.
+    """
+    importer = None
+    resume_offset = 0
+    for key, value in iter_in_background(iter_feed_batches(feed.file, feed.format)):
+        if key == "shop":
+            # Получаем/создаём магазин
+            shop, _ = Shop.objects.get_or_create(
+                user=user, defaults={"name": value, "url": url}
+            )
+            shop.name = value
+            importer = get_shop_importer(shop)
+            # Подготовленные товары пишутся вместе с контрольной точкой,
+            # так что без неё сбрасывать нечего
+            if not shop.import_checkpoint_hash:
+                continue
+            if importer.resumable and shop.import_checkpoint_hash == feed.hash:
+                resume_offset = shop.import_checkpoint_offset
+                continue
+            importer.reset_staged()
+            if not importer.resumable:
+                # Контрольная точка оставлена другим бэкендом: этот импортёр
+                # её не продолжит, а ORM-импортёр после него пропустил бы
+                # товары, которые так и не попали в StagedProductInfo
+                Shop.objects.filter(pk=shop.pk).update(
+                    import_checkpoint_hash="", import_checkpoint_offset=0
+                )
+        elif key == "categories":
+            with transaction.atomic():
+                importer.import_categories(value)
+        else:
+            # Товары, записанные до сбоя, повторно не пишутся
+            committed = min(len(value), resume_offset - importer.items_parsed)
+            if committed > 0:
+                importer.skip_items(value[:committed])
+                value = value[committed:]
+            if value:
+                with transaction.atomic():
+                    importer.write_batch(value)
+                    # Контрольную точку пишет только импортёр, способный с неё
+                    # продолжить: COPY готовит пачки во временных таблицах,
+                    # которые не переживают сбой
+                    if importer.resumable:
+                        Shop.objects.filter(pk=importer.shop.pk).update(
+                            import_checkpoint_hash=feed.hash,
+                            import_checkpoint_offset=importer.items_parsed,
+                        )
+            if progress:
+                progress(importer)
+
+    # Каждая пачка публикуется своей транзакцией; сбой здесь оставляет
+    # контрольную точку, и повторный импорт файла повторит публикацию
+    importer.publish(progress)
 
-        category, _ = Category.objects.get_or_create(
-            external_id=cat["id"], defaults={"name": cat["name"]}
+    with transaction.atomic():
+        # Товары, отсутствующие в файле, выводятся из каталога без удаления
+        importer.finish()
+
+        # Запоминаем валидаторы файла для условного запроса при следующем импорте
+        shop = importer.shop
+        if url is not None:
+            shop.url = url
+        shop.feed_etag = feed.etag
+        shop.feed_last_modified = feed.last_modified
+        shop.feed_hash = feed.hash
+        shop.import_checkpoint_hash = ""
+        shop.import_checkpoint_offset = 0
+        shop.save(
+            update_fields=[
+                "name",
+                "url",
+                "feed_etag",
+                "feed_last_modified",
+                "feed_hash",
+                "import_checkpoint_hash",
+                "import_checkpoint_offset",
+            ]
         )
-        if category.name != cat["name"]:
-            category.name = cat["name"]
-            category.save(update_fields=["name"])
-        category.shops.add(shop)
-        category_objects[cat["id"]] = category
-
-    # Определяем, какие ProductInfo можно безопасно удалить
-    all_shop_products = ProductInfo.objects.filter(shop=shop)
-    ordered_ids = OrderItem.objects.filter(
-        product_info__in=all_shop_products
-    ).values_list("product_info_id", flat=True)
-
-    # Удаляем только те записи, которые НЕ используются в заказах
-    safe_to_delete = all_shop_products.exclude(id__in=ordered_ids)
-    safe_to_delete.delete()
-
-    # Обработка товаров из YAML
-    for item in data["goods"]:
-        required_fields = {"id", "category", "name", "price", "price_rrc", "quantity"}
-        if not required_fields.issubset(item.keys()):
-            missing = required_fields - set(item.keys())
-            return {"status": False, "error": f"В товаре отсутствуют поля: {missing}"}
-
-        cat_id = item.get("category")
-        if cat_id not in category_objects:
-            return {
-                "status": False,
-                "error": f"Категория с external_id={cat_id} не объявлена в разделе categories",
+        # Кэш ответов сбрасывается, когда новая версия уже видна читателям
+        transaction.on_commit(functools.partial(bump_catalog_version, shop.id))
+        if importer.renamed_categories:
+            transaction.on_commit(bump_catalog_version)
+    return importer
+
+
+def enqueue_import(user, url="", upload=None):
+    """
+    Ставит импорт прайс-листа (по URL или загруженного файла) в очередь.
+
+    Повторная отправка объединяется с уже ожидающим заданием магазина
+    (у него обновляется источник) либо с выполняемым заданием
+    для того же источника.
+    """
+    for _ in range(2):
+        queued = ImportJob.objects.filter(user=user, status=ImportStatus.QUEUED).first()
+        if queued:
+            if queued.url != url or queued.upload != upload:
+                queued.url = url
+                queued.upload = upload
+                queued.save(update_fields=["url", "upload", "updated_at"])
+            return queued
+
+        running = ImportJob.objects.filter(
+            user=user, status=ImportStatus.RUNNING, url=url, upload=upload
+        ).first()
+        if running:
+            return running
+
+        try:
+            with transaction.atomic():
+                return ImportJob.objects.create(user=user, url=url, upload=upload)
+        except IntegrityError:
+            # Параллельный запрос уже поставил задание в очередь
+            continue
+    return ImportJob.objects.get(user=user, status=ImportStatus.QUEUED)
+
+
+def claim_import_job():
+    """
+    Забирает из очереди самое старое задание магазина, у которого
+    нет выполняемого импорта, и переводит его в статус 'running'.
+    """
+    fail_stale_import_jobs()
+    jobs = (
+        ImportJob.objects.select_for_update(skip_locked=True)
+        .filter(status=ImportStatus.QUEUED)
+        .exclude(user__import_jobs__status=ImportStatus.RUNNING)
+        .order_by("created_at")
+    )
+    try:
+        with transaction.atomic():
+            job = jobs.first()
+            if job is None:
+                return None
+            job.status = ImportStatus.RUNNING
+            job.started_at = timezone.now()
+            job.save(update_fields=["status", "started_at", "updated_at"])
+            return job
+    except IntegrityError:
+        # Другой обработчик успел запустить импорт этого магазина
+        return None
+
+
+def claim_shop_import(shop):
+    """
+    Занимает магазин для импорта вне очереди (refresh_catalogs): создаёт
+    выполняемое задание, как это делает claim_import_job. Второе выполняемое
+    задание магазина запрещает ограничение unique_active_import_job, так что
+    импорт из очереди и обновление не пишут один каталог одновременно.
+    Возвращает задание или None, если магазин уже импортируется.
+    """
+    try:
+        with transaction.atomic():
+            return ImportJob.objects.create(
+                user=shop.user,
+                url=shop.url,
+                status=ImportStatus.RUNNING,
+                started_at=timezone.now(),
+            )
+    except IntegrityError:
+        return None
+
+
+def finish_import_job(job, progress, result):
+    """
+    Сохраняет итог задания импорта. result — ответ импорта со status
+    и error; остальные ключи сохраняются в job.result.
+    """
+    result = dict(result)
+    for field, value in progress.counters.items():
+        setattr(job, field, value)
+    job.status = ImportStatus.DONE if result.pop("status") else ImportStatus.FAILED
+    job.error = result.pop("error", "")
+    job.result = result
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def fail_stale_import_jobs():
+    """
+    Завершает с ошибкой задания, обработчик которых перестал сообщать о прогрессе.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.CATALOG_IMPORT_JOB_TIMEOUT)
+    return ImportJob.objects.filter(
+        status=ImportStatus.RUNNING, updated_at__lt=deadline
+    ).update(
+        status=ImportStatus.FAILED,
+        error="Импорт прерван: обработчик не отвечает",
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+class JobProgress:
+    """
+    Периодически сохраняет счётчики импорта в ImportJob.
+
+    Пачки фиксируются по одной, но между ними импорт долго разбирает файл
+    и публикует товары, поэтому прогресс пишется из отдельного потока
+    по таймеру: у него своё соединение с БД, его запись не ждёт пачку
+    и не попадает в её транзакцию, а изменения сразу видны в API.
+    """
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval or settings.CATALOG_IMPORT_PROGRESS_INTERVAL
+        self.counters = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __call__(self, importer):
+        self.counters = {
+            "items_parsed": importer.items_parsed,
+            "items_written": importer.items_written,
+            "items_skipped": importer.items_skipped,
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                self._save()
+        finally:
+            connection.close()
+
+    def _save(self):
+        try:
+            ImportJob.objects.filter(pk=self.job.pk).update(
+                updated_at=timezone.now(), **self.counters
+            )
+        except DatabaseError as e:
+            logger.warning(
+                "Не удалось сохранить прогресс импорта %s: %s", self.job.pk, e
+            )
+
+
+def run_import_job(job):
+    """
+    Выполняет задание импорта и сохраняет его итог.
+    """
+    with JobProgress(job) as progress:
+        try:
+            if job.upload is not None:
+                result = import_shop_data_from_upload(
+                    job.user, job.upload, progress=progress
+                )
+            else:
+                result = import_shop_data_from_url(job.user, job.url, progress=progress)
+        except Exception as e:
+            logger.exception("Ошибка импорта %s", job.pk)
+            result = {"status": False, "error": f"Внутренняя ошибка импорта: {e}"}
+
+    finish_import_job(job, progress, result)
+    if job.upload is not None:
+        # Загруженный файл больше не нужен
+        delete_upload(job.upload)
+    if job.status == ImportStatus.DONE and not job.result.get("feed_unchanged"):
+        update_feed_files_safely()
+    return job
+
+
+STOCK_DELTA_FIELDS = ("quantity", "price", "price_rrc")
+
+
+def validate_stock_deltas(deltas):
+    """
+    Проверяет изменения остатков/цен от магазина.
+    Возвращает словарь external_id -> изменение и список ошибок.
+    """
+    if not isinstance(deltas, list):
+        return {}, ["Ожидается список изменений"]
+
+    valid, errors = {}, []
+    for index, delta in enumerate(deltas):
+        if not isinstance(delta, dict):
+            errors.append(f"Элемент {index}: ожидается объект")
+            continue
+        external_id = delta.get("external_id")
+        if type(external_id) is not int or external_id < 0:
+            errors.append(f"Элемент {index}: некорректный external_id")
+            continue
+        values = {field: delta.get(field) for field in STOCK_DELTA_FIELDS}
+        if all(value is None for value in values.values()):
+            errors.append(
+                f"Элемент {index}: не указано ни одно из {', '.join(STOCK_DELTA_FIELDS)}"
+            )
+            continue
+        if any(
+            value is not None and (type(value) is not int or value < 0)
+            for value in values.values()
+        ):
+            errors.append(f"Элемент {index}: значения должны быть целыми >= 0")
+            continue
+        # При повторе external_id побеждает последнее изменение
+        valid[external_id] = values
+    return valid, errors
+
+
+def apply_stock_deltas(shop, deltas, batch_size=None):
+    """
+    Применяет изменения остатков/цен к ProductInfo магазина одним
+    UPDATE на пачку, не затрагивая продукты, категории и параметры.
+    Возвращает число обновлённых записей и список ненайденных external_id.
+
+    Отпечаток обновлённых товаров сбрасывается, чтобы следующий импорт
+    изменившегося прайс-листа переписал их значения из файла.
+    """
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+    external_ids = list(deltas)
+    updated = 0
+    not_found = []
+    with transaction.atomic():
+        for start in range(0, len(external_ids), batch_size):
+            batch = {
+                ext_id: deltas[ext_id]
+                for ext_id in external_ids[start : start + batch_size]
             }
+            if connection.vendor == "postgresql":
+                matched = _apply_stock_deltas_postgresql(shop, batch)
+            else:
+                matched = _apply_stock_deltas_orm(shop, batch)
+            updated += len(matched)
+            not_found.extend(ext_id for ext_id in batch if ext_id not in matched)
+        if updated:
+            transaction.on_commit(functools.partial(bump_catalog_version, shop.id))
+    return updated, not_found
 
-        category = category_objects[cat_id]
-        product, _ = Product.objects.get_or_create(name=item["name"], category=category)
-
-        # Обновляем или создаём ProductInfo по (shop, external_id)
-        product_info, created = ProductInfo.objects.update_or_create(
-            shop=shop,
-            external_id=item["id"],
-            defaults={
-                "product": product,
-                "model": item.get("model", ""),
-                "price": item["price"],
-                "price_rrc": item["price_rrc"],
-                "quantity": item["quantity"],
-            },
-        )
 
-        # Пересоздаём параметры — так как структура может измениться
-        ProductParameter.objects.filter(product_info=product_info).delete()
-        for param_name, param_value in item.get("parameters", {}).items():
-            parameter, _ = Parameter.objects.get_or_create(name=param_name)
-            ProductParameter.objects.create(
-                product_info=product_info, parameter=parameter, value=str(param_value)
+def _apply_stock_deltas_postgresql(shop, batch):
+    columns = ["external_id", *STOCK_DELTA_FIELDS]
+    assignments = ", ".join(
+        f"{field} = COALESCE(v.{field}, p.{field})" for field in STOCK_DELTA_FIELDS
+    )
+    sql = (
+        f"UPDATE {ProductInfo._meta.db_table} AS p "
+        f"SET {assignments}, fingerprint = '', updated_at = now() "
+        f"FROM unnest({', '.join(['%s::integer[]'] * len(columns))}) "
+        f"AS v({', '.join(columns)}) "
+        "WHERE p.shop_id = %s AND p.is_active AND p.external_id = v.external_id "
+        "RETURNING p.external_id"
+    )
+    params = [list(batch)]
+    params += [
+        [values[field] for values in batch.values()] for field in STOCK_DELTA_FIELDS
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, shop.id])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _apply_stock_deltas_orm(shop, batch):
+    infos = ProductInfo.objects.filter(shop=shop, is_active=True, external_id__in=batch)
+    matched = set(infos.values_list("external_id", flat=True))
+    if not matched:
+        return matched
+
+    assignments = {}
+    for field in STOCK_DELTA_FIELDS:
+        whens = [
+            When(external_id=ext_id, then=Value(batch[ext_id][field]))
+            for ext_id in matched
+            if batch[ext_id][field] is not None
+        ]
+        if whens:
+            assignments[field] = Case(
+                *whens,
+                default=F(field),
+                output_field=ProductInfo._meta.get_field(field),
             )
+    infos.filter(external_id__in=matched).update(
+        fingerprint="", updated_at=timezone.now(), **assignments
+    )
+    return matched
 
-    return {"status": True}
+
+def sync_product_info_parameters(product_info_ids, batch_size=None):
+    """
+    Переписывает JSON-копию параметров предложений из ProductParameter.
+    Нужна после правки EAV-таблиц в обход импорта (например, в админке).
+    """
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+    product_info_ids = sorted(set(product_info_ids))
+    updated_at = timezone.now()
+    for start in range(0, len(product_info_ids), batch_size):
+        documents = {pk: {} for pk in product_info_ids[start : start + batch_size]}
+        for info_id, name, value in ProductParameter.objects.filter(
+            product_info_id__in=documents
+        ).values_list("product_info_id", "parameter__name", "value"):
+            documents[info_id][name] = value
+        ProductInfo.objects.bulk_update(
+            [
+                ProductInfo(pk=pk, parameters=doc, updated_at=updated_at)
+                for pk, doc in documents.items()
+            ],
+            ["parameters", "updated_at"],
+        )
+
+
+def purge_retired_product_infos(retired_before=None, batch_size=None):
+    """
+    Окончательно удаляет выведенные из каталога ProductInfo, на которые
+    нет ссылок из OrderItem. Удаление идёт пачками, чтобы не держать
+    долгих блокировок. Возвращает число удалённых записей.
+    """
+    # Импорт внутри функции, т.к. приложение orders зависит от catalog
+    from apps.orders.models import OrderItem
+
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+    retired = ProductInfo.objects.filter(is_active=False).exclude(
+        Exists(OrderItem.objects.filter(product_info_id=OuterRef("pk")))
+    )
+    if retired_before is not None:
+        retired = retired.filter(retired_at__lt=retired_before)
+
+    purged = 0
+    while True:
+        ids = list(retired.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return purged
+        _, deleted = ProductInfo.objects.filter(id__in=ids).delete()
+        purged += deleted.get(ProductInfo._meta.label, 0)
+
+
+def collect_staged_product_infos(batch_size=None):
+    """
+    Удаляет подготовленные товары уже опубликованных версий каталога.
+    Публикация их не трогает, чтобы не удлинять свою транзакцию.
+    Возвращает число удалённых записей.
+    """
+    batch_size = batch_size or settings.CATALOG_IMPORT_BATCH_SIZE
+    stale = StagedProductInfo.objects.filter(version__lte=F("shop__catalog_version"))
+    collected = 0
+    while True:
+        ids = list(stale.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return collected
+        deleted, _ = StagedProductInfo.objects.filter(id__in=ids).delete()
+        collected += deleted
 
 
 def strtobool(val):
@@ -1,3 +1,1319 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import yaml
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.catalog.cache import bump_catalog_version
+from apps.catalog.export import CSV_COLUMNS
+from apps.catalog.feed_files import shop_feed_path, update_feed_files
+from apps.catalog.feeds import DownloadedFeed, FeedError, iter_feed, iter_feed_batches
+from apps.catalog.importer import ImportDataError, ShopImporter
+from apps.catalog.models import (
+    CatalogCacheVersion,
+    Category,
+    FeedUpload,
+    ImportJob,
+    ImportStatus,
+    Parameter,
+    Product,
+    ProductInfo,
+    Shop,
+    UploadStatus,
+)
+from apps.catalog.pagination import ProductInfoPagination
+from apps.catalog.refresh import import_shop_feed_file
+from apps.catalog.serializers import ProductInfoSerializer
+from apps.catalog.services import (
+    claim_import_job,
+    enqueue_import,
+    import_feed,
+    import_shop_feed,
+    run_import_job,
+)
+from apps.catalog.uploads import LimitedUploadHandler, UploadTooLargeError
+from apps.catalog.validation import validate_feed
+from apps.users.models import User
+
+
+def make_feed(goods, shop="Магазин", categories=None):
+    """
+    Прайс-лист в структуре импорта: goods — список (external_id, цена).
+    """
+    return {
+        "shop": shop,
+        "categories": categories or [{"id": 1, "name": "Телефоны"}],
+        "goods": [
+            {
+                "id": external_id,
+                "category": 1,
+                "model": f"m/{external_id}",
+                "name": f"Товар {external_id}",
+                "price": price,
+                "price_rrc": price * 2,
+                "quantity": 10,
+                "parameters": {"Цвет": "белый"},
+            }
+            for external_id, price in goods
+        ],
+    }
+
+
+def open_feed(data, format="json"):
+    content = json.dumps(data, ensure_ascii=False).encode()
+    return DownloadedFeed(
+        io.BytesIO(content),
+        format,
+        empty=False,
+        hash=hashlib.sha256(content).hexdigest(),
+    )
+
+
+class ImportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email="shop@example.com", username="shop", type="shop", is_active=True
+        )
+
+    def run_import(self, data, progress=None):
+        with open_feed(data) as feed:
+            return import_feed(
+                self.user, "http://example.com/feed.json", feed, progress
+            )
+
+    def active_prices(self):
+        return dict(
+            ProductInfo.objects.filter(is_active=True).values_list(
+                "external_id", "price"
+            )
+        )
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY доступен только в PostgreSQL")
+@override_settings(CATALOG_IMPORT_BACKEND="copy")
+class CopyImportTests(ImportTestCase):
+    def test_new_offers_are_created(self):
+        self.run_import(make_feed([(1, 100)]))
+        importer = self.run_import(make_feed([(1, 100), (2, 200)]))
+
+        self.assertEqual(importer.result()["created"], 1)
+        self.assertEqual(self.active_prices(), {1: 100, 2: 200})
+        info = ProductInfo.objects.get(external_id=2)
+        self.assertEqual(json.loads(info.document)["model"], "m/2")
+        self.assertEqual(Shop.objects.get().catalog_version, 2)
+
+
+class DocumentFallbackTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Магазин")
+        category = Category.objects.create(name="Телефоны", external_id=1)
+        product = Product.objects.create(name="Смартфон", category=category)
+        # Предложение создано в обход импорта: документа ещё нет
+        cls.info = ProductInfo.objects.create(
+            product=product,
+            shop=shop,
+            external_id=1,
+            model="m/1",
+            quantity=3,
+            price=100,
+            price_rrc=150,
+            parameters={"Цвет": "белый"},
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_missing_document_is_rendered_without_writes(self):
+        expected = {
+            "id": self.info.pk,
+            "quantity": 3,
+            "price": 100,
+            "price_rrc": 150,
+            "model": "m/1",
+            "product": {"name": "Смартфон", "category": "Телефоны"},
+            "shop": self.info.shop_id,
+            "product_parameters": [{"parameter": "Цвет", "value": "белый"}],
+        }
+        client = APIClient()
+        # Карточка товара доступна только авторизованным
+        client.force_authenticate(
+            User.objects.create(email="buyer@example.com", username="buyer")
+        )
+        for url, extract in (
+            ("/api/v1/catalog/", lambda data: data["results"][0]),
+            (f"/api/v1/catalog/{self.info.pk}", lambda data: data),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(extract(json.loads(response.content)), expected)
+            self.assertFalse(
+                [query for query in queries if query["sql"].startswith("UPDATE")]
+            )
+        self.info.refresh_from_db()
+        self.assertEqual(self.info.document, "")
+
+
+class DocumentOutputTests(ImportTestCase):
+    """
+    Ответы, склеенные из сохранённых документов, побайтно совпадают
+    с JSONRenderer и ProductInfoSerializer.
+    """
+
+    def setUp(self):
+        cache.clear()
+        data = make_feed([(1, 100), (2, 200)])
+        item = data["goods"][0]
+        item["name"] = 'Смартфон "Про"\u20282'
+        item["model"] = 'm,"product_parameters":[]'
+        item["parameters"] = {"Цвет": "белый", "Вес": 150, "Ёмкость": "1\u2029"}
+        self.run_import(data)
+        # Предложение без сохранённого документа
+        ProductInfo.objects.filter(external_id=2).update(document="")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expected(self, queryset, many=True):
+        return JSONRenderer().render(ProductInfoSerializer(queryset, many=many).data)
+
+    def test_list_and_detail_match_the_serializer(self):
+        infos = ProductInfo.objects.filter(is_active=True).order_by("pk")
+        response = self.client.get("/api/v1/catalog/", {"ordering": "id"})
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(
+                {
+                    "next": None,
+                    "previous": None,
+                    "results": ProductInfoSerializer(infos, many=True).data,
+                }
+            ),
+        )
+        for info in infos:
+            response = self.client.get(f"/api/v1/catalog/{info.pk}")
+            self.assertEqual(response.content, self.expected(info, many=False))
+
+    def test_ndjson_export_matches_the_serializer(self):
+        response = self.client.get("/api/v1/catalog/export.ndjson")
+        self.assertEqual(
+            b"".join(response.streaming_content).splitlines(),
+            [
+                self.expected(info, many=False)
+                for info in ProductInfo.objects.filter(is_active=True).order_by("pk")
+            ],
+        )
+
+
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name="Магазин")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_bump_invalidates_responses_through_database_versions(self):
+        url = f"/api/v1/catalog/?shop_id={self.shop.pk}"
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(first["ETag"], second["ETag"])
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        # Версию меняет другой процесс: общий у процессов только БД
+        version = CatalogCacheVersion.objects.get(
+            scope=f"catalog:version:shop:{self.shop.pk}"
+        ).version
+        bump_catalog_version(self.shop.pk)
+        self.assertEqual(
+            CatalogCacheVersion.objects.get(
+                scope=f"catalog:version:shop:{self.shop.pk}"
+            ).version,
+            version + 1,
+        )
+
+        third = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third["X-Cache"], "MISS")
+        self.assertNotEqual(third["ETag"], first["ETag"])
+
+
+class CacheStatsCommandTests(TestCase):
+    def test_process_local_cache_is_refused(self):
+        with self.assertRaisesMessage(CommandError, "общий бэкенд кэша"):
+            call_command("catalog_cache_stats", stdout=io.StringIO())
+
+    def test_stats_from_a_shared_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        backend = "django.core.cache.backends.filebased.FileBasedCache"
+        with override_settings(
+            CACHES={"default": {"BACKEND": backend, "LOCATION": directory.name}}
+        ):
+            client = APIClient()
+            client.get("/api/v1/catalog/shops")
+            client.get("/api/v1/catalog/shops")
+            output = io.StringIO()
+            call_command("catalog_cache_stats", "--reset", stdout=output)
+            stats = json.loads(output.getvalue())["ShopView"]
+            self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+            output = io.StringIO()
+            call_command("catalog_cache_stats", stdout=output)
+            self.assertEqual(json.loads(output.getvalue())["ShopView"]["hits"], 0)
+
+
+@mock.patch("apps.catalog.refresh.connections")
+class RefreshClaimTests(ImportTestCase):
+    def download(self, data):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as file:
+            json.dump(data, file)
+        shop, _ = Shop.objects.get_or_create(
+            user=self.user, defaults={"name": "Магазин", "url": "http://e.com/f"}
+        )
+        return {
+            "shop_id": shop.pk,
+            "shop": shop.name,
+            "path": file.name,
+            "format": "json",
+            "hash": "",
+            "etag": "",
+            "last_modified": "",
+        }
+
+    def test_refresh_records_its_import_as_a_job(self, connections):
+        download = self.download(make_feed([(1, 100)]))
+        result = import_shop_feed_file(download, time.time() + 60)
+
+        self.assertEqual(result["status"], "imported")
+        self.assertFalse(os.path.exists(download["path"]))
+        job = ImportJob.objects.get(user=self.user)
+        self.assertEqual(job.status, ImportStatus.DONE)
+        self.assertEqual(job.result["created"], 1)
+        self.assertEqual(self.active_prices(), {1: 100})
+
+    def test_shop_imported_by_the_queue_is_skipped(self, connections):
+        download = self.download(make_feed([(1, 100)]))
+        ImportJob.objects.create(user=self.user, status=ImportStatus.RUNNING)
+
+        result = import_shop_feed_file(download, time.time() + 60)
+
+        self.assertEqual(result["status"], "busy")
+        self.assertFalse(os.path.exists(download["path"]))
+        self.assertEqual(self.active_prices(), {})
+        self.assertEqual(Shop.objects.get(user=self.user).catalog_version, 0)
+
+    def test_invalid_feed_is_validated_like_the_queue(self, connections):
+        data = make_feed([(1, 100), (2, 200)])
+        data["goods"][0]["price"] = -1
+        data["goods"][1]["category"] = 99
+        download = self.download(data)
+
+        result = import_shop_feed_file(download, time.time() + 60)
+
+        self.assertEqual(result["status"], "failed")
+        self.assertEqual(result["errors_total"], 2)
+        self.assertEqual(len(result["errors"]), 2)
+        job = ImportJob.objects.get(user=self.user)
+        self.assertEqual(job.status, ImportStatus.FAILED)
+        self.assertEqual(job.result["errors_total"], 2)
+        self.assertFalse(ProductInfo.objects.exists())
+
+
+class CountingFile(io.BytesIO):
+    """
+    Файл, запоминающий, сколько байт из него прочитано.
+    """
+
+    consumed = 0
+
+    def readinto(self, buffer):
+        size = super().readinto(buffer)
+        self.consumed += size
+        return size
+
+    def read1(self, size=-1):
+        data = super().read1(size)
+        self.consumed += len(data)
+        return data
+
+
+class FeedParsingTests(TestCase):
+    data = make_feed([(index, 100 + index) for index in range(200)])
+
+    def encode(self, format):
+        if format == "json":
+            return json.dumps(self.data, ensure_ascii=False).encode()
+        return yaml.safe_dump(self.data, allow_unicode=True).encode()
+
+    def test_formats_parse_to_the_same_feed(self):
+        for format in ("json", "yaml"):
+            # Маленький фрагмент: значения разрезаются границами фрагментов
+            with (
+                self.subTest(format=format),
+                override_settings(CATALOG_FEED_CHUNK_SIZE=7),
+            ):
+                batches = list(
+                    iter_feed_batches(
+                        io.BytesIO(self.encode(format)), format, batch_size=64
+                    )
+                )
+                self.assertEqual(batches[0], ("shop", "Магазин"))
+                self.assertEqual(batches[1], ("categories", self.data["categories"]))
+                self.assertEqual(
+                    [len(goods) for _, goods in batches[2:]], [64, 64, 64, 8]
+                )
+                self.assertEqual(
+                    [item for _, goods in batches[2:] for item in goods],
+                    self.data["goods"],
+                )
+
+    @override_settings(CATALOG_FEED_CHUNK_SIZE=1024)
+    def test_malformed_json_fails_without_reading_the_rest(self):
+        content = self.encode("json")
+        position = content.index(b'"price"', len(content) // 10)
+        file = CountingFile(content[:position] + b"@" + content[position:])
+
+        with self.assertRaisesMessage(FeedError, "ошибка JSON в позиции"):
+            list(iter_feed(file, "json"))
+        self.assertLess(file.consumed, len(content) // 2)
+
+    @override_settings(CATALOG_FEED_MAX_VALUE_SIZE=1000, CATALOG_FEED_CHUNK_SIZE=64)
+    def test_json_value_size_is_bounded(self):
+        content = b'{"shop": "' + b"x" * 5000 + b'", "goods": []}'
+
+        with self.assertRaisesMessage(FeedError, "длиннее 1000"):
+            list(iter_feed(io.BytesIO(content), "json"))
+
+    def test_malformed_feeds(self):
+        cases = (
+            ("json", b'{"shop": "Shop", "goods": [{"id": 1}, '),
+            ("json", b'{"shop": tru'),
+            ("yaml", b"shop: [\ngoods:\n- id: 1\n"),
+            ("yaml", b"- shop\n"),
+        )
+        for format, content in cases:
+            with self.subTest(content=content), self.assertRaises(FeedError):
+                list(iter_feed_batches(io.BytesIO(content), format))
+
+
+class ValidationTests(ImportTestCase):
+    def invalid_feed(self):
+        data = make_feed([(1, 100), (2, 200), (2, 300), (4, 400)])
+        data["goods"][0]["price"] = -1
+        del data["goods"][1]["name"]
+        data["goods"][3]["category"] = 99
+        return data
+
+    def test_all_errors_are_collected(self):
+        with open_feed(self.invalid_feed()) as feed:
+            report = validate_feed(feed.file, feed.format)
+
+        self.assertFalse(report.valid)
+        self.assertEqual(report.errors_total, 4)
+        self.assertEqual(
+            [error.split(":")[0] for error in report.errors],
+            [
+                "goods[0] (id=1)['price']",
+                "goods[1] (id=2)",
+                "goods[2] (id=2)",
+                "goods[3] (id=4)",
+            ],
+        )
+
+    def test_errors_beyond_the_limit_are_only_counted(self):
+        with open_feed(self.invalid_feed()) as feed:
+            report = validate_feed(feed.file, feed.format, max_errors=2)
+
+        self.assertEqual(len(report.errors), 2)
+        self.assertEqual(report.errors_total, 4)
+
+    def test_invalid_feed_writes_nothing(self):
+        with open_feed(self.invalid_feed()) as feed:
+            result = import_shop_feed(self.user, None, feed, None)
+
+        self.assertFalse(result["status"])
+        self.assertEqual(result["errors_total"], 4)
+        self.assertFalse(Shop.objects.exists())
+        self.assertFalse(ProductInfo.objects.exists())
+
+    def test_dry_run_reports_the_diff_and_writes_nothing(self):
+        self.run_import(make_feed([(1, 100), (2, 200), (3, 300)]))
+        shop = Shop.objects.get()
+        before = list(ProductInfo.objects.values_list("pk", "price", "is_active"))
+
+        with CaptureQueriesContext(connection) as queries:
+            with open_feed(make_feed([(1, 100), (2, 201), (4, 400)])) as feed:
+                result = import_shop_feed(self.user, None, feed, shop, dry_run=True)
+
+        self.assertEqual(
+            result,
+            {
+                "status": True,
+                "dry_run": True,
+                "goods": 3,
+                "created": 1,
+                "updated": 1,
+                "unchanged": 1,
+                "removed": 1,
+            },
+        )
+        self.assertEqual(
+            [
+                query["sql"]
+                for query in queries.captured_queries
+                if not query["sql"].startswith("SELECT")
+            ],
+            [],
+        )
+        self.assertEqual(
+            list(ProductInfo.objects.values_list("pk", "price", "is_active")), before
+        )
+
+
+class DisabledShopFeedFileTests(ImportTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(CATALOG_FEED_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+
+    def feed(self, url):
+        response = self.client.get(url)
+        if response.status_code != 200:
+            return response.status_code
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_disabled_shop_files_are_removed_and_not_served(self):
+        self.run_import(make_feed([(1, 100)]))
+        shop = Shop.objects.get()
+        self.assertEqual(update_feed_files(), [shop.pk])
+        shop_url = f"/api/v1/catalog/feeds/{shop.pk}/catalog.json"
+        global_url = "/api/v1/catalog/feeds/catalog.json"
+        self.assertEqual(self.feed(shop_url)["goods"][0]["id"], 1)
+        self.assertEqual([feed["shop"] for feed in self.feed(global_url)], ["Магазин"])
+
+        # Отключён в обход API: файлы ещё на диске, но не отдаются
+        Shop.objects.update(state=False)
+        self.assertTrue(os.path.exists(shop_feed_path(shop.pk, "json")))
+        self.assertEqual(self.feed(shop_url), 404)
+
+        self.assertEqual(update_feed_files(), [])
+        self.assertFalse(
+            os.path.exists(os.path.dirname(shop_feed_path(shop.pk, "json")))
+        )
+        self.assertEqual(self.feed(global_url), [])
+
+        # Переключение через API только меняет версию: файлы пишет
+        # следующее обновление, а не запрос
+        self.client.force_authenticate(self.user)
+        with mock.patch("apps.catalog.feed_files.write_shop_feed_files") as write:
+            response = self.client.post("/api/v1/user/partner/state", {"state": "on"})
+        self.assertEqual(response.status_code, 200)
+        write.assert_not_called()
+        self.assertEqual(self.feed(shop_url), 404)
+
+        self.assertEqual(update_feed_files(), [shop.pk])
+        self.assertEqual(self.feed(shop_url)["shop"], "Магазин")
+        self.assertEqual(len(self.feed(global_url)), 1)
+
+
+class CatalogQueryTestCase(ImportTestCase):
+    """
+    Два магазина с товарами двух категорий для проверки выборок списка товаров.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_user = User.objects.create(
+            email="other@example.com", username="other", type="shop", is_active=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        categories = [{"id": 1, "name": "Phones"}, {"id": 2, "name": "Laptops"}]
+        goods = (
+            (1, 1, "Phone Alpha", 500, {"Цвет": "белый", "Память": "64"}),
+            (2, 1, "Phone Beta", 3000, {"Цвет": "чёрный", "Память": "128"}),
+            (3, 2, "Laptop Gamma", 60000, {"Цвет": "белый"}),
+        )
+        data = make_feed(
+            [(external_id, price) for external_id, _, _, price, _ in goods]
+        )
+        data["categories"] = categories
+        for item, (_, category, name, _, parameters) in zip(data["goods"], goods):
+            item.update(category=category, name=name, parameters=parameters)
+        self.run_import(data)
+
+        other = make_feed([(4, 1500)], shop="Другой магазин", categories=categories)
+        other["goods"][0].update(name="Phone Delta", parameters={"Цвет": "белый"})
+        with open_feed(other) as feed:
+            import_feed(self.other_user, "http://example.com/other.json", feed)
+
+        self.shop = Shop.objects.get(user=self.user)
+        self.other_shop = Shop.objects.get(user=self.other_user)
+        self.categories = dict(Category.objects.values_list("external_id", "pk"))
+
+    def get(self, **params):
+        return self.client.get("/api/v1/catalog/", {"ordering": "id", **params})
+
+    def names(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["product"]["name"] for row in response.json()["results"]]
+
+
+class SearchTests(CatalogQueryTestCase):
+    def test_search_matches_product_names(self):
+        self.assertEqual(
+            self.names(search="Phone"), ["Phone Alpha", "Phone Beta", "Phone Delta"]
+        )
+        self.assertEqual(self.names(search="Gamma"), ["Laptop Gamma"])
+        self.assertEqual(self.names(search="Omega"), [])
+
+    def test_search_is_combined_with_filters(self):
+        self.assertEqual(
+            self.names(search="Phone", shop_id=self.other_shop.pk), ["Phone Delta"]
+        )
+        self.assertEqual(self.names(search="Phone", price_max=1000), ["Phone Alpha"])
+
+    @skipUnless(connection.vendor == "postgresql", "Поиск с ранжированием — PostgreSQL")
+    def test_search_tolerates_typos_and_ranks(self):
+        self.assertIn("Laptop Gamma", self.names(search="Laptp Gama"))
+        response = self.client.get("/api/v1/catalog/", {"search": "Phone Beta"})
+        self.assertEqual(response.json()["results"][0]["product"]["name"], "Phone Beta")
+
+
+class FilterTests(CatalogQueryTestCase):
+    def parameter(self, name, value):
+        return f"{Parameter.objects.get(name=name).pk}:{value}"
+
+    def test_filters(self):
+        cases = (
+            ({"shop_id": self.other_shop.pk}, ["Phone Delta"]),
+            ({"category_id": self.categories[2]}, ["Laptop Gamma"]),
+            ({"price_min": 1500, "price_max": 3000}, ["Phone Beta", "Phone Delta"]),
+            (
+                {"param": self.parameter("Цвет", "белый")},
+                ["Phone Alpha", "Laptop Gamma", "Phone Delta"],
+            ),
+            (
+                {
+                    "param": [
+                        self.parameter("Цвет", "белый"),
+                        self.parameter("Память", "64"),
+                        self.parameter("Память", "128"),
+                    ]
+                },
+                ["Phone Alpha"],
+            ),
+            (
+                {"param": self.parameter("Цвет", "белый"), "shop_id": self.shop.pk},
+                ["Phone Alpha", "Laptop Gamma"],
+            ),
+        )
+        for params, names in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.names(**params), names)
+
+    def test_disabled_shop_is_excluded(self):
+        Shop.objects.filter(pk=self.other_shop.pk).update(state=False)
+
+        self.assertEqual(self.names(), ["Phone Alpha", "Phone Beta", "Laptop Gamma"])
+
+    def test_invalid_filters_are_rejected(self):
+        for params in (
+            {"shop_id": "один"},
+            {"price_min": -1},
+            {"param": "Цвет:белый"},
+            {"param": "1"},
+            {"facets": "может быть"},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.get(**params).status_code, 400)
+
+    def test_facet_counts(self):
+        response = self.get(facets="true", price_max=5000)
+        facets = response.json()["facets"]
+
+        self.assertEqual(
+            facets["shops"],
+            [
+                {"id": self.shop.pk, "name": "Магазин", "count": 2},
+                {"id": self.other_shop.pk, "name": "Другой магазин", "count": 1},
+            ],
+        )
+        self.assertEqual(
+            facets["categories"],
+            [{"id": self.categories[1], "name": "Phones", "count": 3}],
+        )
+        self.assertEqual(facets["price"]["min"], 500)
+        self.assertEqual(facets["price"]["max"], 3000)
+        self.assertEqual(
+            [bucket["count"] for bucket in facets["price"]["buckets"]],
+            [1, 2, 0, 0, 0, 0],
+        )
+        self.assertEqual(
+            [
+                (parameter["name"], parameter["values"])
+                for parameter in facets["parameters"]
+            ],
+            [
+                (
+                    "Цвет",
+                    [{"value": "белый", "count": 2}, {"value": "чёрный", "count": 1}],
+                ),
+                (
+                    "Память",
+                    [{"value": "128", "count": 1}, {"value": "64", "count": 1}],
+                ),
+            ],
+        )
+
+    def test_facets_are_omitted_by_default(self):
+        self.assertNotIn("facets", self.get().json())
+
+
+class ParameterColumnTests(CatalogQueryTestCase):
+    def column_and_rows(self):
+        return {
+            info.external_id: (
+                info.parameters,
+                {
+                    parameter.parameter.name: parameter.value
+                    for parameter in info.product_parameters.all()
+                },
+            )
+            for info in ProductInfo.objects.prefetch_related(
+                "product_parameters__parameter"
+            )
+        }
+
+    def test_column_follows_the_parameter_rows(self):
+        data = make_feed([(1, 500)], categories=[{"id": 1, "name": "Phones"}])
+        data["goods"][0].update(name="Phone Alpha", parameters={"Цвет": "синий"})
+        self.run_import(data)
+
+        for external_id, (column, rows) in self.column_and_rows().items():
+            with self.subTest(external_id=external_id):
+                self.assertEqual(column, rows)
+        self.assertEqual(
+            ProductInfo.objects.get(shop=self.shop, external_id=1).parameters,
+            {"Цвет": "синий"},
+        )
+
+    def test_unknown_parameter_matches_nothing(self):
+        self.assertEqual(self.names(param="999999:белый"), [])
+
+    @skipUnless(connection.vendor == "postgresql", "JSONB и GIN — PostgreSQL")
+    def test_filter_uses_the_json_column(self):
+        parameter = Parameter.objects.get(name="Цвет").pk
+
+        with CaptureQueriesContext(connection) as queries:
+            names = self.names(param=[f"{parameter}:белый", f"{parameter}:чёрный"])
+
+        self.assertEqual(
+            names, ["Phone Alpha", "Phone Beta", "Laptop Gamma", "Phone Delta"]
+        )
+        sql = [query["sql"] for query in queries.captured_queries]
+        self.assertTrue(any('"parameters" @>' in query for query in sql))
+        self.assertFalse(any("catalog_productparameter" in query for query in sql))
+
+
+def encode_cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+class CursorTests(ImportTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.run_import(make_feed([(1, 100), (2, 200), (3, 300)]))
+
+    def get(self, **params):
+        return self.client.get("/api/v1/catalog/", {"page_size": 1, **params})
+
+    def test_pages_follow_the_cursor(self):
+        first = self.get(ordering="price").json()
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([row["price"] for row in second["results"]], [200])
+        previous = self.client.get(second["previous"]).json()
+        self.assertEqual(previous["results"], first["results"])
+
+    def test_tampered_cursors_are_rejected(self):
+        pk = ProductInfo.objects.get(external_id=1).pk
+        cursors = (
+            "не base64",
+            base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+            encode_cursor([100, pk]),
+            encode_cursor({"p": [100, pk]}),
+            encode_cursor({"p": [100, pk], "o": "name"}),
+            encode_cursor({"p": [100], "o": "price"}),
+            encode_cursor({"p": [100, str(pk)], "o": "price"}),
+            encode_cursor({"p": [100, True], "o": "price"}),
+            encode_cursor({"p": [None, pk], "o": "price"}),
+            encode_cursor({"p": [[100], pk], "o": "price"}),
+            encode_cursor({"p": ["дорого", pk], "o": "price"}),
+            encode_cursor({"p": [100, pk], "o": "price", "r": "yes"}),
+            encode_cursor({"p": [100, pk], "o": "price", "x": 1}),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.get(ordering="price", cursor=cursor)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"cursor": "Неверный курсор"})
+
+        response = self.get(
+            ordering="price", cursor=encode_cursor({"p": [100, pk], "o": "price"})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["price"] for row in response.json()["results"]], [200])
+
+    def test_annotation_ordering_follows_the_cursor(self):
+        # Так сортирует поиск: по аннотации relevance, а не по полю модели
+        queryset = ProductInfo.objects.annotate(
+            relevance=ExpressionWrapper(F("price") / 1000.0, output_field=FloatField())
+        )
+        paginator = ProductInfoPagination()
+        paginator.orderings = {**paginator.orderings, "relevance": "relevance"}
+        factory = APIRequestFactory()
+
+        request = Request(factory.get("/", {"ordering": "-relevance", "page_size": 1}))
+        first = paginator.paginate_queryset(queryset, request)
+        request = Request(factory.get(paginator.get_next_link()))
+        second = paginator.paginate_queryset(queryset, request)
+
+        self.assertEqual([info.price for info in first + second], [300, 200])
+
+    @skipUnless(connection.vendor == "postgresql", "Поиск с ранжированием — PostgreSQL")
+    def test_search_pages_follow_the_cursor(self):
+        first = self.get(search="Товар").json()
+        second = self.client.get(first["next"])
+
+        self.assertEqual(second.status_code, 200)
+        ids = {row["id"] for row in first["results"] + second.json()["results"]}
+        self.assertEqual(len(ids), 2)
+
+
+@override_settings(CATALOG_UPLOAD_MAX_SIZE=1000)
+class UploadSizeTests(ImportTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(CATALOG_UPLOAD_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_oversized_request_is_rejected_before_reading(self):
+        stream = mock.MagicMock()
+        response = self.client.generic(
+            "POST",
+            "/api/v1/user/partner/upload",
+            content_type="multipart/form-data; boundary=x",
+            CONTENT_LENGTH="5000",
+            **{"wsgi.input": stream},
+        )
+        self.assertEqual(response.status_code, 413)
+        stream.read.assert_not_called()
+        self.assertFalse(FeedUpload.objects.exists())
+
+    def test_body_without_length_is_stopped_while_receiving(self):
+        handler = LimitedUploadHandler()
+        handler.handle_raw_input(None, {}, 0, b"x")
+        handler.new_file("file", "feed.json", "application/json", None)
+        handler.receive_data_chunk(b"x" * 600, 0)
+        with self.assertRaises(UploadTooLargeError):
+            handler.receive_data_chunk(b"x" * 600, 600)
+        handler.file.close()
+
+    def test_small_file_is_accepted(self):
+        file = io.BytesIO(json.dumps(make_feed([(1, 100)])).encode())
+        file.name = "feed.json"
+        response = self.client.post(
+            "/api/v1/user/partner/upload", {"file": file}, format="multipart"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(FeedUpload.objects.get().status, UploadStatus.COMPLETE)
+
+
+class ExportTests(ImportTestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def export(self, export_format, **headers):
+        response = self.client.get(f"/api/v1/catalog/export.{export_format}", **headers)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    @override_settings(CATALOG_EXPORT_CHUNK_SIZE=2)
+    def test_formats_and_chunks(self):
+        self.run_import(make_feed([(1, 100), (2, 200), (3, 300)]))
+
+        lines = self.export("ndjson").decode().splitlines()
+        self.assertEqual([json.loads(line)["price"] for line in lines], [100, 200, 300])
+
+        rows = list(csv.reader(io.StringIO(self.export("csv").decode())))
+        self.assertEqual(rows[0][:3], ["id", "shop", "category"])
+        self.assertEqual([row[6] for row in rows[1:]], ["100", "200", "300"])
+
+        compressed = self.export("csv", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(gzip.decompress(compressed), self.export("csv"))
+
+    def test_empty_export(self):
+        self.assertEqual(self.export("ndjson"), b"")
+        self.assertEqual(self.export("csv").decode().strip(), ",".join(CSV_COLUMNS))
+
+
+class RetireTests(ImportTestCase):
+    def test_missing_offers_are_retired_and_restored_in_place(self):
+        self.run_import(make_feed([(1, 100), (2, 200), (3, 300)]))
+        ids = dict(ProductInfo.objects.values_list("external_id", "pk"))
+
+        importer = self.run_import(make_feed([(1, 150), (2, 200), (4, 400)]))
+
+        self.assertEqual(
+            importer.result(),
+            {"created": 1, "updated": 1, "unchanged": 1, "removed": 1},
+        )
+        self.assertEqual(self.active_prices(), {1: 150, 2: 200, 4: 400})
+        retired = ProductInfo.objects.get(external_id=3)
+        self.assertFalse(retired.is_active)
+        self.assertIsNotNone(retired.retired_at)
+
+        self.run_import(make_feed([(1, 150), (2, 200), (3, 300), (4, 400)]))
+
+        restored = ProductInfo.objects.get(external_id=3)
+        self.assertTrue(restored.is_active)
+        self.assertIsNone(restored.retired_at)
+        # Предложения обновляются на месте: ID стабильны между импортами
+        self.assertEqual(
+            {
+                external_id: pk
+                for external_id, pk in ProductInfo.objects.values_list(
+                    "external_id", "pk"
+                )
+                if external_id in ids
+            },
+            ids,
+        )
+        self.assertEqual(ProductInfo.objects.count(), 4)
+
+
+@override_settings(CATALOG_IMPORT_BACKEND="orm", CATALOG_IMPORT_BATCH_SIZE=10)
+class ImportQueryCountTests(TestCase):
+    """
+    Число запросов импорта растёт с числом пачек, а не товаров:
+    каждая пачка пишется постоянным числом запросов.
+    """
+
+    def count_queries(self, size):
+        user = User.objects.create(
+            email=f"shop{size}@example.com",
+            username=f"shop{size}",
+            type="shop",
+            is_active=True,
+        )
+        first = size * 1000
+        data = make_feed(
+            [(external_id, 100) for external_id in range(first, first + size)],
+            shop=f"Магазин {size}",
+        )
+        with CaptureQueriesContext(connection) as queries:
+            with open_feed(data) as feed:
+                importer = import_feed(user, "http://example.com/feed.json", feed)
+        self.assertEqual(importer.items_created, size)
+        return len(queries)
+
+    def test_query_count_per_batch_is_constant(self):
+        # Общие категории создаёт первый импорт
+        self.count_queries(1)
+        small, medium, large = (self.count_queries(size) for size in (10, 20, 50))
+
+        per_batch = medium - small
+        self.assertEqual(large - small, per_batch * 4)
+
+
+class ReimportTests(ImportTestCase):
+    catalog_tables = (
+        "catalog_category",
+        "catalog_product",
+        "catalog_productinfo",
+        "catalog_stagedproductinfo",
+        "catalog_parameter",
+        "catalog_productparameter",
+    )
+
+    def catalog_writes(self, queries):
+        return [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+            and any(f'"{table}"' in query["sql"] for table in self.catalog_tables)
+        ]
+
+    def test_unchanged_feed_writes_nothing(self):
+        data = make_feed([(1, 100), (2, 200), (3, 300)])
+        self.run_import(data)
+        before = list(ProductInfo.objects.values_list("pk", "updated_at"))
+
+        with CaptureQueriesContext(connection) as queries:
+            importer = self.run_import(data)
+
+        self.assertEqual(self.catalog_writes(queries.captured_queries), [])
+        self.assertEqual(
+            importer.result(),
+            {"created": 0, "updated": 0, "unchanged": 3, "removed": 0},
+        )
+        self.assertEqual(
+            list(ProductInfo.objects.values_list("pk", "updated_at")), before
+        )
+
+    def test_counters(self):
+        self.run_import(make_feed([(1, 100), (2, 200), (3, 300)]))
+
+        importer = self.run_import(make_feed([(1, 100), (2, 201), (4, 400)]))
+
+        self.assertEqual(
+            importer.result(),
+            {"created": 1, "updated": 1, "unchanged": 1, "removed": 1},
+        )
+        self.assertEqual(self.active_prices(), {1: 100, 2: 201, 4: 400})
+
+
+@override_settings(CATALOG_IMPORT_BACKEND="orm", CATALOG_IMPORT_BATCH_SIZE=1)
+class PublishTests(ImportTestCase):
+    def colored_feed(self, goods):
+        data = make_feed(goods)
+        for item in data["goods"]:
+            item["parameters"] = {"Цвет": f"цвет {item['price']}"}
+        return data
+
+    def snapshot(self):
+        """
+        Активные предложения глазами читателя: {external_id: цена}.
+        Параметры каждого предложения должны быть из той же версии, что и цена.
+        """
+        prices = {}
+        for info in ProductInfo.objects.filter(is_active=True).prefetch_related(
+            "product_parameters"
+        ):
+            color = f"цвет {info.price}"
+            self.assertEqual(info.parameters, {"Цвет": color})
+            self.assertEqual(
+                [parameter.value for parameter in info.product_parameters.all()],
+                [color],
+            )
+            self.assertEqual(
+                json.loads(info.document)["product_parameters"][0]["value"], color
+            )
+            prices[info.external_id] = info.price
+        return prices, Shop.objects.get().catalog_version
+
+    def test_readers_see_the_previous_version_while_the_feed_is_written(self):
+        self.run_import(self.colored_feed([(1, 100), (2, 200)]))
+        seen = []
+
+        self.run_import(
+            self.colored_feed([(1, 110), (2, 210), (3, 310)]),
+            progress=lambda importer: seen.append(self.snapshot()),
+        )
+
+        old = ({1: 100, 2: 200}, 1)
+        # Три пачки подготовки: каталог прежний
+        self.assertEqual(seen[:3], [old] * 3)
+        # Публикация пачками: каждое предложение переключается целиком
+        self.assertEqual(
+            seen[3:],
+            [
+                ({1: 110, 2: 200}, 1),
+                ({1: 110, 2: 210}, 1),
+                ({1: 110, 2: 210, 3: 310}, 1),
+            ],
+        )
+        self.assertEqual(self.snapshot(), ({1: 110, 2: 210, 3: 310}, 2))
+
+    def test_interrupted_publication_is_repeated_on_resume(self):
+        self.run_import(self.colored_feed([(1, 100), (2, 200), (3, 300)]))
+        data = self.colored_feed([(1, 110), (2, 210)])
+        publish_batch = ShopImporter.publish_batch
+        calls = []
+
+        def fail_second(importer, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError("обрыв")
+            return publish_batch(importer, rows)
+
+        with mock.patch.object(ShopImporter, "publish_batch", fail_second):
+            with self.assertRaises(RuntimeError):
+                self.run_import(data)
+        # Первая пачка опубликована, отсутствующий товар ещё не выведен
+        self.assertEqual(self.snapshot(), ({1: 110, 2: 200, 3: 300}, 1))
+
+        importer = self.run_import(data)
+
+        self.assertEqual(importer.items_skipped, 2)
+        self.assertEqual(self.snapshot(), ({1: 110, 2: 210}, 2))
+
+    def test_failed_import_leaves_the_published_version(self):
+        self.run_import(make_feed([(1, 100), (2, 200)]))
+        data = make_feed([(1, 110), (2, 210)])
+        data["goods"][1]["category"] = 99
+
+        with self.assertRaises(ImportDataError):
+            self.run_import(data)
+
+        self.assertEqual(self.active_prices(), {1: 100, 2: 200})
+        self.assertEqual(Shop.objects.get().catalog_version, 1)
+
+
+@override_settings(CATALOG_IMPORT_BACKEND="orm", CATALOG_IMPORT_BATCH_SIZE=1)
+class ResumeTests(ImportTestCase):
+    def interrupt_import(self, data, after):
+        write_batch = ShopImporter.write_batch
+        calls = []
+
+        def fail_after(importer, items):
+            calls.append(items)
+            if len(calls) > after:
+                raise RuntimeError("обрыв")
+            return write_batch(importer, items)
+
+        with mock.patch.object(ShopImporter, "write_batch", fail_after):
+            with self.assertRaises(RuntimeError):
+                self.run_import(data)
+
+    def test_interrupted_import_resumes_from_the_checkpoint(self):
+        data = make_feed([(1, 100), (2, 200), (3, 300)])
+        self.interrupt_import(data, after=2)
+        shop = Shop.objects.get()
+        self.assertEqual(shop.import_checkpoint_offset, 2)
+        self.assertEqual(self.active_prices(), {})
+
+        with mock.patch.object(
+            ShopImporter,
+            "write_batch",
+            autospec=True,
+            side_effect=ShopImporter.write_batch,
+        ) as write_batch:
+            importer = self.run_import(data)
+
+        self.assertEqual(
+            [call.args[1] for call in write_batch.call_args_list], [data["goods"][2:]]
+        )
+        self.assertEqual(importer.items_skipped, 2)
+        self.assertEqual(self.active_prices(), {1: 100, 2: 200, 3: 300})
+        shop.refresh_from_db()
+        self.assertEqual(
+            (shop.import_checkpoint_hash, shop.import_checkpoint_offset), ("", 0)
+        )
+
+    def test_changed_feed_starts_over(self):
+        self.interrupt_import(make_feed([(1, 100), (2, 200), (3, 300)]), after=2)
+
+        importer = self.run_import(make_feed([(1, 101), (2, 201)]))
+
+        self.assertEqual(importer.items_skipped, 0)
+        self.assertEqual(self.active_prices(), {1: 101, 2: 201})
+
+    def test_checkpoint_is_not_left_by_a_non_resumable_importer(self):
+        data = make_feed([(1, 100), (2, 200), (3, 300)])
+        self.interrupt_import(data, after=2)
+        with mock.patch.object(ShopImporter, "resumable", False):
+            self.interrupt_import(data, after=1)
+        shop = Shop.objects.get()
+        self.assertEqual(
+            (shop.import_checkpoint_hash, shop.import_checkpoint_offset), ("", 0)
+        )
+
+        importer = self.run_import(data)
+
+        self.assertEqual(importer.items_skipped, 0)
+        self.assertEqual(self.active_prices(), {1: 100, 2: 200, 3: 300})
+
+
+@override_settings(CATALOG_IMPORT_PROGRESS_INTERVAL=60)
+@mock.patch("apps.catalog.services.update_feed_files_safely")
+@mock.patch("apps.catalog.services.download_feed")
+class ImportJobTests(ImportTestCase):
+    url = "/api/v1/user/partner/update"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def enqueue(self, feed_url="http://example.com/feed.json"):
+        response = self.client.post(self.url, {"url": feed_url})
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.data["status"])
+        return response.data["job_id"]
+
+    def status(self, job_id):
+        response = self.client.get(f"{self.url}/{job_id}")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_update_is_queued(self, download_feed, update_feed_files):
+        job_id = self.enqueue()
+
+        self.assertEqual(self.status(job_id)["status"], ImportStatus.QUEUED)
+        download_feed.assert_not_called()
+
+    def test_duplicate_submission_joins_the_pending_job(
+        self, download_feed, update_feed_files
+    ):
+        job_id = self.enqueue("http://example.com/old.json")
+
+        self.assertEqual(self.enqueue("http://example.com/new.json"), job_id)
+        job = ImportJob.objects.get()
+        self.assertEqual(job.url, "http://example.com/new.json")
+
+    def test_job_status_follows_the_worker(self, download_feed, update_feed_files):
+        download_feed.return_value = open_feed(make_feed([(1, 100), (2, 200)]))
+        job_id = self.enqueue()
+
+        job = claim_import_job()
+        self.assertEqual(job.pk, job_id)
+        self.assertEqual(self.status(job_id)["status"], ImportStatus.RUNNING)
+        self.assertIsNone(claim_import_job())
+
+        run_import_job(job)
+
+        status = self.status(job_id)
+        self.assertEqual(status["status"], ImportStatus.DONE)
+        self.assertEqual(status["items_parsed"], 2)
+        self.assertEqual(status["result"]["created"], 2)
+        self.assertIsNotNone(status["finished_at"])
+        update_feed_files.assert_called_once()
+
+    def test_failed_download_fails_the_job(self, download_feed, update_feed_files):
+        download_feed.side_effect = FeedError("нет соединения")
+        job_id = self.enqueue()
+
+        run_import_job(claim_import_job())
+
+        status = self.status(job_id)
+        self.assertEqual(status["status"], ImportStatus.FAILED)
+        self.assertIn("нет соединения", status["error"])
+        update_feed_files.assert_not_called()
+
+    def test_other_shop_jobs_are_hidden(self, download_feed, update_feed_files):
+        other = User.objects.create(
+            email="other@example.com", username="other", type="shop", is_active=True
+        )
+        job = enqueue_import(other, url="http://example.com/feed.json")
+
+        response = self.client.get(f"{self.url}/{job.pk}")
+
+        self.assertEqual(response.status_code, 404)
+
+
+class StockDeltaTests(ImportTestCase):
+    url = "/api/v1/user/partner/stock"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.run_import(make_feed([(1, 100), (2, 200), (3, 300)]))
+        self.run_import(make_feed([(1, 100), (2, 200)]))
+
+    def test_deltas_update_only_the_given_fields(self):
+        response = self.client.post(
+            self.url,
+            [
+                {"external_id": 1, "quantity": 0},
+                {"external_id": 2, "price": 250, "price_rrc": 500},
+                {"external_id": 3, "quantity": 5},
+                {"external_id": 9, "quantity": 5},
+            ],
+            format="json",
+        )
+
+        self.assertEqual(
+            response.json(), {"status": True, "updated": 2, "not_found": [3, 9]}
+        )
+        self.assertEqual(
+            list(
+                ProductInfo.objects.filter(is_active=True)
+                .order_by("external_id")
+                .values_list("quantity", "price", "price_rrc", "fingerprint")
+            ),
+            [(0, 100, 200, ""), (10, 250, 500, "")],
+        )
+        # Выведенное из каталога предложение не меняется
+        self.assertEqual(ProductInfo.objects.get(external_id=3).quantity, 10)
+
+        # Следующий импорт того же файла возвращает значения из него
+        self.run_import(make_feed([(1, 100), (2, 200)]))
+        self.assertEqual(
+            list(
+                ProductInfo.objects.filter(is_active=True)
+                .order_by("external_id")
+                .values_list("quantity", "price")
+            ),
+            [(10, 100), (10, 200)],
+        )
+
+    def test_ndjson_deltas(self):
+        response = self.client.generic(
+            "POST",
+            self.url,
+            b'{"external_id": 1, "quantity": 3}\n{"external_id": 2, "quantity": 4}\n',
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(response.json()["updated"], 2)
+        self.assertEqual(
+            dict(
+                ProductInfo.objects.filter(is_active=True).values_list(
+                    "external_id", "quantity"
+                )
+            ),
+            {1: 3, 2: 4},
+        )
+
+    def test_invalid_deltas_change_nothing(self):
+        response = self.client.post(
+            self.url,
+            {
+                "items": [
+                    {"external_id": 1, "quantity": 1},
+                    {"external_id": 2, "quantity": -1},
+                    {"external_id": "3", "price": 1},
+                    {"external_id": 1},
+                    [],
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()["error"]), 4)
+        self.assertEqual(ProductInfo.objects.get(external_id=1).quantity, 10)
@@ -0,0 +1,257 @@
+import bz2
+import gzip
+import hashlib
+import lzma
+import os
+import re
+import shutil
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils import timezone
+
+from .feeds import DownloadedFeed, FeedError, detect_format
+from .models import FeedUpload, ImportStatus, UploadStatus
+
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+# Сигнатуры сжатых файлов и функции их потоковой распаковки
+COMPRESSION_MAGIC = (
+    (b"\x1f\x8b", gzip.open),
+    (b"BZh", bz2.open),
+    (b"\xfd7zXZ\x00", lzma.open),
+)
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".xz")
+
+
+class UploadError(Exception):
+    """
+    Ошибка при приёме загружаемого прайс-листа.
+    """
+
+
+class UploadOffsetError(UploadError):
+    """
+    Часть файла пришла не с того смещения, с которого ожидалась.
+    """
+
+    def __init__(self, upload):
+        super().__init__(f"Ожидалась часть файла со смещения {upload.received} байт")
+        self.upload = upload
+
+
+class UploadTooLargeError(UploadError):
+    """
+    Файл или тело запроса больше CATALOG_UPLOAD_MAX_SIZE.
+    """
+
+    def __init__(self):
+        super().__init__(
+            f"Файл больше {settings.CATALOG_UPLOAD_MAX_SIZE} байт не принимается"
+        )
+
+
+def check_upload_size(size):
+    if size is not None and size > settings.CATALOG_UPLOAD_MAX_SIZE:
+        raise UploadTooLargeError()
+
+
+def check_request_size(meta):
+    """
+    Отклоняет запрос по заголовку Content-Length до чтения тела.
+    """
+    try:
+        size = int(meta.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        raise UploadError("Некорректный заголовок Content-Length")
+    check_upload_size(size)
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет файл из multipart во временный файл на диске и прерывает приём,
+    как только объём превышает CATALOG_UPLOAD_MAX_SIZE: по Content-Length
+    ещё до чтения тела, а без него — по мере получения.
+    """
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        check_upload_size(content_length)
+
+    def receive_data_chunk(self, raw_data, start):
+        check_upload_size(start + len(raw_data))
+        return super().receive_data_chunk(raw_data, start)
+
+
+def upload_path(upload):
+    return os.path.join(settings.CATALOG_UPLOAD_DIR, f"{upload.pk}.upload")
+
+
+def parse_content_range(header):
+    """
+    Разбирает заголовок 'Content-Range: bytes start-end/total'.
+    Возвращает (start, end, total); total равен None, если указан '*'.
+    """
+    match = CONTENT_RANGE_RE.match(header.strip())
+    if not match:
+        raise UploadError("Ожидается заголовок Content-Range: bytes start-end/total")
+    start, end = int(match[1]), int(match[2])
+    total = None if match[3] == "*" else int(match[3])
+    if end < start or (total is not None and end >= total):
+        raise UploadError("Некорректный диапазон Content-Range")
+    return start, end, total
+
+
+def create_upload(user, filename, size=None):
+    """
+    Начинает загрузку прайс-листа: создаёт запись и пустой файл.
+    """
+    check_upload_size(size)
+    upload = FeedUpload.objects.create(
+        user=user, filename=os.path.basename(filename)[:255], size=size
+    )
+    os.makedirs(settings.CATALOG_UPLOAD_DIR, exist_ok=True)
+    open(upload_path(upload), "wb").close()
+    return upload
+
+
+def store_uploaded_file(user, uploaded_file):
+    """
+    Сохраняет файл, целиком полученный multipart-запросом. Django уже
+    записал его во временный файл на диске, поэтому он только перемещается.
+    """
+    upload = create_upload(user, uploaded_file.name, uploaded_file.size)
+    path = upload_path(upload)
+    if hasattr(uploaded_file, "temporary_file_path"):
+        shutil.move(uploaded_file.temporary_file_path(), path)
+        # Временный файл уже перемещён, закрытие его не удалит
+        uploaded_file.close()
+    else:
+        with open(path, "wb") as file:
+            for chunk in uploaded_file.chunks(settings.CATALOG_FEED_CHUNK_SIZE):
+                file.write(chunk)
+    upload.received = upload.size
+    complete_upload(upload)
+    return upload
+
+
+def append_chunk(upload, stream, start, end, total=None):
+    """
+    Дописывает в файл загрузки часть [start, end] из потока запроса,
+    не держа её в памяти. Часть должна начинаться с уже полученного
+    смещения, иначе выбрасывается UploadOffsetError с актуальным смещением.
+
+    Если соединение оборвалось, сохраняется фактически полученный объём,
+    и клиент может продолжить загрузку с него.
+    """
+    if upload.status != UploadStatus.UPLOADING:
+        raise UploadError("Загрузка уже завершена")
+    if start != upload.received:
+        raise UploadOffsetError(upload)
+    if total is not None:
+        if upload.size is not None and upload.size != total:
+            raise UploadError("Размер файла не совпадает с заявленным")
+        upload.size = total
+    check_upload_size(end + 1)
+
+    remaining = end - start + 1
+    with open(upload_path(upload), "r+b") as file:
+        # Хвост от оборванной ранее части отбрасывается
+        file.seek(start)
+        file.truncate()
+        while remaining:
+            chunk = stream.read(min(remaining, settings.CATALOG_FEED_CHUNK_SIZE))
+            if not chunk:
+                break
+            file.write(chunk)
+            remaining -= len(chunk)
+    received = end + 1 - remaining
+
+    # Сравнение с прежним смещением защищает от параллельной загрузки той же части
+    updated = FeedUpload.objects.filter(
+        pk=upload.pk, received=start, status=UploadStatus.UPLOADING
+    ).update(received=received, size=upload.size, updated_at=timezone.now())
+    if not updated:
+        upload.refresh_from_db()
+        raise UploadOffsetError(upload)
+    upload.received = received
+
+    if remaining:
+        raise UploadError(f"Получено {received} байт, часть загружена не полностью")
+    if upload.size is not None and upload.received == upload.size:
+        complete_upload(upload)
+    return upload
+
+
+def complete_upload(upload):
+    """
+    Отмечает загрузку завершённой и считает sha256 файла: по нему
+    импорт продолжается с контрольной точки и пропускает повторы.
+    """
+    digest = hashlib.sha256()
+    with open(upload_path(upload), "rb") as file:
+        while chunk := file.read(settings.CATALOG_FEED_CHUNK_SIZE):
+            digest.update(chunk)
+    upload.hash = digest.hexdigest()
+    upload.status = UploadStatus.COMPLETE
+    upload.save(update_fields=["received", "size", "hash", "status", "updated_at"])
+    return upload
+
+
+def open_upload(upload):
+    """
+    Открывает загруженный прайс-лист как DownloadedFeed. Сжатые
+    gzip/bz2/xz файлы распаковываются потоково при чтении.
+    Повреждённый сжатый файл приводит к FeedError.
+    """
+    path = upload_path(upload)
+    with open(path, "rb") as file:
+        magic = file.read(6)
+    opener = open
+    for signature, decompressor in COMPRESSION_MAGIC:
+        if magic.startswith(signature):
+            opener = decompressor
+            break
+
+    file = opener(path, "rb")
+    try:
+        empty = not file.read(settings.CATALOG_FEED_CHUNK_SIZE).strip()
+        file.seek(0)
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        file.close()
+        raise FeedError(f"Ошибка чтения файла: {e}") from e
+
+    name = upload.filename.lower()
+    for extension in COMPRESSED_EXTENSIONS:
+        name = name.removesuffix(extension)
+    return DownloadedFeed(file, detect_format(name), empty, hash=upload.hash)
+
+
+def delete_upload(upload):
+    """
+    Удаляет файл загрузки и её запись.
+    """
+    try:
+        os.unlink(upload_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def delete_stale_uploads():
+    """
+    Удаляет загрузки, которые не менялись дольше CATALOG_UPLOAD_EXPIRE
+    секунд и не ждут импорта: брошенные незавершённые и заменённые
+    более новой загрузкой в очереди. Возвращает их число.
+    """
+    deadline = timezone.now() - timedelta(seconds=settings.CATALOG_UPLOAD_EXPIRE)
+    stale = FeedUpload.objects.filter(updated_at__lt=deadline).exclude(
+        import_jobs__status__in=[ImportStatus.QUEUED, ImportStatus.RUNNING]
+    )
+    count = 0
+    for upload in stale:
+        delete_upload(upload)
+        count += 1
+    return count
@@ -1,8 +1,12 @@
-from django.urls import path
+from django.urls import path, re_path
 
+from apps.catalog.export import EXPORT_FORMATS
+from apps.catalog.feed_files import FEED_FILE_FORMATS
 from apps.catalog.views import (
+    CatalogFeedFileView,
     CategoryView,
     ProductDetailView,
+    ProductExportView,
     ProductInfoView,
     ShopView,
 )
@@ -14,4 +18,14 @@ urlpatterns = [
     path("shops", ShopView.as_view(), name="shops"),
     path("", ProductInfoView.as_view(), name="products"),
     path("<int:pk>", ProductDetailView.as_view(), name="product-detail"),
+    re_path(
+        rf"^export\.(?P<export_format>{'|'.join(EXPORT_FORMATS)})$",
+        ProductExportView.as_view(),
+        name="export",
+    ),
+    re_path(
+        rf"^feeds/(?:(?P<shop_id>\d+)/)?catalog\.(?P<feed_format>{'|'.join(FEED_FILE_FORMATS)})$",
+        CatalogFeedFileView.as_view(),
+        name="feed-file",
+    ),
 ]
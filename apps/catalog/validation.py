@@ -0,0 +1,180 @@
+from django.conf import settings
+from jsonschema import Draft202012Validator
+
+from .feeds import FeedError, iter_feed
+from .importer import item_fingerprint
+
+SHOP_SCHEMA = {"type": "string", "minLength": 1, "maxLength": 50}
+
+CATEGORY_SCHEMA = {
+    "type": "object",
+    "required": ["id", "name"],
+    "properties": {
+        "id": {"type": "integer", "minimum": 0},
+        "name": {"type": "string", "minLength": 1, "maxLength": 40},
+    },
+}
+
+ITEM_SCHEMA = {
+    "type": "object",
+    "required": ["id", "category", "name", "price", "price_rrc", "quantity"],
+    "properties": {
+        "id": {"type": "integer", "minimum": 0},
+        "category": {"type": "integer", "minimum": 0},
+        "name": {"type": "string", "minLength": 1, "maxLength": 80},
+        "model": {"type": "string", "maxLength": 80},
+        "price": {"type": "integer", "minimum": 0},
+        "price_rrc": {"type": "integer", "minimum": 0},
+        "quantity": {"type": "integer", "minimum": 0},
+        "parameters": {
+            "type": "object",
+            "propertyNames": {"maxLength": 40},
+            "additionalProperties": {
+                "type": ["string", "number", "boolean"],
+                "maxLength": 100,
+            },
+        },
+    },
+}
+
+# Валидаторы создаются один раз: схема проверяется и разбирается при импорте модуля
+shop_validator = Draft202012Validator(SHOP_SCHEMA)
+category_validator = Draft202012Validator(CATEGORY_SCHEMA)
+item_validator = Draft202012Validator(ITEM_SCHEMA)
+for _validator in (shop_validator, category_validator, item_validator):
+    _validator.check_schema(_validator.schema)
+
+
+class FeedReport:
+    """
+    Итог предварительной проверки прайс-листа.
+
+    errors — первые CATALOG_FEED_MAX_ERRORS ошибок, errors_total — общее число.
+    Если переданы текущие товары магазина, считается и разница с каталогом:
+    сколько товаров будет создано, обновлено, не изменится и будет выведено.
+    """
+
+    def __init__(self, max_errors=None):
+        self.max_errors = max_errors or settings.CATALOG_FEED_MAX_ERRORS
+        self.errors = []
+        self.errors_total = 0
+        self.goods = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def add_error(self, message):
+        self.errors_total += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(message)
+
+    @property
+    def valid(self):
+        return self.errors_total == 0
+
+    def diff(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+        }
+
+
+def _error_messages(validator, instance, prefix):
+    for error in validator.iter_errors(instance):
+        path = "".join(f"[{part!r}]" for part in error.absolute_path)
+        yield f"{prefix}{path}: {error.message}"
+
+
+def validate_feed(file, format, existing=None, max_errors=None):
+    """
+    Проверяет весь прайс-лист до записи в БД: структуру, типы и длины полей
+    по JSON Schema, ссылки товаров на категории и повторы external_id.
+    Собирает все ошибки, а не только первую. Файл разбирается потоково.
+
+    existing — словарь external_id -> (fingerprint, is_active) товаров
+    магазина; если передан, в отчёт добавляется разница с каталогом.
+    """
+    report = FeedReport(max_errors)
+    sections = set()
+    categories = set()
+    # external_id категории -> первый ссылающийся на неё товар
+    category_refs = {}
+    seen = set()
+
+    try:
+        for key, value in iter_feed(file, format):
+            if key == "shop":
+                sections.add(key)
+                for message in _error_messages(shop_validator, value, "shop"):
+                    report.add_error(message)
+            elif key == "categories":
+                sections.add(key)
+                if not isinstance(value, list):
+                    report.add_error("categories: ожидается список")
+                    continue
+                for index, category in enumerate(value):
+                    prefix = f"categories[{index}]"
+                    for message in _error_messages(
+                        category_validator, category, prefix
+                    ):
+                        report.add_error(message)
+                    if isinstance(category, dict) and isinstance(
+                        category.get("id"), int
+                    ):
+                        categories.add(category["id"])
+            elif key == "goods":
+                sections.add(key)
+                if value is not None:
+                    report.add_error("goods: ожидается список")
+            elif key == "item":
+                item = value
+                prefix = f"goods[{report.goods}]"
+                report.goods += 1
+                external_id = item.get("id") if isinstance(item, dict) else None
+                if isinstance(external_id, int):
+                    prefix += f" (id={external_id})"
+                for message in _error_messages(item_validator, item, prefix):
+                    report.add_error(message)
+                if not isinstance(item, dict):
+                    continue
+
+                if isinstance(item.get("category"), int):
+                    category_refs.setdefault(item["category"], prefix)
+                if not isinstance(external_id, int):
+                    continue
+                if external_id in seen:
+                    report.add_error(f"{prefix}: повторяется external_id")
+                    continue
+                seen.add(external_id)
+
+                if existing is not None:
+                    current = existing.get(external_id)
+                    if current is None:
+                        report.created += 1
+                    elif current == (item_fingerprint(item), True):
+                        report.unchanged += 1
+                    else:
+                        report.updated += 1
+    except FeedError as e:
+        report.add_error(str(e))
+        return report
+
+    for section in ("shop", "categories", "goods"):
+        if section not in sections:
+            report.add_error(f"Отсутствует раздел {section}")
+    for category_id, prefix in category_refs.items():
+        if category_id not in categories:
+            report.add_error(
+                f"{prefix}: категория {category_id!r} не объявлена в разделе categories"
+            )
+
+    if existing is not None:
+        report.removed = sum(
+            1
+            for external_id, (_, is_active) in existing.items()
+            if is_active and external_id not in seen
+        )
+    return report
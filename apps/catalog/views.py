@@ -1,20 +1,67 @@
-from django.db.models import F, Q, Sum
+from django.db.models import F, Sum
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.generics import ListAPIView
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.catalog.models import Category, ProductInfo, Shop
+from apps.catalog.models import (
+    Category,
+    FeedUpload,
+    ImportJob,
+    ProductInfo,
+    Shop,
+    UploadStatus,
+)
 from apps.catalog.serializers import (
     CategorySerializer,
-    ProductInfoSerializer,
+    FeedUploadSerializer,
+    ImportJobSerializer,
     ShopSerializer,
+    fast_product_info_serializer,
+)
+from apps.orders.conditional import (
+    not_modified_response,
+    orders_validators,
+    set_validators,
 )
 from apps.orders.models import Order, StateType
-from apps.orders.serializers import OrderSerializer
-
-from .services import import_shop_data_from_url, strtobool
+from apps.orders.serializers import fast_order_serializer
+
+from .cache import bump_catalog_version, cache_catalog_response
+from .documents import VOLATILE_FIELDS, product_info_json, product_infos_json
+from .export import export_response
+from .facets import get_facets
+from .feed_files import (
+    FEED_FILE_FORMATS,
+    feed_file_response,
+    global_feed_path,
+    shop_feed_path,
+)
+from .filters import filter_product_infos
+from .pagination import ProductInfoPagination
+from .parsers import NDJSONParser
+from .services import (
+    apply_stock_deltas,
+    enqueue_import,
+    import_shop_data_from_url,
+    strtobool,
+    validate_feed_url,
+    validate_stock_deltas,
+)
+from .uploads import (
+    LimitedUploadHandler,
+    UploadError,
+    UploadOffsetError,
+    UploadTooLargeError,
+    append_chunk,
+    check_request_size,
+    create_upload,
+    parse_content_range,
+    store_uploaded_file,
+)
 
 
 class CategoryView(ListAPIView):
@@ -25,6 +72,10 @@ class CategoryView(ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
+    @cache_catalog_response()
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class ShopView(ListAPIView):
     """
@@ -34,48 +85,141 @@ class ShopView(ListAPIView):
     queryset = Shop.objects.filter(state=True)
     serializer_class = ShopSerializer
 
+    @cache_catalog_response()
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class ProductInfoView(APIView):
     """
     Для поиска товаров по фильтрам.
+
+    Выдача постраничная по курсору: ordering=price|-price|name|-name|id,
+    следующая и предыдущая страницы — по ссылкам next/previous.
+    При поиске на PostgreSQL результаты по умолчанию упорядочены
+    по релевантности (ordering=-relevance).
+
+    Фильтры: shop_id, category_id, price_min, price_max, search и
+    param=ID параметра:значение (см. filter_product_infos).
+    С facets=true в ответ добавляются счётчики по магазинам, категориям,
+    диапазонам цен и значениям частых параметров для всей выборки.
+
+    Параметры fields и expand сокращают ответ (см. FastSerializer):
+    fields=id,price,product.name, expand= (без вложенных объектов).
     """
 
+    pagination_class = ProductInfoPagination
+
+    @cache_catalog_response(shop_param="shop_id")
     def get(self, request: Request, *args, **kwargs):
         """ "
         Получение списка товаров с применением фильтров.
         """
-        query = Q(shop__state=True)
-        shop_id = request.query_params.get("shop_id")
-        category_id = request.query_params.get("category_id")
-        search = request.query_params.get("search")
+        try:
+            with_facets = strtobool(request.query_params.get("facets", False))
+        except ValueError as error:
+            return Response(
+                {"status": False, "error": f"Некорректное значение facets: {error}"},
+                status=400,
+            )
+        serializer = fast_product_info_serializer.for_request(request)
+        queryset, ranked = filter_product_infos(request.query_params)
+
+        paginator = self.pagination_class()
+        if ranked:
+            paginator.orderings = {**paginator.orderings, "relevance": "relevance"}
+            paginator.default_ordering = "-relevance"
+        if serializer is fast_product_info_serializer:
+            page = paginator.paginate_queryset(
+                queryset.select_related("product").only(
+                    "document", "product__name", *VOLATILE_FIELDS
+                ),
+                request,
+                view=self,
+            )
+            results = product_infos_json(page)
+        else:
+            # Выборка полей: готовые документы не подходят, предложения
+            # сериализуются, а ненужные связи и столбцы не загружаются.
+            # Поле сортировки читает пагинация — его план тоже загружает
+            page = paginator.paginate_queryset(
+                serializer.prepare(
+                    queryset,
+                    paginator.get_ordering_field(paginator.get_ordering(request)),
+                ),
+                request,
+                view=self,
+            )
+            results = self.get_renderers()[0].render(serializer.serialize_many(page))
 
-        if shop_id:
-            query = query & Q(shop_id=shop_id)
+        extra = {"facets": get_facets(queryset)} if with_facets else {}
+        return HttpResponse(
+            paginator.get_paginated_json(results, **extra),
+            content_type="application/json",
+        )
 
-        if category_id:
-            query = query & Q(product__category_id=category_id)
 
-        if search:
-            query = query & Q(product__name__icontains=search)
+class ProductExportView(APIView):
+    """
+    Полная выгрузка активных предложений одним потоком:
+    export.ndjson (по строке JSON на предложение, как в списке товаров)
+    или export.csv. Фильтры те же, что у списка товаров.
+    """
 
-        queryset = (
-            ProductInfo.objects.filter(query)
-            .select_related("shop", "product__category")
-            .prefetch_related("product_parameters__parameter")
-            .distinct()
-        )
+    def get(self, request: Request, export_format, *args, **kwargs):
+        return export_response(request, export_format)
 
-        serializer = ProductInfoSerializer(queryset, many=True)
 
-        return Response(serializer.data)
+class CatalogFeedFileView(APIView):
+    """
+    Статические файлы каталога в формате прайс-листа (shop, categories,
+    goods): общий feeds/catalog.json|ndjson|yaml и отдельного магазина
+    feeds/<shop_id>/catalog.json|ndjson|yaml. Файлы пишутся после импорта
+    (см. update_feed_files). Файлы магазина, не принимающего заказы,
+    не отдаются, даже если ещё не удалены.
+    """
+
+    def get(self, request: Request, feed_format, shop_id=None, *args, **kwargs):
+        if shop_id is None:
+            path = global_feed_path(feed_format)
+        else:
+            if not Shop.objects.filter(pk=shop_id, state=True).exists():
+                raise Http404("Магазин не найден или не принимает заказы")
+            path = shop_feed_path(shop_id, feed_format)
+        response = feed_file_response(request, path, FEED_FILE_FORMATS[feed_format])
+        if response is None:
+            raise Http404("Файл каталога ещё не сформирован")
+        return response
 
 
 class PartnerUpdate(APIView):
     """
     Обновление прайс-листа магазина из YAML-файла по указанному URL.
     Доступно только авторизованным пользователям с типом 'shop'.
+
+    Импорт выполняется в фоне (команда run_import_jobs), endpoint лишь
+    ставит задание в очередь и возвращает его ID для отслеживания статуса.
+    С dry_run=true прайс-лист только проверяется, и в ответе сразу
+    возвращаются ошибки или число товаров, которые изменил бы импорт.
     """
 
+    def get(self, request, *args, **kwargs):
+        """
+        Получение статуса и прогресса задания импорта.
+        """
+        if not request.user.is_authenticated:
+            return Response({"status": False, "error": "Log in required"}, status=403)
+        if request.user.type != "shop":
+            return Response(
+                {"status": False, "error": "Только для магазинов"}, status=403
+            )
+
+        job = get_object_or_404(
+            ImportJob.objects.filter(user_id=request.user.id), id=kwargs.get("job_id")
+        )
+        serializer = ImportJobSerializer(job)
+        return Response(serializer.data)
+
     def post(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return Response({"status": False, "error": "Log in required"}, status=403)
@@ -88,12 +232,176 @@ class PartnerUpdate(APIView):
         if not url:
             return Response({"status": False, "error": "URL не указан"}, status=400)
 
-        result = import_shop_data_from_url(user=request.user, url=url)
+        error = validate_feed_url(url)
+        if error:
+            return Response({"status": False, "error": error}, status=400)
 
-        if result["status"]:
-            return Response({"status": True})
-        else:
-            return Response({"status": False, "error": result["error"]}, status=400)
+        try:
+            dry_run = strtobool(request.data.get("dry_run", False))
+        except (AttributeError, ValueError) as error:
+            return Response(
+                {"status": False, "error": f"Некорректное значение dry_run: {error}"},
+                status=400,
+            )
+        if dry_run:
+            # Пробный импорт ничего не пишет в БД и выполняется сразу
+            result = import_shop_data_from_url(request.user, url, dry_run=True)
+            return Response(result, status=200 if result["status"] else 400)
+
+        job = enqueue_import(user=request.user, url=url)
+        return Response({"status": True, "job_id": job.id}, status=202)
+
+
+class PartnerStock(APIView):
+    """
+    Быстрое обновление остатков и цен магазина без полного импорта прайс-листа.
+    Принимает JSON-список (или {"items": [...]}) либо NDJSON с объектами
+    {external_id, quantity?, price?, price_rrc?}.
+    """
+
+    parser_classes = (JSONParser, NDJSONParser)
+
+    def post(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return Response(
+                {"status": False, "error": "Требуется авторизация"}, status=403
+            )
+        if request.user.type != "shop":
+            return Response(
+                {"status": False, "error": "Только для магазинов"}, status=403
+            )
+
+        shop = Shop.objects.filter(user_id=request.user.id).first()
+        if shop is None:
+            return Response(
+                {"status": False, "error": "Магазин не найден, загрузите прайс-лист"},
+                status=400,
+            )
+
+        data = request.data
+        if isinstance(data, dict):
+            data = data.get("items")
+        deltas, errors = validate_stock_deltas(data)
+        if errors:
+            return Response({"status": False, "error": errors}, status=400)
+
+        updated, not_found = apply_stock_deltas(shop, deltas)
+        return Response({"status": True, "updated": updated, "not_found": not_found})
+
+
+class PartnerUpload(APIView):
+    """
+    Загрузка прайс-листа файлом вместо URL. Файл может быть сжат gzip/bz2/xz.
+
+    - POST multipart с полем file — загрузка целиком, импорт ставится в очередь.
+    - POST JSON {filename, size?} — начало загрузки частями, возвращает upload_id.
+    - PUT /<upload_id> с заголовком Content-Range: bytes start-end/total —
+      очередная часть; после последней импорт ставится в очередь.
+    - GET /<upload_id> — сколько байт получено, чтобы продолжить прерванную загрузку.
+
+    Тело запроса пишется на диск по частям и целиком в памяти не держится;
+    запрос больше CATALOG_UPLOAD_MAX_SIZE отклоняется (413) до чтения тела.
+    """
+
+    parser_classes = (JSONParser, MultiPartParser)
+
+    def check_shop(self, request):
+        if not request.user.is_authenticated:
+            return Response({"status": False, "error": "Log in required"}, status=403)
+        if request.user.type != "shop":
+            return Response(
+                {"status": False, "error": "Только для магазинов"}, status=403
+            )
+        return None
+
+    def get(self, request, *args, **kwargs):
+        """
+        Получение состояния загрузки.
+        """
+        denied = self.check_shop(request)
+        if denied:
+            return denied
+
+        upload = get_object_or_404(
+            FeedUpload.objects.filter(user_id=request.user.id),
+            id=kwargs.get("upload_id"),
+        )
+        return Response(FeedUploadSerializer(upload).data)
+
+    def post(self, request, *args, **kwargs):
+        denied = self.check_shop(request)
+        if denied:
+            return denied
+
+        # Файл из multipart всегда пишется во временный файл на диске
+        request.upload_handlers = [LimitedUploadHandler(request)]
+        try:
+            check_request_size(request.META)
+            file = request.FILES.get("file")
+            if file is not None:
+                upload = store_uploaded_file(request.user, file)
+                job = enqueue_import(user=request.user, upload=upload)
+                return Response(
+                    {"status": True, "upload_id": upload.id, "job_id": job.id},
+                    status=202,
+                )
+
+            filename = request.data.get("filename")
+            if not filename:
+                return Response(
+                    {"status": False, "error": "Не указан file или filename"},
+                    status=400,
+                )
+            size = request.data.get("size")
+            if size is not None and (type(size) is not int or size <= 0):
+                return Response(
+                    {"status": False, "error": "size должен быть целым числом > 0"},
+                    status=400,
+                )
+            upload = create_upload(request.user, filename, size)
+        except UploadTooLargeError as e:
+            return Response({"status": False, "error": str(e)}, status=413)
+        except UploadError as e:
+            return Response({"status": False, "error": str(e)}, status=400)
+        return Response(
+            {"status": True, "upload_id": upload.id, "offset": upload.received},
+            status=201,
+        )
+
+    def put(self, request, *args, **kwargs):
+        denied = self.check_shop(request)
+        if denied:
+            return denied
+
+        upload = get_object_or_404(
+            FeedUpload.objects.filter(user_id=request.user.id),
+            id=kwargs.get("upload_id"),
+        )
+        try:
+            start, end, total = parse_content_range(
+                request.headers.get("Content-Range", "")
+            )
+            if request.headers.get("Content-Length") != str(end - start + 1):
+                raise UploadError("Content-Length не совпадает с Content-Range")
+            append_chunk(upload, request.stream, start, end, total)
+        except UploadOffsetError as e:
+            return Response(
+                {"status": False, "error": str(e), "offset": e.upload.received},
+                status=409,
+            )
+        except UploadError as e:
+            return Response(
+                {"status": False, "error": str(e), "offset": upload.received},
+                status=413 if isinstance(e, UploadTooLargeError) else 400,
+            )
+
+        if upload.status == UploadStatus.COMPLETE:
+            job = enqueue_import(user=request.user, upload=upload)
+            return Response(
+                {"status": True, "offset": upload.received, "job_id": job.id},
+                status=202,
+            )
+        return Response({"status": True, "offset": upload.received})
 
 
 class PartnerState(APIView):
@@ -135,9 +443,10 @@ class PartnerState(APIView):
         state = request.data.get("state")
         if state:
             try:
-                Shop.objects.filter(user_id=request.user.id).update(
+                if Shop.objects.filter(user_id=request.user.id).update(
                     state=strtobool(state)
-                )
+                ):
+                    bump_catalog_version(request.user.shop.id)
                 return Response({"status": True})
             except ValueError as error:
                 return Response(
@@ -162,36 +471,42 @@ class PartnerOrders(APIView):
     def get(self, request, *args, **kwargs):
         """
         Получение списка заказов, содержащих товары из магазина партнёра.
+        Поддерживает условные запросы: при неизменных заказах — 304.
+        Состав ответа задаётся параметрами fields и expand (см. FastSerializer).
         """
         if not request.user.is_authenticated:
-            return Response({"status": False, "error": "Требуется авторизация"}, status=403)
+            return Response(
+                {"status": False, "error": "Требуется авторизация"}, status=403
+            )
 
         if request.user.type != "shop":
             return Response(
                 {"status": False, "error": "Только для магазинов"}, status=403
             )
+        serializer = fast_order_serializer.for_request(request)
 
-        order = (
-            Order.objects.filter(
-                ordered_items__product_info__shop__user_id=request.user.id
-            )
-            .exclude(state=StateType.BASKET)
-            .prefetch_related(
-                "ordered_items__product_info__product__category",
-                "ordered_items__product_info__product_parameters__parameter",
-            )
-            .select_related("contact")
-            .annotate(
+        orders = Order.objects.filter(
+            ordered_items__product_info__shop__user_id=request.user.id
+        ).exclude(state=StateType.BASKET)
+        etag, last_modified = orders_validators(
+            orders, request.user.id, request.get_full_path()
+        )
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        order = serializer.prepare(orders)
+        if serializer.selects("total_sum"):
+            order = order.annotate(
                 total_sum=Sum(
                     F("ordered_items__quantity")
                     * F("ordered_items__product_info__price")
                 )
             )
-            .distinct()
-        )
 
-        serializer = OrderSerializer(order, many=True)
-        return Response(serializer.data)
+        return set_validators(
+            Response(serializer.serialize_many(order.distinct())), etag, last_modified
+        )
 
 
 class ProductDetailView(APIView):
@@ -204,8 +519,14 @@ class ProductDetailView(APIView):
         Получение детальной информации о товаре по его ID.
         """
         if not request.user.is_authenticated:
-            return Response({"status": False, "error": "Требуется авторизация"}, status=403)
+            return Response(
+                {"status": False, "error": "Требуется авторизация"}, status=403
+            )
+        # Ответ не зависит от пользователя и кэшируется после проверки доступа
+        return self.get_product(request, *args, **kwargs)
 
+    @cache_catalog_response()
+    def get_product(self, request, *args, **kwargs):
         product_id = kwargs.get("pk")
         if not product_id or not str(product_id).isdigit():
             return Response(
@@ -213,11 +534,12 @@ class ProductDetailView(APIView):
             )
 
         product_info = get_object_or_404(
-            ProductInfo.objects.select_related(
-                "shop", "product__category"
-            ).prefetch_related("product_parameters__parameter"),
+            ProductInfo.objects.filter(is_active=True).only(
+                "document", *VOLATILE_FIELDS
+            ),
             id=product_id,
         )
 
-        serializer = ProductInfoSerializer(product_info)
-        return Response(serializer.data)
+        return HttpResponse(
+            product_info_json(product_info), content_type="application/json"
+        )
@@ -1,9 +1,11 @@
 from django.db.models import Q
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apps.contacts.models import Contact
 from apps.contacts.serializers import ContactSerializer
+from apps.orders.models import Order
 
 
 class ContactView(APIView):
@@ -90,6 +92,10 @@ class ContactView(APIView):
                     )
                     if serializer.is_valid():
                         serializer.save()
+                        # Контакт выдаётся в заказах: меняем их валидаторы
+                        Order.objects.filter(contact=contact).update(
+                            updated_at=timezone.now()
+                        )
                         return Response({"status": True})
                     else:
                         return Response({"status": False, "error": serializer.errors})
@@ -0,0 +1,133 @@
+import platform
+import sys
+import timeit
+
+import django
+from django.db import transaction
+from django.db.models import F, Sum
+from rest_framework.renderers import JSONRenderer
+
+from apps.catalog.models import ProductInfo
+from apps.catalog.renderers import ORJSONRenderer
+from apps.catalog.serializers import (
+    ProductInfoSerializer,
+    fast_product_info_serializer,
+)
+from apps.contacts.models import Contact
+from apps.orders.models import Order, OrderItem, StateType
+from apps.orders.serializers import OrderSerializer, fast_order_serializer
+from apps.users.models import User
+
+BENCHMARK_USER_EMAIL = "benchmark-buyer@example.com"
+
+
+def _measure(func, repeat, number):
+    # Лучшее время из repeat серий по number вызовов — в миллисекундах
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1000
+
+
+def _compare(old, new, repeat, number):
+    """
+    Сравнивает прежний путь (DRF-сериализатор + JSONRenderer) с быстрым
+    (FastSerializer + ORJSONRenderer) и промежуточные варианты.
+    """
+    json_renderer = JSONRenderer()
+    orjson_renderer = ORJSONRenderer()
+    old_data, new_data = old(), new()
+    result = {
+        "identical": json_renderer.render(old_data) == orjson_renderer.render(new_data),
+        "bytes": len(json_renderer.render(old_data)),
+        "serializer_ms": _measure(old, repeat, number),
+        "fast_serializer_ms": _measure(new, repeat, number),
+        "json_render_ms": _measure(
+            lambda: json_renderer.render(old_data), repeat, number
+        ),
+        "orjson_render_ms": _measure(
+            lambda: orjson_renderer.render(new_data), repeat, number
+        ),
+        "old_total_ms": _measure(lambda: json_renderer.render(old()), repeat, number),
+        "new_total_ms": _measure(lambda: orjson_renderer.render(new()), repeat, number),
+    }
+    result["speedup"] = round(result["old_total_ms"] / result["new_total_ms"], 2)
+    for key, value in result.items():
+        if key.endswith("_ms"):
+            result[key] = round(value, 4)
+    return result
+
+
+def run_serializer_benchmark(sizes, repeat=5, number=20):
+    """
+    Замеряет сериализацию и отрисовку ответа из sizes строк: заказа
+    с таким числом позиций и списка предложений. Данные загружаются
+    заранее, запросы к БД в замер не входят.
+
+    Для заказа берутся существующие предложения каталога; временные
+    пользователь, контакт и заказ создаются в транзакции, которая
+    откатывается после замера.
+    """
+    infos = list(
+        ProductInfo.objects.filter(is_active=True)
+        .order_by("id")
+        .values_list("id", flat=True)[: max(sizes)]
+    )
+    if len(infos) < max(sizes):
+        raise ValueError(
+            f"В каталоге {len(infos)} предложений, нужно не меньше {max(sizes)}"
+        )
+
+    report = {
+        "python": sys.version.split()[0],
+        "django": django.get_version(),
+        "platform": platform.platform(),
+        "measurements": [],
+    }
+    with transaction.atomic():
+        user = User.objects.create(
+            email=BENCHMARK_USER_EMAIL, username=BENCHMARK_USER_EMAIL
+        )
+        contact = Contact.objects.create(user=user, city="Москва", phone="+7000")
+        for size in sizes:
+            order = Order.objects.create(
+                user=user, state=StateType.NEW, contact=contact
+            )
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(order=order, product_info_id=info_id, quantity=1)
+                    for info_id in infos[:size]
+                ]
+            )
+            order = (
+                fast_order_serializer.prepare(Order.objects.filter(pk=order.pk))
+                .annotate(
+                    total_sum=Sum(
+                        F("ordered_items__quantity") * F("ordered_items__price")
+                    )
+                )
+                .get()
+            )
+            product_infos = list(
+                fast_product_info_serializer.prepare(
+                    ProductInfo.objects.filter(pk__in=infos[:size])
+                )
+            )
+            report["measurements"].append(
+                {
+                    "rows": size,
+                    "order": _compare(
+                        lambda: OrderSerializer(order).data,
+                        lambda: fast_order_serializer.serialize(order),
+                        repeat,
+                        number,
+                    ),
+                    "product_infos": _compare(
+                        lambda: ProductInfoSerializer(product_infos, many=True).data,
+                        lambda: fast_product_info_serializer.serialize_many(
+                            product_infos
+                        ),
+                        repeat,
+                        number,
+                    ),
+                }
+            )
+        transaction.set_rollback(True)
+    return report
@@ -0,0 +1,51 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from apps.orders.models import Order
+
+
+def orders_validators(orders, *key):
+    """
+    Валидаторы (ETag, Last-Modified) списка заказов одним агрегирующим
+    запросом: число заказов и позиций, последнее изменение заказов
+    и входящих в них предложений. key — то, от чего ещё зависит ответ
+    (пользователь, адрес запроса).
+
+    Last-Modified — timestamp в секундах или None, если заказов нет.
+    """
+    state = Order.objects.filter(pk__in=orders.values("pk")).aggregate(
+        orders=Count("pk", distinct=True),
+        items=Count("ordered_items", distinct=True),
+        orders_modified=Max("updated_at"),
+        items_modified=Max("ordered_items__product_info__updated_at"),
+    )
+    modified = [
+        value
+        for value in (state["orders_modified"], state["items_modified"])
+        if value is not None
+    ]
+    last_modified = int(max(modified).timestamp()) if modified else None
+    digest = hashlib.sha1(repr((key, sorted(state.items()))).encode()).hexdigest()
+    return f'"{digest}"', last_modified
+
+
+def not_modified_response(request, etag, last_modified):
+    """
+    Ответ 304 (или 412), если условный запрос If-None-Match /
+    If-Modified-Since показывает, что у клиента актуальная версия;
+    иначе None.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.benchmark import run_serializer_benchmark
+
+
+class Command(BaseCommand):
+    """
+    Замер сериализации и отрисовки ответов заказов и каталога.
+    """
+
+    help = (
+        "Сравнивает DRF-сериализаторы с JSONRenderer и быстрые сериализаторы "
+        "с ORJSONRenderer на ответах из заданного числа строк, выводит время "
+        "в миллисекундах и совпадение вывода в JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="10,100,1000",
+            help="Число строк в ответе через запятую",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Число серий замера")
+        parser.add_argument(
+            "--number", type=int, default=20, help="Число вызовов в серии"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes должен быть списком целых чисел")
+        try:
+            report = run_serializer_benchmark(
+                sizes, repeat=options["repeat"], number=options["number"]
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -35,6 +35,9 @@ class Order(models.Model):
     contact = models.ForeignKey(
         Contact, verbose_name="Контакт", blank=True, null=True, on_delete=models.CASCADE
     )
+    # Время последнего изменения заказа — валидатор условных GET.
+    # Массовые update() выставляют его явно
+    updated_at = models.DateTimeField(verbose_name="Изменён", auto_now=True)
 
     class Meta:
         verbose_name = "Заказ"
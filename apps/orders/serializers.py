@@ -1,11 +1,18 @@
 from rest_framework import serializers
 
+from apps.catalog.fast_serializers import FastSerializer
+from apps.catalog.models import ProductInfo
 from apps.catalog.serializers import ProductInfoSerializer
 from apps.contacts.serializers import ContactSerializer
 from apps.orders.models import Order, OrderItem
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    # В корзину можно добавить только товар, который есть в каталоге
+    product_info = serializers.PrimaryKeyRelatedField(
+        queryset=ProductInfo.objects.filter(is_active=True)
+    )
+
     class Meta:
         model = OrderItem
         fields = ("id", "product_info", "quantity", "order", "price")
@@ -34,3 +41,7 @@ class OrderSerializer(serializers.ModelSerializer):
             "contact",
         )
         read_only_fields = ("id",)
+
+
+# Быстрый вариант OrderSerializer для выдачи заказов (см. FastSerializer)
+fast_order_serializer = FastSerializer(OrderSerializer)
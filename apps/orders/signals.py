@@ -1,8 +1,9 @@
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
+from django.db.models import Prefetch
 from django.dispatch import Signal, receiver
 
-from apps.orders.models import Order
+from apps.orders.models import Order, OrderItem
 from apps.users.models import User
 
 new_order = Signal()
@@ -23,7 +24,14 @@ def new_order_signal(user_id, **kwargs):
         Order.objects.filter(user_id=user_id, state="new")
         .select_related("contact")
         .prefetch_related(
-            "ordered_items__product_info__shop", "ordered_items__product_info__product"
+            # Магазин и товар читаются для каждой позиции — загружаем их
+            # вместе с позициями одним запросом
+            Prefetch(
+                "ordered_items",
+                queryset=OrderItem.objects.select_related(
+                    "product_info__shop", "product_info__product"
+                ),
+            )
         )
         .first()
     )
@@ -1,3 +1,311 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Sum
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.catalog.cache import bump_catalog_version
+from apps.catalog.documents import product_infos_json, render_product_info_documents
+from apps.catalog.models import Category, Product, ProductInfo, Shop
+from apps.catalog.renderers import ORJSONRenderer
+from apps.catalog.serializers import ProductInfoSerializer, fast_product_info_serializer
+from apps.contacts.models import Contact
+from apps.orders.models import Order, OrderItem, StateType
+from apps.orders.serializers import OrderSerializer, fast_order_serializer
+from apps.users.models import User
+
+
+class OrderRowsTestCase(TestCase):
+    """
+    Магазин и покупатель; add_rows наполняет каталог, заказ и корзину.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop_user = User.objects.create(
+            email="shop@example.com", username="shop", type="shop", is_active=True
+        )
+        cls.shop = Shop.objects.create(name="Магазин", user=cls.shop_user)
+        cls.buyer = User.objects.create(
+            email="buyer@example.com", username="buyer", is_active=True
+        )
+        cls.contact = Contact.objects.create(
+            user=cls.buyer, city="Москва", phone="+70000000000"
+        )
+        cls.categories = [
+            Category.objects.create(name=f"Категория {i}", external_id=i)
+            for i in range(3)
+        ]
+        # Версии кэша каталога создаются при первом обращении — заранее,
+        # чтобы это не попало в подсчёт запросов
+        bump_catalog_version()
+        bump_catalog_version(cls.shop.pk)
+
+    def add_rows(self, count):
+        """
+        Добавляет count предложений, заказ из них и те же позиции в корзину.
+        """
+        start = ProductInfo.objects.count()
+        infos = []
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                name=f"Товар {i}", category=self.categories[i % 3]
+            )
+            infos.append(
+                ProductInfo.objects.create(
+                    product=product,
+                    shop=self.shop,
+                    external_id=i,
+                    model=f"m/{i}",
+                    quantity=5,
+                    price=100 + i,
+                    price_rrc=200 + i,
+                    parameters={"Цвет": "белый", "Вес": str(i)},
+                )
+            )
+        render_product_info_documents([info.pk for info in infos])
+
+        order = Order.objects.create(
+            user=self.buyer, state=StateType.NEW, contact=self.contact
+        )
+        basket, _ = Order.objects.get_or_create(user=self.buyer, state=StateType.BASKET)
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, product_info=info, quantity=1, price=info.price)
+                for info in infos
+            ]
+            + [OrderItem(order=basket, product_info=info, quantity=2) for info in infos]
+        )
+        return order
+
+
+class QueryCountTests(OrderRowsTestCase):
+    """
+    Число запросов представлений заказов и каталога не зависит от числа
+    строк в ответе: загрузку планирует сериализатор (FastSerializer.prepare).
+    """
+
+    BUYER_URLS = (
+        "/api/v1/orders/basket",
+        "/api/v1/orders/order",
+        "/api/v1/orders/order?expand=",
+        "/api/v1/orders/order?expand=ordered_items",
+        "/api/v1/orders/order?fields=id,state,total_sum,ordered_items.quantity,"
+        "ordered_items.product_info.product.name",
+        "/api/v1/catalog/?page_size=100",
+        "/api/v1/catalog/?page_size=100&fields=id,price,product",
+        "/api/v1/catalog/?page_size=100&ordering=name&expand=",
+    )
+    SHOP_URLS = (
+        "/api/v1/user/partner/orders",
+        "/api/v1/user/partner/orders?fields=id,ordered_items.product_info.price",
+    )
+
+    def count_queries(self, user, urls, *extra_urls):
+        client = APIClient()
+        client.force_authenticate(user)
+        counts = {}
+        for url in (*urls, *extra_urls):
+            # Кэш ответов каталога не должен скрывать запросы к БД
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts[url] = len(queries)
+        return counts
+
+    def test_query_count_does_not_depend_on_rows(self):
+        order = self.add_rows(2)
+        detail = f"/api/v1/orders/{order.pk}"
+        few = self.count_queries(self.buyer, self.BUYER_URLS, detail)
+        few_shop = self.count_queries(self.shop_user, self.SHOP_URLS)
+
+        order = self.add_rows(20)
+        self.add_rows(5)
+        detail_many = f"/api/v1/orders/{order.pk}"
+        many = self.count_queries(self.buyer, self.BUYER_URLS, detail_many)
+        many_shop = self.count_queries(self.shop_user, self.SHOP_URLS)
+
+        many[detail] = many.pop(detail_many)
+        self.assertEqual(few, many)
+        self.assertEqual(few_shop, many_shop)
+
+
+class FieldSelectionTests(OrderRowsTestCase):
+    """
+    Параметры fields и expand задают состав ответа, неизвестные поля — 400.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.order = self.add_rows(2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_fields(self):
+        (order,) = self.get(
+            "/api/v1/orders/order", fields="id,state,ordered_items.quantity"
+        )
+        self.assertEqual(set(order), {"id", "state", "ordered_items"})
+        self.assertEqual(order["ordered_items"], [{"quantity": 1}, {"quantity": 1}])
+
+        rows = self.get("/api/v1/catalog/", fields="id,price,product.name")["results"]
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertEqual(set(row), {"id", "price", "product"})
+            self.assertEqual(set(row["product"]), {"name"})
+
+    def test_expand(self):
+        items = list(
+            self.order.ordered_items.order_by("pk").values_list("pk", flat=True)
+        )
+
+        (order,) = self.get("/api/v1/orders/order", expand="")
+        self.assertEqual(order["ordered_items"], items)
+
+        (order,) = self.get("/api/v1/orders/order", expand="ordered_items")
+        self.assertEqual([item["id"] for item in order["ordered_items"]], items)
+
+    def test_unknown_names_are_rejected(self):
+        cases = (
+            ("/api/v1/orders/order", "fields", "id,secret"),
+            ("/api/v1/orders/order", "fields", "ordered_items.secret"),
+            ("/api/v1/orders/order", "expand", "secret"),
+            (f"/api/v1/orders/{self.order.pk}", "fields", "secret"),
+            ("/api/v1/orders/basket", "expand", "ordered_items.secret"),
+            ("/api/v1/catalog/", "fields", "product.secret"),
+            ("/api/v1/catalog/", "expand", "secret"),
+        )
+        for url, param, value in cases:
+            with self.subTest(url=url, param=param, value=value):
+                response = self.client.get(url, {param: value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("secret", response.json()[param])
+
+
+class ConditionalGetTests(OrderRowsTestCase):
+    """
+    Условные запросы к заказам (orders_validators) и каталогу:
+    304 при актуальной версии у клиента, новый ETag после изменений.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.order = self.add_rows(2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def assert_not_modified(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        by_etag = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(by_etag.status_code, 304)
+        self.assertEqual(by_etag["ETag"], response["ETag"])
+        if response.has_header("Last-Modified"):
+            by_date = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+            )
+            self.assertEqual(by_date.status_code, 304)
+        return response["ETag"]
+
+    def assert_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_orders(self):
+        for url in ("/api/v1/orders/order", f"/api/v1/orders/{self.order.pk}"):
+            with self.subTest(url=url):
+                self.assert_not_modified(url)
+
+    def test_contact_edit_changes_the_etag(self):
+        urls = ("/api/v1/orders/order", f"/api/v1/orders/{self.order.pk}")
+        etags = [self.assert_not_modified(url) for url in urls]
+
+        response = self.client.put(
+            "/api/v1/user/contact",
+            {"id": str(self.contact.pk), "city": "Казань"},
+            format="json",
+        )
+        self.assertTrue(response.data["status"])
+
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assert_modified(url, etag)
+
+    @mock.patch("apps.orders.views.new_order")
+    def test_checkout_changes_the_etag(self, new_order):
+        etag = self.assert_not_modified("/api/v1/orders/order")
+        basket = Order.objects.get(user=self.buyer, state=StateType.BASKET)
+
+        response = self.client.post(
+            "/api/v1/orders/order",
+            {"id": str(basket.pk), "contact": str(self.contact.pk)},
+            format="json",
+        )
+        self.assertTrue(response.data["status"])
+
+        self.assert_modified("/api/v1/orders/order", etag)
+
+    def test_catalog(self):
+        url = f"/api/v1/catalog/?shop_id={self.shop.pk}"
+        etag = self.assert_not_modified(url)
+
+        bump_catalog_version(self.shop.pk)
+
+        self.assert_modified(url, etag)
+
+
+class RendererIdentityTests(OrderRowsTestCase):
+    """
+    Быстрый путь (FastSerializer и ORJSONRenderer, а для списка каталога —
+    склейка сохранённых документов) выдаёт те же байты, что DRF-сериализаторы
+    с JSONRenderer.
+    """
+
+    def setUp(self):
+        self.order = self.add_rows(3)
+        # Строки, которые кодировщики JSON обрабатывают по-разному
+        Product.objects.filter(name="Товар 0").update(name='Товар "0" \u2028/')
+        ProductInfo.objects.filter(external_id=1).update(
+            parameters={"Ёмкость": "1\u2029", "Вес": "1"}
+        )
+        render_product_info_documents(ProductInfo.objects.values_list("pk", flat=True))
+
+    def test_order(self):
+        order = (
+            fast_order_serializer.prepare(Order.objects.filter(pk=self.order.pk))
+            .annotate(
+                total_sum=Sum(F("ordered_items__quantity") * F("ordered_items__price"))
+            )
+            .get()
+        )
+
+        self.assertEqual(
+            ORJSONRenderer().render(fast_order_serializer.serialize(order)),
+            JSONRenderer().render(OrderSerializer(order).data),
+        )
+
+    def test_catalog_list(self):
+        infos = list(
+            fast_product_info_serializer.prepare(ProductInfo.objects.order_by("pk"))
+        )
+        expected = JSONRenderer().render(ProductInfoSerializer(infos, many=True).data)
 
-# Create your tests here.
+        self.assertEqual(
+            ORJSONRenderer().render(fast_product_info_serializer.serialize_many(infos)),
+            expected,
+        )
+        self.assertEqual(
+            product_infos_json(ProductInfo.objects.order_by("pk")), expected
+        )
@@ -1,14 +1,20 @@
 from json import loads as load_json
 
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.db.models import F, Q, Sum
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apps.contacts.models import Contact
+from apps.orders.conditional import (
+    not_modified_response,
+    orders_validators,
+    set_validators,
+)
 from apps.orders.models import Order, OrderItem, StateType
-from apps.orders.serializers import OrderItemSerializer, OrderSerializer
+from apps.orders.serializers import OrderItemSerializer, fast_order_serializer
 from apps.orders.signals import new_order
 
 
@@ -20,28 +26,26 @@ class BasketView(APIView):
     def get(self, request, *args, **kwargs):
         """
         Получение содержимого корзины пользователя.
+        Состав ответа задаётся параметрами fields и expand (см. FastSerializer).
         """
         if not request.user.is_authenticated:
             return Response(
                 {"status": False, "error": "Требуется авторизация"}, status=403
             )
-        basket = (
+        serializer = fast_order_serializer.for_request(request)
+
+        basket = serializer.prepare(
             Order.objects.filter(user_id=request.user.id, state=StateType.BASKET)
-            .prefetch_related(
-                "ordered_items__product_info__product__category",
-                "ordered_items__product_info__product_parameters__parameter",
-            )
-            .annotate(
+        )
+        if serializer.selects("total_sum"):
+            basket = basket.annotate(
                 total_sum=Sum(
                     F("ordered_items__quantity")
                     * F("ordered_items__product_info__price")
                 )
             )
-            .distinct()
-        )
 
-        serializer = OrderSerializer(basket, many=True)
-        return Response(serializer.data)
+        return Response(serializer.serialize_many(basket.distinct()))
 
     def post(self, request, *args, **kwargs):
         """
@@ -176,27 +180,34 @@ class OrderView(APIView):
     def get(self, request, *args, **kwargs):
         """
         Получение списка всех заказов пользователя (исключая корзину).
+        Поддерживает условные запросы: при неизменных заказах — 304.
+        Состав ответа задаётся параметрами fields и expand (см. FastSerializer).
         """
         if not request.user.is_authenticated:
             return Response(
                 {"status": False, "error": "Требуется авторизация"}, status=403
             )
-        order = (
-            Order.objects.filter(user_id=request.user.id)
-            .exclude(state=StateType.BASKET)
-            .prefetch_related(
-                "ordered_items__product_info__product__category",
-                "ordered_items__product_info__product_parameters__parameter",
-            )
-            .select_related("contact")
-            .annotate(
+        serializer = fast_order_serializer.for_request(request)
+
+        orders = Order.objects.filter(user_id=request.user.id).exclude(
+            state=StateType.BASKET
+        )
+        etag, last_modified = orders_validators(
+            orders, request.user.id, request.get_full_path()
+        )
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        order = serializer.prepare(orders)
+        if serializer.selects("total_sum"):
+            order = order.annotate(
                 total_sum=Sum(F("ordered_items__quantity") * F("ordered_items__price"))
             )
-            .distinct()
-        )
 
-        serializer = OrderSerializer(order, many=True)
-        return Response(serializer.data)
+        return set_validators(
+            Response(serializer.serialize_many(order.distinct())), etag, last_modified
+        )
 
     def post(self, request, *args, **kwargs):
         """
@@ -218,22 +229,31 @@ class OrderView(APIView):
 
             if order_id.isdigit():
                 try:
-                    is_updated = Order.objects.filter(
-                        user_id=request.user.id, id=order_id, state=StateType.BASKET
-                    ).update(contact_id=contact_id, state=StateType.NEW)
+                    # Статус и цены меняются атомарно, чтобы условный GET
+                    # не увидел заказ без зафиксированных цен
+                    with transaction.atomic():
+                        is_updated = Order.objects.filter(
+                            user_id=request.user.id,
+                            id=order_id,
+                            state=StateType.BASKET,
+                        ).update(
+                            contact_id=contact_id,
+                            state=StateType.NEW,
+                            updated_at=timezone.now(),
+                        )
+                        if is_updated:
+                            # Фиксируем цену на момент оформления заказа
+                            order_items = OrderItem.objects.filter(order_id=order_id)
+                            for item in order_items:
+                                if item.price is None:
+                                    item.price = item.product_info.price
+                                    item.save(update_fields=["price"])
                 except IntegrityError:
                     return Response(
                         {"status": False, "error": "Неправильно указаны аргументы"}
                     )
                 else:
                     if is_updated:
-                        # Фиксируем цену на момент оформления заказа
-                        order_items = OrderItem.objects.filter(order_id=order_id)
-                        for item in order_items:
-                            if item.price is None:
-                                item.price = item.product_info.price
-                                item.save(update_fields=["price"])
-
                         new_order.send(sender=self.__class__, user_id=request.user.id)
                         return Response({"status": True})
 
@@ -271,7 +291,7 @@ class PartnerOrderStatusView(APIView):
 
         updated = Order.objects.filter(
             id=order_id, ordered_items__product_info__shop__user=request.user
-        ).update(state=new_state)
+        ).update(state=new_state, updated_at=timezone.now())
 
         if updated:
             return Response({"status": True})
@@ -290,6 +310,8 @@ class OrderDetailView(APIView):
     def get(self, request, *args, **kwargs):
         """
         Получение детальной информации о заказе по его ID.
+        Поддерживает условные запросы: при неизменном заказе — 304.
+        Состав ответа задаётся параметрами fields и expand (см. FastSerializer).
         """
         if not request.user.is_authenticated:
             return Response(
@@ -301,20 +323,26 @@ class OrderDetailView(APIView):
             return Response(
                 {"status": False, "error": "Некорректный ID заказа"}, status=400
             )
+        serializer = fast_order_serializer.for_request(request)
 
-        order = get_object_or_404(
-            Order.objects.filter(user_id=request.user.id)
-            .exclude(state=StateType.BASKET)
-            .select_related("contact")
-            .prefetch_related(
-                "ordered_items__product_info__product__category",
-                "ordered_items__product_info__product_parameters__parameter",
-            )
-            .annotate(
-                total_sum=Sum(F("ordered_items__quantity") * F("ordered_items__price"))
-            ),
-            id=order_id,
+        orders = Order.objects.filter(user_id=request.user.id, id=order_id).exclude(
+            state=StateType.BASKET
         )
+        etag, last_modified = orders_validators(
+            orders, request.user.id, request.get_full_path()
+        )
+        if last_modified is not None:
+            not_modified = not_modified_response(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+        order = serializer.prepare(orders)
+        if serializer.selects("total_sum"):
+            order = order.annotate(
+                total_sum=Sum(F("ordered_items__quantity") * F("ordered_items__price"))
+            )
+        order = get_object_or_404(order)
 
-        serializer = OrderSerializer(order)
-        return Response(serializer.data)
+        return set_validators(
+            Response(serializer.serialize(order)), etag, last_modified
+        )
@@ -4,7 +4,13 @@ from django_rest_passwordreset.views import (
     reset_password_request_token,
 )
 
-from apps.catalog.views import PartnerOrders, PartnerState, PartnerUpdate
+from apps.catalog.views import (
+    PartnerOrders,
+    PartnerState,
+    PartnerStock,
+    PartnerUpdate,
+    PartnerUpload,
+)
 from apps.contacts.views import ContactView
 from apps.orders.views import PartnerOrderStatusView
 from apps.users.views import (
@@ -18,7 +24,11 @@ app_name = 'users'
 
 urlpatterns = [
     path('partner/update', PartnerUpdate.as_view(), name='partner-update'),
+    path('partner/update/<int:job_id>', PartnerUpdate.as_view(), name='partner-update-status'),
+    path('partner/upload', PartnerUpload.as_view(), name='partner-upload'),
+    path('partner/upload/<int:upload_id>', PartnerUpload.as_view(), name='partner-upload-status'),
     path('partner/state', PartnerState.as_view(), name='partner-state'),
+    path('partner/stock', PartnerStock.as_view(), name='partner-stock'),
     path('partner/orders', PartnerOrders.as_view(), name='partner-orders'),
     path('partner/order/state', PartnerOrderStatusView.as_view(), name='partner-order-state'),
     path('register', RegisterAccount.as_view(), name='user-register'),
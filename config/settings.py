@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 
@@ -42,6 +44,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     "rest_framework",
     "rest_framework.authtoken",
@@ -99,6 +102,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# По умолчанию кэш в памяти процесса; для нескольких процессов/серверов,
+# например: CACHE_BACKEND=django.core.cache.backends.redis.RedisCache,
+# CACHE_LOCATION=redis://127.0.0.1:6379/1
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -157,17 +176,82 @@ else:
 
 
 # REST Framework
+# Рендерер JSON-ответов: "json" — стандартный DRF, "orjson" — тот же вывод
+# на orjson, быстрее на больших ответах (без пакета orjson — как "json")
+API_JSON_RENDERER = os.getenv("API_JSON_RENDERER", "json")
+JSON_RENDERERS = {
+    "json": "rest_framework.renderers.JSONRenderer",
+    "orjson": "apps.catalog.renderers.ORJSONRenderer",
+}
+if API_JSON_RENDERER not in JSON_RENDERERS:
+    raise ImproperlyConfigured(
+        f"Неизвестный API_JSON_RENDERER={API_JSON_RENDERER!r}, "
+        f"допустимые значения: {', '.join(JSON_RENDERERS)}"
+    )
+if API_JSON_RENDERER == "orjson" and find_spec("orjson") is None:
+    API_JSON_RENDERER = "json"
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.TokenAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 40,
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+    "DEFAULT_RENDERER_CLASSES": (JSON_RENDERERS[API_JSON_RENDERER],),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
 
+# Импорт прайс-листов
+CATALOG_IMPORT_BATCH_SIZE = int(os.getenv("CATALOG_IMPORT_BATCH_SIZE", "1000"))
+# Способ записи: "orm" — bulk-операции Django, "copy" — COPY во временные
+# таблицы PostgreSQL с последующим слиянием (на других СУБД используется "orm")
+CATALOG_IMPORT_BACKEND = os.getenv("CATALOG_IMPORT_BACKEND", "orm")
+# Размер фрагмента при потоковой загрузке и разборе файла
+CATALOG_FEED_CHUNK_SIZE = 64 * 1024
+# Файлы больше этого размера скачиваются на диск, а не в память
+CATALOG_FEED_SPOOL_SIZE = 8 * 1024 * 1024
+# Наибольший размер одного значения JSON-прайс-листа (раздела или товара),
+# которое разбирается целиком, в символах
+CATALOG_FEED_MAX_VALUE_SIZE = 16 * 1024 * 1024
+# Каталог для прайс-листов, загружаемых магазинами напрямую
+CATALOG_UPLOAD_DIR = os.getenv("CATALOG_UPLOAD_DIR", str(BASE_DIR / "uploads"))
+# Максимальный размер загружаемого файла в байтах
+CATALOG_UPLOAD_MAX_SIZE = int(
+    os.getenv("CATALOG_UPLOAD_MAX_SIZE", str(2 * 1024 * 1024 * 1024))
+)
+# Загрузки без изменений дольше этого времени (в секундах) удаляются
+CATALOG_UPLOAD_EXPIRE = 24 * 60 * 60
+# Сколько ошибок предварительной проверки прайс-листа возвращать в ответе
+CATALOG_FEED_MAX_ERRORS = 100
+# Как часто (в секундах) обработчик сохраняет прогресс задания импорта
+CATALOG_IMPORT_PROGRESS_INTERVAL = 2
+# Задание без обновлений дольше этого времени (в секундах) считается прерванным
+CATALOG_IMPORT_JOB_TIMEOUT = int(os.getenv("CATALOG_IMPORT_JOB_TIMEOUT", "600"))
+
+# Поиск товаров
+# Конфигурация полнотекстового поиска PostgreSQL (словарь морфологии)
+CATALOG_SEARCH_CONFIG = os.getenv("CATALOG_SEARCH_CONFIG", "russian")
+# Границы диапазонов цен в фасетах списка товаров
+CATALOG_FACET_PRICE_BUCKETS = (1000, 5000, 10000, 50000, 100000)
+# Сколько самых частых параметров и их значений возвращать в фасетах
+CATALOG_FACET_PARAMETERS = 10
+CATALOG_FACET_VALUES = 20
+# Сколько секунд хранятся закэшированные ответы каталога; актуальность
+# обеспечивают версии каталога, таймаут лишь вытесняет устаревшие записи
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "3600"))
+# Сколько строк выгрузки каталога читается из курсора и отдаётся за раз
+CATALOG_EXPORT_CHUNK_SIZE = int(os.getenv("CATALOG_EXPORT_CHUNK_SIZE", "2000"))
+# Каталог для статических файлов каталога (прайс-листы магазинов и общий)
+CATALOG_FEED_DIR = os.getenv("CATALOG_FEED_DIR", str(BASE_DIR / "feeds"))
+# Заголовок, которым отдача файлов каталога передаётся фронтенд-серверу:
+# "X-Sendfile" (Apache, lighttpd) или "X-Accel-Redirect" (nginx, файлы
+# доступны по внутреннему адресу CATALOG_FEED_ACCEL_PREFIX). Пусто — файлы
+# отдаёт Django
+CATALOG_FEED_SENDFILE_HEADER = os.getenv("CATALOG_FEED_SENDFILE_HEADER", "")
+CATALOG_FEED_ACCEL_PREFIX = os.getenv("CATALOG_FEED_ACCEL_PREFIX", "/internal/feeds/")
+
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "RESTAPI Сервис",
     "DESCRIPTION": "Документация к RESTAPI интернет-магазина",